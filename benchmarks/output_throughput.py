@@ -0,0 +1,89 @@
+"""Throughput of collecting large STDOUT of program.
+
+Runs program printing given amount of short lines under Process and compares it with
+previous collection strategy (readline into Queue from reader threads, decoding every line).
+
+Usage:
+    python benchmarks/output_throughput.py [--size MB] [--line BYTES] [--repeat N]
+
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from queue import Queue, Empty
+from subprocess import Popen, PIPE
+from threading import Thread
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'carbon'))
+
+from process import Process
+
+
+PRINTER = 'python3 -c "import sys; line = b\'x\' * {line} + b\'\\\\n\'; ' \
+          'sys.stdout.buffer.write(line * ({size} // ({line} + 1)))"'
+
+
+def run_process(cmd):
+    process = Process(cmd)
+    process.run()
+    return len(process.status.stdout)
+
+
+def run_legacy(cmd):
+    process = Popen(cmd, shell=True, stdin=PIPE, stdout=PIPE, stderr=PIPE)
+    process.stdin.close()
+
+    def enqueue_output(out, queue):
+        for line in iter(out.readline, b''):
+            queue.put(line)
+        out.close()
+
+    queue = Queue()
+    thread = Thread(target=enqueue_output, args=(process.stdout, queue))
+    thread.start()
+    process.wait()
+    thread.join()
+    process.stderr.close()
+
+    summary = ''
+    while True:
+        try:
+            summary += queue.get_nowait().decode('UTF-8')
+        except Empty:
+            break
+    return len(summary)
+
+
+def measure(run, cmd, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = run(cmd)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {'bytes': size, 'seconds': round(best, 4), 'mb_per_second': round(size / best / 1024 / 1024, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=100, help='size of output in MB')
+    parser.add_argument('--line', type=int, default=7, help='length of printed lines in bytes')
+    parser.add_argument('--repeat', type=int, default=3, help='number of runs, best one is reported')
+    args = parser.parse_args()
+
+    cmd = PRINTER.format(line=args.line, size=args.size * 1024 * 1024)
+    result = {
+        'benchmark': 'output_throughput',
+        'size_mb': args.size,
+        'line_bytes': args.line,
+        'process': measure(run_process, cmd, args.repeat),
+        'legacy': measure(run_legacy, cmd, args.repeat),
+    }
+    result['speedup'] = round(result['legacy']['seconds'] / result['process']['seconds'], 2)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
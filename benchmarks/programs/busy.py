@@ -0,0 +1,13 @@
+"""Burns given number of milliseconds of CPU time and prints CPU time it has used in milliseconds.
+
+Usage:
+    python3 busy.py MS
+
+"""
+import sys
+import time
+
+limit = int(sys.argv[1]) / 1000
+while time.process_time() < limit:
+    pass
+print(round(time.process_time() * 1000))
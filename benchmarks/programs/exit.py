@@ -0,0 +1 @@
+"""Exits immediately."""
@@ -0,0 +1,15 @@
+"""Allocates and touches given number of MB and prints its peak VMS and RSS in kB.
+
+Usage:
+    python3 hog.py MB
+
+"""
+import sys
+
+memory = bytearray(int(sys.argv[1]) * 1024 * 1024)
+for offset in range(0, len(memory), 4096):
+    memory[offset] = 1
+
+with open('/proc/self/status') as f:
+    status = dict(line.split(':', 1) for line in f)
+print(int(status['VmPeak'].split()[0]), int(status['VmHWM'].split()[0]))
@@ -0,0 +1,12 @@
+"""Prints given number of MB in lines of given length.
+
+Usage:
+    python3 printer.py MB [LINE]
+
+"""
+import sys
+
+size = int(sys.argv[1]) * 1024 * 1024
+length = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+line = b'x' * length + b'\n'
+sys.stdout.buffer.write(line * (size // len(line)))
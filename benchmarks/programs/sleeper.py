@@ -0,0 +1,10 @@
+"""Sleeps given number of milliseconds.
+
+Usage:
+    python3 sleeper.py MS
+
+"""
+import sys
+import time
+
+time.sleep(int(sys.argv[1]) / 1000)
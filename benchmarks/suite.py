@@ -0,0 +1,325 @@
+"""Overhead, throughput and accuracy of Carbon on bundled toy programs.
+
+Sections:
+    overhead    spawn-to-exit latency and supervisor CPU per execution of program exiting immediately,
+                for plain subprocess and every layer of Carbon (Process, Program, Engine, warm Engine)
+    throughput  executions per second of Engine at several numbers of workers
+    accuracy    time, CPU time and memory measured by Carbon against values known from programs themselves
+    output      throughput of collecting large STDOUT
+    pipeline    submissions per minute of mixed C++ and Python workload tested one by one and by Pipeline,
+                with utilization of compilation and execution stages (needs g++)
+
+All programs are in benchmarks/programs, so suite runs offline. Results are printed as JSON.
+
+Usage:
+    python benchmarks/suite.py [--sections NAME ...] [--runs N] [--workers N ...] [--submissions N] [--output FILE]
+
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'carbon'))
+
+from engine import Engine
+from limits import make_backend
+from pipeline import Pipeline
+from process import Process
+from program import Program
+from zygote import ZygotePool
+
+
+PROGRAMS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'programs')
+
+LIMITS = {
+    'time': 10000,
+    'vms': 1024 * 1024 * 1024,
+}
+
+COLD = {
+    'extension': 'py',
+    'compilation': {'need': False},
+    'execution': {'cmd': 'python3 {filename}', 'limits': LIMITS},
+}
+
+WARM = {
+    'extension': 'py',
+    'compilation': {'need': False},
+    'execution': {'cmd': 'python3 {filename}', 'zygote': {'cmd': 'python3', 'size': 2}, 'limits': LIMITS},
+}
+
+CPP = {
+    'extension': 'cpp',
+    'compilation': {'need': True, 'cmd': 'g++ -O2 -o {filename}.o {filename}', 'executable': '{filename}.o',
+                    'limits': dict(LIMITS, time=60000)},
+    'execution': {'cmd': '{filename}', 'limits': LIMITS},
+}
+
+# submissions burn CPU time given in input, sources are compiled again for every submission
+SOURCES = {
+    'cpp': ('#include <cstdio>\n#include <ctime>\n'
+            'int main() { int ms; scanf("%d", &ms); while (clock() < ms * (CLOCKS_PER_SEC / 1000)); puts("ok"); }\n',
+            CPP),
+    'py': ('import time\nlimit = int(input()) / 1000\nwhile time.process_time() < limit:\n    pass\nprint("ok")\n',
+           WARM),
+}
+
+
+def program(name, *args):
+    return ' '.join(['python3', os.path.join(PROGRAMS, name)] + [str(arg) for arg in args])
+
+
+def supervisor_cpu():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return (usage.ru_utime + usage.ru_stime) * 1000
+
+
+def summary(values):
+    values = sorted(values)
+    return {
+        'min': round(values[0], 3),
+        'median': round(statistics.median(values), 3),
+        'p95': round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+        'max': round(values[-1], 3),
+    }
+
+
+def measure(run, runs):
+    """Runs function several times, measuring its latency and CPU time of this process.
+
+    Args:
+        run (callable): Function running one execution
+        runs (int): Number of executions
+
+    Returns:
+        dict: Latency in milliseconds and supervisor CPU time per execution in milliseconds
+
+    """
+    run()  # warm up caches and pools
+    latencies = []
+    cpu = supervisor_cpu()
+    for _ in range(runs):
+        start = time.perf_counter()
+        run()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        'latency_ms': summary(latencies),
+        'supervisor_cpu_ms': round((supervisor_cpu() - cpu) / runs, 3),
+    }
+
+
+def overhead(args):
+    filename = os.path.join(PROGRAMS, 'exit.py')
+    cmd = program('exit.py')
+    engine = Engine(logging.CRITICAL)
+    pool = ZygotePool('python3', 2)
+    cold, warm = Program(filename, COLD), Program(filename, WARM, zygote_pool=pool)
+
+    try:
+        return {
+            'subprocess': measure(lambda: subprocess.run(cmd.split(), stdin=subprocess.DEVNULL,
+                                                         stdout=subprocess.PIPE, stderr=subprocess.PIPE), args.runs),
+            'process': measure(lambda: Process(cmd).run(), args.runs),
+            'program': measure(lambda: cold.execute(''), args.runs),
+            'program_warm': measure(lambda: warm.execute(''), args.runs),
+            'engine': measure(lambda: engine.test_program(filename, COLD, '', ''), args.runs),
+            'engine_warm': measure(lambda: engine.test_program(filename, WARM, '', ''), args.runs),
+        }
+    finally:
+        pool.close()
+        engine.close()
+
+
+def throughput(args):
+    filename = os.path.join(PROGRAMS, 'exit.py')
+    results = []
+    for workers in args.workers:
+        engine = Engine(logging.CRITICAL, workers=workers)
+        try:
+            for name, config in (('cold', COLD), ('warm', WARM)):
+                engine.test_suite(filename, config, [('', '')])  # warm up pools
+                cpu = supervisor_cpu()
+                start = time.perf_counter()
+                engine.test_suite(filename, config, [('', '')] * args.runs)
+                elapsed = time.perf_counter() - start
+                results.append({
+                    'mode': name,
+                    'workers': workers,
+                    'effective_workers': engine.workers,
+                    'executions_per_second': round(args.runs / elapsed, 2),
+                    'supervisor_cpu_ms': round((supervisor_cpu() - cpu) / args.runs, 3),
+                })
+        finally:
+            engine.close()
+    return results
+
+
+def accuracy(args):
+    baseline = Process(program('exit.py'))
+    baseline.run()
+
+    results = {'baseline': {'time': baseline.status.time, 'cpu_time': baseline.status.cpu_time}}
+
+    results['cpu'] = []
+    for ms in (100, 300, 1000):
+        process = Process(program('busy.py', ms))
+        process.run()
+        actual = int(process.status.stdout)
+        results['cpu'].append({
+            'burned_ms': ms,
+            'reported_by_program_ms': actual,
+            'cpu_time': process.status.cpu_time,
+            'cpu_time_error_ms': process.status.cpu_time - actual,
+            'time': process.status.time,
+            'time_error_ms': process.status.time - actual,
+        })
+
+    results['sleep'] = []
+    for ms in (100, 300, 1000):
+        process = Process(program('sleeper.py', ms))
+        process.run()
+        results['sleep'].append({
+            'slept_ms': ms,
+            'time': process.status.time,
+            'time_error_ms': process.status.time - ms,
+            'time_error_without_startup_ms': process.status.time - ms - baseline.status.time,
+        })
+
+    results['memory'] = []
+    for mb in (16, 64, 256):
+        for backend in ('polling', 'rlimit'):
+            process = Process(program('hog.py', mb), backend=make_backend(backend))
+            process.run()
+            vms, rss = (int(value) for value in process.status.stdout.split())
+            results['memory'].append({
+                'allocated_mb': mb,
+                'backend': backend,
+                'peak_vms_kb': vms,
+                'peak_rss_kb': rss,
+                'memory': process.status.memory,
+                'memory_error_kb': process.status.memory - (vms if backend == 'polling' else rss),
+                'peak_rss': process.status.peak_rss,
+                'peak_rss_error_kb': process.status.peak_rss - rss,
+            })
+    return results
+
+
+def output(args):
+    results = []
+    for size in (16, 128):
+        process = Process(program('printer.py', size))
+        cpu = supervisor_cpu()
+        start = time.perf_counter()
+        process.run()
+        elapsed = time.perf_counter() - start
+        results.append({
+            'size_mb': size,
+            'seconds': round(elapsed, 4),
+            'mb_per_second': round(process.status.stdout_size / elapsed / 1024 / 1024, 2),
+            'supervisor_cpu_ms': round(supervisor_cpu() - cpu, 3),
+        })
+    return results
+
+
+def pipeline(args):
+    directory = tempfile.mkdtemp(prefix='carbon-benchmark-')
+    tests = [('20', 'ok\n')] * 5
+    engine = Engine(logging.CRITICAL)
+
+    def submissions(mode):
+        for number in range(args.submissions):
+            extension = ('cpp', 'py')[number % 2]
+            source, config = SOURCES[extension]
+            filename = os.path.join(directory, '{0}{1}.{2}'.format(mode, number, extension))
+            with open(filename, 'w') as f:
+                f.write(source)
+            yield filename, config
+
+    try:
+        engine.test_suite(*next(submissions('warmup')), tests=tests)  # warm up pools
+
+        compilation = testing = 0
+        start = time.perf_counter()
+        for filename, config in submissions('serial'):
+            result = engine.test_suite(filename, config, tests)
+            compilation += result.phases['compilation'] / 1000
+            testing += result.phases['testing'] / 1000
+        elapsed = time.perf_counter() - start
+        serial = {
+            'seconds': round(elapsed, 3),
+            'submissions_per_minute': round(args.submissions / elapsed * 60, 2),
+            'utilization': {'compilation': round(compilation / elapsed, 3), 'execution': round(testing / elapsed, 3)},
+        }
+
+        start = time.perf_counter()
+        with Pipeline(engine, compilers=1, executors=1, memory_budget=2 * LIMITS['vms']) as stages:
+            futures = [stages.submit(filename, config, tests) for filename, config in submissions('pipeline')]
+            for future in futures:
+                future.result()
+            stats = stages.stats()
+        elapsed = time.perf_counter() - start
+        pipelined = {
+            'seconds': round(elapsed, 3),
+            'submissions_per_minute': round(args.submissions / elapsed * 60, 2),
+            'utilization': {'compilation': stats.compilation.utilization, 'execution': stats.execution.utilization},
+            'waited_seconds': {'compilation': stats.compilation.waited, 'execution': stats.execution.waited},
+        }
+        return {
+            'submissions': args.submissions,
+            'tests': len(tests),
+            'serial': serial,
+            'pipeline': pipelined,
+            'speedup': round(serial['seconds'] / pipelined['seconds'], 3),
+        }
+    finally:
+        engine.close()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+SECTIONS = {
+    'overhead': overhead,
+    'throughput': throughput,
+    'accuracy': accuracy,
+    'output': output,
+    'pipeline': pipeline,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sections', nargs='+', choices=sorted(SECTIONS), default=list(SECTIONS),
+                        help='sections to run')
+    parser.add_argument('--runs', type=int, default=50, help='number of executions per measurement')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='numbers of workers throughput is measured at')
+    parser.add_argument('--submissions', type=int, default=20,
+                        help='number of submissions of pipeline workload, half C++ and half Python')
+    parser.add_argument('--output', help='file results are written to in addition to STDOUT')
+    args = parser.parse_args()
+
+    result = {
+        'benchmark': 'suite',
+        'python': sys.version.split()[0],
+        'cpus': len(os.sched_getaffinity(0)),
+        'runs': args.runs,
+    }
+    for name in args.sections:
+        result[name] = SECTIONS[name](args)
+
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
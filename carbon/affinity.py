@@ -0,0 +1,66 @@
+import os
+from contextlib import contextmanager
+from queue import Queue
+
+
+class CorePool:
+    """Pool of CPU cores test runs are pinned to.
+
+    Every run takes a core from the pool for its whole duration, so no two runs share a core.
+    If isolate is set, supervisor threads of engine are kept off cores of the pool.
+
+    Attributes:
+        cpus (list): Cores test runs are pinned to
+        supervisor_cpus (set): Cores supervisor threads are pinned to, empty if they are not pinned
+
+    """
+
+    def __init__(self, cpus=None, isolate=False):
+        """Init method of pool.
+
+        Args:
+            cpus (Optional[iterable]): Cores test runs are pinned to, all cores available to engine if None
+            isolate (bool[default=False]): Keep supervisor threads off cores of the pool
+
+        Raises:
+            ValueError: If no cores are given or isolation leaves no cores for supervisor threads
+
+        """
+        available = os.sched_getaffinity(0)
+        self.cpus = sorted(cpus) if cpus is not None else sorted(available)
+        if not self.cpus:
+            raise ValueError('Core pool is empty')
+
+        self.supervisor_cpus = set()
+        if isolate:
+            self.supervisor_cpus = available - set(self.cpus)
+            if not self.supervisor_cpus:
+                raise ValueError('No cores are left for supervisor threads')
+
+        self._free = Queue()
+        for cpu in self.cpus:
+            self._free.put(cpu)
+
+    def __len__(self):
+        return len(self.cpus)
+
+    @contextmanager
+    def acquire(self):
+        """Takes free core from the pool, waiting for one if all cores are busy.
+
+        Yields:
+            int: Number of core
+
+        """
+        cpu = self._free.get()
+        try:
+            yield cpu
+        finally:
+            self._free.put(cpu)
+
+    def pin_supervisor(self):
+        """Pins calling thread to supervisor cores. Threads started by it inherit affinity.
+
+        """
+        if self.supervisor_cpus:
+            os.sched_setaffinity(0, self.supervisor_cpus)
@@ -0,0 +1,394 @@
+"""asyncio versions of Process, Program and Engine.
+
+One event loop supervises any number of executions: process exit is awaited through pidfd,
+pipes are read and written by loop callbacks and memory is sampled on loop timeouts,
+so no threads are started per execution.
+
+"""
+import asyncio
+import os
+import time
+
+from checkers import StreamingChecker
+from engine import Engine, TestResult
+from errors import *
+import logs
+from ordering import RUN_ALL
+from process import Process, PIPE_CHUNK
+from program import Program
+from verdicts import ACCEPTED, SKIPPED
+
+
+class AsyncProcess(Process):
+    """Process supervised by asyncio event loop.
+
+    Has the same arguments, attributes and status as Process, but run is a coroutine.
+
+    """
+
+    async def run(self):
+        """Runs process with configuration set.
+
+        """
+        try:
+            self.backend.prepare(self)
+        except Exception:
+            self._discard_zygote()
+            raise
+        try:
+            await self._run_async()
+        finally:
+            self.backend.cleanup(self)
+            self._close_files()
+            self._discard_zygote()
+
+    async def _run_async(self):
+        loop = asyncio.get_running_loop()
+        spawn = time.perf_counter()
+        # spawn waits for process to stop before exec, so it is done off event loop
+        psutil_process = await loop.run_in_executor(None, self._spawn)
+
+        readers = [self._read(loop, self.process.stdout, self._consume_stdout),
+                   self._read(loop, self.process.stderr, self._consume_stderr)]
+
+        rusage = None
+
+        # start timer
+        start = time.perf_counter()
+        self._phase('spawn', spawn, start)
+
+        # bootstrap finished, resume
+        self._resume(psutil_process)
+        self._phase('resume', start)
+
+        # write data to STDIN of program
+        writer = self._write(loop, self.process.stdin, self.input or b'')
+        if self.process.stdin is not None:
+            writer.add_done_callback(lambda _: self._phase('stdin', start))
+
+        # start main cycle, waiting until process exits or next memory sample is due
+        exited = loop.create_future()
+        pidfd = self._open_pidfd()
+        if pidfd is not None:
+            loop.add_reader(pidfd, lambda: exited.done() or exited.set_result(None))
+        deadline = self._deadline(start)
+        try:
+            while not self._sample_memory(psutil_process):
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                timeout = self._timeout(deadline, pidfd is not None)
+
+                await asyncio.wait([exited], timeout=timeout)
+
+                # process finished
+                rusage = self._reap()
+                if rusage is not None:
+                    self.status.returncode = self.process.returncode
+                    break
+        finally:
+            if pidfd is not None:
+                loop.remove_reader(pidfd)
+                os.close(pidfd)
+
+        # Time limit exceeded
+        if self.status.returncode is None:
+            if not self.status.memory_limit_exceeded:
+                self.status.time_limit_exceeded = True
+            self._kill()
+            rusage = self._reap(block=True)
+
+        reaped = time.perf_counter()
+        self._phase('run', start, reaped)
+        self._finish(start, rusage)
+
+        # program has finished without reading whole STDIN
+        if not writer.done() and self.process.stdin is not None:
+            loop.remove_writer(self.process.stdin.fileno())
+            self.process.stdin.close()
+
+        await asyncio.gather(*readers)
+        self._phase('drain', reaped)
+
+        # checker may read output file or run external checker (see ProgramChecker), which blocks
+        if self.checker is not None:
+            await loop.run_in_executor(None, self._save_output)
+        else:
+            self._save_output()
+        self._phase('total', spawn)
+
+    @staticmethod
+    def _read(loop, pipe, consume):
+        """Reads pipe until EOF from loop callbacks.
+
+        Args:
+            loop (AbstractEventLoop): Running event loop
+            pipe (file): Pipe to read from
+            consume (callable): Function every read chunk is passed to
+
+        Returns:
+            Future: Future resolved when EOF is reached
+
+        """
+        done = loop.create_future()
+        if pipe is None:
+            done.set_result(None)  # stream is connected to file
+            return done
+
+        fd = pipe.fileno()
+        os.set_blocking(fd, False)
+
+        def on_readable():
+            try:
+                chunk = os.read(fd, PIPE_CHUNK)
+            except BlockingIOError:
+                return
+            if chunk:
+                consume(chunk)
+                return
+            loop.remove_reader(fd)
+            pipe.close()
+            done.set_result(None)
+
+        loop.add_reader(fd, on_readable)
+        return done
+
+    @staticmethod
+    def _write(loop, pipe, data):
+        """Writes data to pipe from loop callbacks and closes it.
+
+        Args:
+            loop (AbstractEventLoop): Running event loop
+            pipe (file): Pipe to write to
+            data (bytes): Data to be written
+
+        Returns:
+            Future: Future resolved when all data is written or reader has closed pipe
+
+        """
+        done = loop.create_future()
+        if pipe is None:
+            done.set_result(None)  # stream is connected to file
+            return done
+
+        fd = pipe.fileno()
+        os.set_blocking(fd, False)
+        view = memoryview(data)
+
+        def on_writable():
+            nonlocal view
+            try:
+                view = view[os.write(fd, view[:PIPE_CHUNK]):]
+            except BlockingIOError:
+                return
+            except BrokenPipeError:
+                view = view[:0]  # program does not accept any STDIN
+            if not view:
+                loop.remove_writer(fd)
+                pipe.close()
+                done.set_result(None)
+
+        if view:
+            loop.add_writer(fd, on_writable)
+        else:
+            pipe.close()
+            done.set_result(None)
+        return done
+
+
+class AsyncProgram(Program):
+    """Program running compiler and itself in AsyncProcess.
+
+    Has the same arguments and attributes as Program, but compile and execute are coroutines.
+
+    """
+
+    process_class = AsyncProcess
+
+    async def compile(self):
+        """Compiles source and replaces source file with executable.
+
+        Raises:
+            CompilationFailedError: If compiler has threw some STDERR of has non-zero return code
+            CompilationTimeLimitExceededError: If compilation exceeded time limit
+            CompilationMemoryLimitExceededError: If compilation exceeded memory limit
+            FileDoesNotExistError: File named by filename arg is not found
+
+        """
+        compiler = self._prepare_compilation()
+        if compiler is not None:
+            await compiler.run()
+            self._finish_compilation(compiler)
+
+    async def execute(self, input, autoremove=False, cpus=None, checker=None, output_file=None, time_limit=None):
+        """Executes program and removes it if needed.
+
+        Args:
+            input (str|bytes|os.PathLike|int): Input to be passed in program's STDIN or file it is read from
+            autoremove (bool): Is autoremove of program needed
+            cpus (Optional[iterable]): Cores program is pinned to
+            checker (Optional[StreamingChecker]): Checker of STDOUT, program is killed on first difference
+            output_file (Optional[str|int|file]): File STDOUT is connected to, checker reads it after program exits
+            time_limit (Optional[int]): Time limit in milliseconds, time limit of execution config if None
+
+        Returns:
+            Status: Status object of Process class
+
+        Raises:
+            ProgramIsNotCompiled: If program is not compiled
+            ExecutionFailedError: If program has threw some STDERR or has non-zero return code
+            ExecutionTimeLimitExceededError: If execution exceeded time limit
+            ExecutionMemoryLimitExceededError: If execution exceeded memory limit
+            OutputLimitExceededError: If execution exceeded STDOUT or STDERR limit
+            FileDoesNotExistError: File named by filename parameter of class is not found
+
+        """
+        workspace = self.workspaces.acquire() if self.workspaces is not None else None
+        try:
+            # warm interpreter is waited for when all of them are busy, so it is acquired off event loop
+            program = await asyncio.get_running_loop().run_in_executor(
+                None, self._prepare_execution, input, cpus, checker, output_file, workspace, time_limit)
+            await program.run()
+        finally:
+            if workspace is not None:
+                self.workspaces.release(workspace)
+        return self._finish_execution(program, autoremove)
+
+
+class AsyncEngine(Engine):
+    """Engine testing programs in AsyncProgram.
+
+    Has the same arguments and results as Engine, but test_program and test_suite are coroutines.
+    Up to workers tests of one suite are executed concurrently, while any number of suites can be
+    tested concurrently in one event loop.
+
+    """
+
+    _cores_semaphore = None
+
+    async def test_program(self, filename, lang_config, input, output, autoremove=False, checker=StreamingChecker):
+        """Checking source code for passing one test.
+
+        Args:
+            filename (str): File name of source
+            lang_config (dict|LangConfig): Config for Program (see Program's class Attributes for structure)
+            input (str|os.PathLike): Input to be passed into program STDIN or path of file with it
+            output (str|os.PathLike): Output expected to be got from program or path of file with it
+            autoremove (bool[default=False]): Remove file after execution
+            checker (callable[default=StreamingChecker]): Checker factory (see test_suite)
+
+        Returns:
+            SuiteResult: Result of testing (see Engine.test_suite for structure)
+
+        Raises:
+            FileDoesNotExistError: File named by filename arg is not found
+
+        """
+        return await self.test_suite(filename, lang_config, [(input, output)], autoremove, checker)
+
+    async def test_suite(self, filename, lang_config, tests, autoremove=False, checker=StreamingChecker, mode=RUN_ALL,
+                         groups=None, problem=None):
+        """Checking source code for passing several tests, compiling it only once.
+
+        Args:
+            filename (str): File name of source
+            lang_config (dict|LangConfig): Config for Program (see Program's class Attributes for structure)
+            tests (list): Pairs of input to be passed into program STDIN and output expected to be got from program.
+                Tests given as paths (e.g. pathlib.Path) are connected to STDIN and memory-mapped by checker,
+                so they are never read into memory of engine, so are tests of TestPack (see testpack module).
+            autoremove (bool[default=False]): Remove file after all tests are executed
+            checker (callable[default=StreamingChecker]): Checker factory called as checker(output, input) for
+                every test, e.g. TokenChecker or functools.partial(FloatChecker, epsilon=1e-9) (see checkers module)
+            mode (str[default='run-all']): Mode of execution (see Engine.test_suite)
+            groups (Optional[list]): Group of every test in group mode
+            problem (Optional[str]): Name of problem tests are ordered and failures are recorded for
+
+        Returns:
+            SuiteResult: Result of testing (see Engine.test_suite for structure)
+
+        Raises:
+            FileDoesNotExistError: File named by filename arg is not found
+            ValueError: If mode is unknown or groups do not match tests
+
+        """
+        order = self._order_tests(tests, mode, groups, problem)
+        if self.calibrator is not None:
+            # calibration executes programs synchronously, so it is done off event loop and cached for suite
+            await asyncio.get_running_loop().run_in_executor(None, self.calibrate, lang_config)
+        program, result = self._prepare_suite(filename, lang_config, AsyncProgram)
+
+        self.logger.info('Compiling %s...', program.filename)
+        start = time.perf_counter()
+        try:
+            await program.compile()
+        except Exception as e:
+            return self._compilation_failed(result, e)
+        finally:
+            self._compiled(program, result, start)
+
+        semaphore = asyncio.Semaphore(self.workers)
+
+        stops = self._stops(len(order), mode, groups)
+        failed = set()
+        result.tests = [None] * len(order)
+
+        async def run(index):
+            async with semaphore:
+                # failure is checked after waiting for semaphore, so tests queued behind failed one are skipped
+                if stops is not None and stops[index] in failed:
+                    result.tests[index] = TestResult(verdict=SKIPPED, phases={})
+                    return
+                input, output = tests[index]
+                # every task has its own copy of context, so number of test does not leak into other tests
+                with logs.context(test=index + 1):
+                    self.logger.info('Executing %s on test %d...', program.filename, index + 1)
+                    test = result.tests[index] = await self._run_test(program, input, output, checker)
+                    self._test_finished(program, index + 1, test)
+                if stops is not None and test.verdict != ACCEPTED:
+                    failed.add(stops[index])
+
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*(run(index) for index in order))
+        finally:
+            self._finish_suite(program, result, autoremove, start, problem)
+
+        return result
+
+    async def _run_test(self, program, input, output, checker=StreamingChecker):
+        if self.core_pool is not None:
+            # semaphore is shared by all suites, so acquire never blocks event loop
+            if self._cores_semaphore is None:
+                self._cores_semaphore = asyncio.Semaphore(len(self.core_pool))
+            async with self._cores_semaphore:
+                with self.core_pool.acquire() as cpu:
+                    return await self._execute_test(program, input, output, {cpu}, checker)
+        return await self._execute_test(program, input, output, checker=checker)
+
+    async def _execute_test(self, program, input, output, cpus=None, checker=StreamingChecker):
+        key, entry, test = self._lookup_result(program, input, output, checker)
+        if test is not None:
+            return test
+
+        checkers = [self._make_checker(checker, input, output, key)]
+        runs = [await self._measure(program, input, cpus, checkers[0])]
+
+        test = runs[0]
+        if self.timing is not None:
+            spent = 0
+            while self._rerun_needed(program, runs, spent):
+                checkers.append(self._make_checker(checker, input, output, key))
+                runs.append(await self._measure(program, input, cpus, checkers[-1]))
+                spent += runs[-1].time or 0
+            test = self._timed(program, runs)
+
+        if key is not None:
+            self._store_result(program, key, entry, test, self._checker_of(test, runs, checkers))
+        return test
+
+    async def _measure(self, program, input, cpus, checker):
+        try:
+            status = await program.execute(input, cpus=cpus, checker=checker, time_limit=self._time_limit(program))
+        except (ExecutionTimeLimitExceededError, ExecutionMemoryLimitExceededError, OutputLimitExceededError,
+                ExecutionFailedError) as e:
+            return self._judge(e.status, e)
+        return self._judge(status)
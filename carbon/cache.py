@@ -0,0 +1,524 @@
+import fcntl
+import functools
+import hashlib
+import json
+import os
+import os.path
+import random
+import shlex
+import shutil
+import subprocess
+import threading
+import uuid
+
+from checkers import Mismatch
+from utils import Record
+
+
+# file name of source in STDERR of cached compilations, it is not printed by compilers
+SOURCE_PLACEHOLDER = '\0source\0'
+
+
+class CompilationEntry(Record):
+    """Cached result of compilation (see CompilationCache.get for structure).
+
+    """
+
+    __slots__ = ('ok', 'returncode', 'stderr')
+
+
+class CachedResult(Record):
+    """Cached result of test (see ResultCache.get for structure).
+
+    """
+
+    __slots__ = ('verdict', 'time', 'cpu_time', 'memory', 'mismatch', 'output_digest')
+
+
+class CompilationCache:
+    """On-disk content-addressed cache of compilation results.
+
+    Entries are keyed by hash of source bytes, compilation command and compiler version.
+    Cache stores executables of successful compilations and return code with STDERR of failed ones.
+    Executables are copied out of cache, so program can not change cached file, and file name of source
+    in STDERR is replaced with file name of source being compiled.
+    Entries are written to temporary directory and renamed into place, so several engine processes
+    can share one cache. Least recently used entries are evicted when cache grows above max_size.
+
+    Layout of cache directory:
+        root/
+            lock                        # lock file taken by eviction
+            tmp/                        # entries being written or removed
+            entries/<key>/
+                executable              # compiled program, absent for failed compilation
+                meta                    # JSON with returncode and stderr
+
+    Attributes:
+        root (str): Path of cache directory
+        max_size (int): Maximum size of cache in bytes
+
+    """
+
+    def __init__(self, root, max_size=1024 * 1024 * 1024):
+        """Init method of cache.
+
+        Args:
+            root (str): Path of cache directory, created if it does not exist
+            max_size (int[default=1GiB]): Maximum size of cache in bytes
+
+        """
+        self.root, self.max_size = root, max_size
+        self._versions = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(self.root, 'entries'), exist_ok=True)
+        os.makedirs(os.path.join(self.root, 'tmp'), exist_ok=True)
+        self._size = sum(size for _, size, _ in self._entries())
+
+    def _entry(self, key):
+        return os.path.join(self.root, 'entries', key)
+
+    def _entries(self):
+        entries = []
+        for key in os.listdir(os.path.join(self.root, 'entries')):
+            entry = self._entry(key)
+            try:
+                size = sum(os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry))
+                entries.append((os.path.getmtime(entry), size, key))
+            except OSError:
+                continue
+        return entries
+
+    def _tmp(self):
+        return os.path.join(self.root, 'tmp', uuid.uuid4().hex)
+
+    def compiler_version(self, cmd):
+        """Gets version of compiler used by command.
+
+        Args:
+            cmd (str): Compilation command, first word of it is compiler
+
+        Returns:
+            str: Output of compiler's --version, empty if compiler does not support it
+
+        """
+        compiler = shlex.split(cmd)[0]
+        path = shutil.which(compiler) or compiler
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+
+        if (path, mtime) not in self._versions:
+            try:
+                version = subprocess.run([path, '--version'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                         timeout=10).stdout.decode('UTF-8', 'replace')
+            except (OSError, subprocess.SubprocessError):
+                version = ''
+            self._versions[(path, mtime)] = version
+        return self._versions[(path, mtime)]
+
+    def key(self, filename, compilation):
+        """Computes key of source compiled by given configuration.
+
+        Args:
+            filename (str): File name of source
+            compilation (Compilation): Compilation section of lang config
+
+        Returns:
+            str: Key of cache entry
+
+        """
+        digest = hashlib.sha256()
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                digest.update(chunk)
+
+        # file name is left as placeholder, so same source submitted under different names shares entry
+        cmd = str(compilation.cmd)
+        for part in (cmd, compilation.executable, self.compiler_version(cmd)):
+            digest.update(b'\0' + part.encode('UTF-8'))
+        return digest.hexdigest()
+
+    def get(self, key, executable, source=None):
+        """Looks up cache entry, placing copy of cached executable to given path on hit.
+
+        Args:
+            key (str): Key of cache entry
+            executable (str): Path executable should be placed to
+            source (Optional[str]): File name of source as compiler is given it, put into STDERR of entry
+
+        Returns:
+            Optional[CompilationEntry]: None on miss, otherwise entry with following structure
+                {
+                    "ok": True,             # True if compilation has succeeded
+                    "returncode": 0,        # return code of compiler
+                    "stderr": None          # STDERR of compiler
+                }
+
+        """
+        entry = self._entry(key)
+        try:
+            with open(os.path.join(entry, 'meta')) as f:
+                meta = CompilationEntry(**json.load(f))
+            if meta.ok:
+                if os.path.lexists(executable):
+                    os.remove(executable)
+                # executable is not linked, so running program does not share inode with cache
+                shutil.copy2(os.path.join(entry, 'executable'), executable)
+            if meta.stderr is not None and source is not None:
+                meta.stderr = meta.stderr.replace(SOURCE_PLACEHOLDER, source)
+            # mark entry as recently used
+            os.utime(entry)
+        except (OSError, ValueError, TypeError):
+            return None  # entry does not exist, has just been evicted or is written by other version
+        return meta
+
+    def put(self, key, executable=None, returncode=0, stderr=None, source=None):
+        """Stores result of compilation.
+
+        Args:
+            key (str): Key of cache entry
+            executable (Optional[str]): Path of compiled executable, None if compilation has failed
+            returncode (int[default=0]): Return code of compiler
+            stderr (Optional[str]): STDERR of compiler
+            source (Optional[str]): File name of source as compiler has been given it, replaced in STDERR by
+                file name of source of later hit
+
+        """
+        if stderr is not None and source:
+            stderr = stderr.replace(SOURCE_PLACEHOLDER, '').replace(source, SOURCE_PLACEHOLDER)
+        tmp = self._tmp()
+        os.mkdir(tmp)
+        size = 0
+        try:
+            if executable is not None:
+                shutil.copy2(executable, os.path.join(tmp, 'executable'))
+            with open(os.path.join(tmp, 'meta'), 'w') as f:
+                meta = CompilationEntry(ok=executable is not None, returncode=returncode, stderr=stderr)
+                json.dump(meta.to_dict(), f)
+            size = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp))
+            os.rename(tmp, self._entry(key))
+        except OSError:
+            size = 0  # entry has been stored by another process
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        # directory is scanned only when tracked size exceeds limit, not on every put
+        with self._lock:
+            self._size += size
+            full = self._size > self.max_size
+        if full:
+            self.evict()
+
+    def invalidate(self, key):
+        """Removes cache entry.
+
+        Args:
+            key (str): Key of cache entry
+
+        """
+        tmp = self._tmp()
+        try:
+            os.rename(self._entry(key), tmp)
+        except OSError:
+            return
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    def evict(self):
+        """Removes least recently used entries until cache fits max_size.
+
+        """
+        with open(os.path.join(self.root, 'lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, key in sorted(entries):
+                # evict down to 90% of max_size, so eviction does not run on every put
+                if total <= self.max_size * 0.9:
+                    break
+                self.invalidate(key)
+                total -= size
+
+            # size of entries put by other processes is taken into account here
+            with self._lock:
+                self._size = total
+
+
+def _describe(checker):
+    """Describes checker factory, so changed checker or its options give another key.
+
+    Args:
+        checker (callable): Checker factory, e.g. class or functools.partial of it
+
+    Returns:
+        str: Description of checker
+
+    """
+    if isinstance(checker, functools.partial):
+        return '{0}({1!r}, {2!r})'.format(_describe(checker.func), checker.args, sorted(checker.keywords.items()))
+    return '{0}.{1}'.format(getattr(checker, '__module__', ''), getattr(checker, '__qualname__', repr(checker)))
+
+
+class ResultCache:
+    """On-disk cache of results of tests, so deterministic reruns are not executed again.
+
+    Entries are keyed by hash of executable and its command, input, limits, checker, expected output and
+    settings of engine results depend on.
+    Entry stores verdict, time, memory and digest of STDOUT of program. Given share of hits is executed
+    anyway and compared with cached entry, so nondeterministic programs are detected and not cached.
+    Least recently used entries are evicted when cache grows above max_size.
+
+    Layout of cache directory:
+        root/
+            lock                        # lock file taken by eviction
+            tmp/                        # entries being written
+            entries/<executable>/<key>  # JSON with result, grouped by hash of executable
+
+    Attributes:
+        root (str): Path of cache directory
+        max_size (int): Maximum size of cache in bytes
+        verify (float): Share of hits which are executed again to check that result is the same, from 0 to 1
+
+    """
+
+    # maximum number of digests of files kept in memory
+    DIGESTS_SIZE = 4096
+
+    def __init__(self, root, max_size=256 * 1024 * 1024, verify=0.0):
+        """Init method of cache.
+
+        Args:
+            root (str): Path of cache directory, created if it does not exist
+            max_size (int[default=256MiB]): Maximum size of cache in bytes
+            verify (float[default=0.0]): Share of hits which are executed again, e.g. 0.05 to verify 5% of them
+
+        """
+        self.root, self.max_size, self.verify = root, max_size, verify
+        self._lock = threading.Lock()
+        self._digests = {}
+
+        os.makedirs(os.path.join(self.root, 'entries'), exist_ok=True)
+        os.makedirs(os.path.join(self.root, 'tmp'), exist_ok=True)
+        self._size = sum(size for _, size, _ in self._entries())
+
+    def _entry(self, key):
+        return os.path.join(self.root, 'entries', key)
+
+    def _file_digest(self, path):
+        """Computes hash of file, hashes are kept until file is changed.
+
+        Args:
+            path (str|os.PathLike): Path of file
+
+        Returns:
+            str: Hash of content of file
+
+        """
+        info = os.stat(path)
+        signature = (info.st_ino, info.st_size, info.st_mtime_ns)
+        path = os.path.abspath(path)
+        with self._lock:
+            cached = self._digests.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        with self._lock:
+            if len(self._digests) >= self.DIGESTS_SIZE:
+                self._digests.clear()
+            self._digests[path] = (signature, digest.hexdigest())
+        return digest.hexdigest()
+
+    def _digest(self, data):
+        if isinstance(data, os.PathLike):
+            return self._file_digest(data)
+        return hashlib.sha256(data.encode('UTF-8') if isinstance(data, str) else data).hexdigest()
+
+    def _checker_digest(self, checker):
+        """Computes hash of files of checker program, so checker rebuilt in place gives another key.
+
+        Args:
+            checker (callable): Checker factory, command of checker program is taken from its cmd keyword
+
+        Returns:
+            str: Hash of files named in command of checker, empty if checker is not a program
+
+        """
+        cmd = checker.keywords.get('cmd') if isinstance(checker, functools.partial) else None
+        if not isinstance(cmd, str):
+            return ''
+        digest = hashlib.sha256()
+        for word in shlex.split(cmd):
+            if '{' in word:
+                continue  # placeholder of test files
+            # executable is looked up in PATH like shell does, arguments like scripts are relative paths
+            path = word if os.sep in word else (shutil.which(word) or word)
+            if os.path.isfile(path):
+                digest.update(word.encode('UTF-8') + b'\0' + self._file_digest(path).encode('UTF-8') + b'\0')
+        return digest.hexdigest()
+
+    def key(self, executable, execution, input, output, checker, settings=None):
+        """Computes key of test.
+
+        Args:
+            executable (str): File name of executed program
+            execution (Execution): Execution section of lang config
+            input (str|bytes|os.PathLike): Input of test or path of file with it
+            output (str|bytes|os.PathLike): Expected output or path of file with it
+            checker (callable): Checker factory, files of checker program (see ProgramChecker) are hashed too
+            settings (Optional[dict]): Other settings result depends on, e.g. timing policy of engine
+
+        Returns:
+            str: Key of cache entry
+
+        """
+        test = hashlib.sha256()
+        for part in (str(execution.cmd), json.dumps(execution.limits.to_dict(), sort_keys=True),
+                     self._digest(input), self._digest(output), _describe(checker),
+                     self._checker_digest(checker), json.dumps(settings, sort_keys=True)):
+            test.update(part.encode('UTF-8') + b'\0')
+        return '{0}/{1}'.format(self._file_digest(executable), test.hexdigest())
+
+    def get(self, key):
+        """Looks up cache entry.
+
+        Args:
+            key (str): Key of cache entry
+
+        Returns:
+            Optional[CachedResult]: None on miss, otherwise entry with following structure
+                {
+                    "verdict": "OK",                # verdict of test
+                    "time": 15,                     # execution time in milliseconds
+                    "cpu_time": 12,                 # CPU time in milliseconds
+                    "memory": 5120.0,               # maximum memory use in kB
+                    "mismatch": None,               # first difference of STDOUT for WA (see Mismatch)
+                    "output_digest": "9f86..."      # hash of STDOUT read by checker
+                }
+
+        """
+        entry = self._entry(key)
+        try:
+            with open(entry) as f:
+                result = CachedResult(**json.load(f))
+            if result.mismatch is not None:
+                result.mismatch = Mismatch(**result.mismatch)
+            # mark entry as recently used
+            os.utime(entry)
+        except (OSError, ValueError, TypeError):
+            return None  # entry does not exist or is written by other version
+        return result
+
+    def put(self, key, result):
+        """Stores result of test.
+
+        Args:
+            key (str): Key of cache entry
+            result (CachedResult): Entry (see get for structure)
+
+        """
+        data = json.dumps(result.to_dict()).encode('UTF-8')
+        tmp = os.path.join(self.root, 'tmp', uuid.uuid4().hex)
+        try:
+            os.makedirs(os.path.dirname(self._entry(key)), exist_ok=True)
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.rename(tmp, self._entry(key))
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+
+        with self._lock:
+            self._size += len(data)
+            full = self._size > self.max_size
+        if full:
+            self.evict()
+
+    def sample(self):
+        """Decides whether hit should be verified by executing test again.
+
+        Returns:
+            bool: True if hit should be verified
+
+        """
+        return self.verify > 0 and random.random() < self.verify
+
+    def invalidate(self, key):
+        """Removes cache entry.
+
+        Args:
+            key (str): Key of cache entry
+
+        """
+        try:
+            os.remove(self._entry(key))
+        except OSError:
+            pass
+
+    def invalidate_executable(self, executable):
+        """Removes all entries of executable, e.g. after it has been found nondeterministic.
+
+        Args:
+            executable (str): File name of executable
+
+        """
+        group = self._entry(self._file_digest(executable))
+        size = 0
+        for name in os.listdir(group) if os.path.isdir(group) else ():
+            try:
+                size += os.path.getsize(os.path.join(group, name))
+            except OSError:
+                continue
+        shutil.rmtree(group, ignore_errors=True)
+        with self._lock:
+            self._size = max(self._size - size, 0)
+
+    def clear(self):
+        """Removes all entries.
+
+        """
+        for group in os.listdir(os.path.join(self.root, 'entries')):
+            shutil.rmtree(self._entry(group), ignore_errors=True)
+        with self._lock:
+            self._size = 0
+
+    def _entries(self):
+        entries = []
+        for group in os.listdir(os.path.join(self.root, 'entries')):
+            try:
+                names = os.listdir(self._entry(group))
+            except OSError:
+                continue
+            for name in names:
+                key = '{0}/{1}'.format(group, name)
+                try:
+                    info = os.stat(self._entry(key))
+                except OSError:
+                    continue
+                entries.append((info.st_mtime, info.st_size, key))
+        return entries
+
+    def evict(self):
+        """Removes least recently used entries until cache fits max_size.
+
+        """
+        with open(os.path.join(self.root, 'lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, key in sorted(entries):
+                # evict down to 90% of max_size, so eviction does not run on every put
+                if total <= self.max_size * 0.9:
+                    break
+                self.invalidate(key)
+                total -= size
+
+            with self._lock:
+                self._size = total
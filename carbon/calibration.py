@@ -0,0 +1,139 @@
+"""Calibration of startup overhead of langs.
+
+Measured time and memory of program include startup of interpreter or runtime, which is large for interpreted
+langs and differs between machines. Calibrator executes empty program of lang several times with the same
+config, warm interpreters included, and keeps median time and memory as baseline of lang. Engine reports
+baseline in results and, if subtraction is enabled, programs get limits extended by baseline and baseline is
+subtracted from their time and memory, so limits bound the program itself on any lang and machine.
+
+"""
+import os
+import os.path
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from config import LangConfig
+from errors import *
+from program import Program
+from utils import FrozenRecord
+
+
+# empty programs by extension of source
+EMPTY_PROGRAMS = {
+    'c': 'int main(void) { return 0; }\n',
+    'cpp': 'int main() {}\n',
+    'py': '',
+}
+
+
+class Calibration(FrozenRecord):
+    """Startup baseline of lang.
+
+    Attributes:
+        time (float): Median execution time of empty program in milliseconds
+        memory (float): Median memory of empty program in kB
+        runs (int): Number of runs baseline is computed from
+        measured (float): Time of calibration as UNIX timestamp
+
+    """
+
+    __slots__ = ('time', 'memory', 'runs', 'measured')
+
+
+class Calibrator:
+    """Keeps startup baselines of langs, calibrating them on first use and when they get stale.
+
+    Attributes:
+        runs (int): Number of runs of empty program
+        refresh (Optional[float]): Seconds after which baseline is calibrated again, never if None
+        subtract (bool): Subtract baseline from time and memory of programs and extend their limits by it
+        programs (dict): Sources of empty programs by extension
+
+    """
+
+    def __init__(self, runs=10, refresh=3600.0, subtract=False, programs=None):
+        """Init method of calibrator.
+
+        Args:
+            runs (int[default=10]): Number of runs of empty program
+            refresh (Optional[float][default=3600.0]): Seconds after which baseline is calibrated again
+            subtract (bool[default=False]): Subtract baseline from time and memory of programs
+            programs (Optional[dict]): Sources of empty programs by extension, added to EMPTY_PROGRAMS
+
+        """
+        self.runs, self.refresh, self.subtract = runs, refresh, subtract
+        self.programs = dict(EMPTY_PROGRAMS, **(programs or {}))
+        self._lock = threading.Lock()
+        self._calibrations = {}
+        self._locks = {}
+
+    def get(self, config, zygote_pool=None):
+        """Gets baseline of lang, calibrating it if it is missing or stale.
+
+        Args:
+            config (dict|LangConfig): Lang config
+            zygote_pool (Optional[ZygotePool]): Warm interpreters programs of lang are executed in
+
+        Returns:
+            Optional[Calibration]: Baseline, None if there is no empty program for lang or it can not be executed
+
+        """
+        config = LangConfig.load(config)
+        if config.extension not in self.programs:
+            return None
+
+        with self._lock:
+            if config in self._calibrations and not self._stale(self._calibrations[config]):
+                return self._calibrations[config]
+            lock = self._locks.setdefault(config, threading.Lock())
+
+        # lang is calibrated once even if many suites need it at the same time
+        with lock:
+            with self._lock:
+                calibration = self._calibrations.get(config)
+            if config not in self._calibrations or self._stale(calibration):
+                calibration = self.calibrate(config, zygote_pool)
+                with self._lock:
+                    self._calibrations[config] = calibration
+        return calibration
+
+    def _stale(self, calibration):
+        # langs which have failed to calibrate are not calibrated again
+        return calibration is not None and self.refresh is not None and \
+            time.time() - calibration.measured >= self.refresh
+
+    def calibrate(self, config, zygote_pool=None):
+        """Executes empty program of lang and computes baseline.
+
+        Args:
+            config (dict|LangConfig): Lang config
+            zygote_pool (Optional[ZygotePool]): Warm interpreters programs of lang are executed in
+
+        Returns:
+            Optional[Calibration]: Baseline, None if empty program can not be compiled or executed
+
+        """
+        config = LangConfig.load(config)
+        directory = tempfile.mkdtemp(prefix='carbon-calibration-')
+        try:
+            # commands like "./{filename}" need relative file name
+            filename = os.path.relpath(os.path.join(directory, 'empty.' + config.extension))
+            with open(filename, 'w') as f:
+                f.write(self.programs[config.extension])
+
+            program = Program(filename, config, zygote_pool=zygote_pool)
+            program.compile()
+            statuses = [program.execute('') for _ in range(self.runs)]
+        except (CompilationFailedError, CompilationTimeLimitExceededError, CompilationMemoryLimitExceededError,
+                ExecutionFailedError, ExecutionTimeLimitExceededError, ExecutionMemoryLimitExceededError,
+                OutputLimitExceededError):
+            return None
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        return Calibration(time=statistics.median(status.time for status in statuses),
+                           memory=statistics.median(status.memory or 0 for status in statuses),
+                           runs=len(statuses), measured=time.time())
@@ -0,0 +1,515 @@
+"""Checkers comparing STDOUT of program with expected output.
+
+Checker is created by engine for every test as checker(expected, input) and is fed with chunks
+of STDOUT while program is running. Built-in checkers keep only bounded part of output in memory,
+custom checker programs are supported by ProgramChecker.
+
+"""
+import hashlib
+import math
+import mmap
+import os
+import re
+import tempfile
+
+from utils import Record
+from process import Process
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# number of bytes of expected output split into tokens or lines at once
+BLOCK_SIZE = 1024 * 1024
+
+# minimal number of tokens compared as floats with NumPy, smaller batches are compared one by one
+VECTORIZE_THRESHOLD = 64
+
+WHITESPACE = b' \t\n\r\x0b\x0c'
+
+TOKEN = re.compile(rb'[^ \t\n\r\x0b\x0c]+')
+
+SEPARATOR = re.compile(rb'[ \t\n\r\x0b\x0c]')
+
+
+class Mismatch(Record):
+    """Difference of output from expected one found by checker.
+
+    Attributes:
+        offset (Optional[int]): Offset in bytes of first differing byte, None if checker program has rejected output
+        line (Optional[int]): Number of line of first differing byte, starting from 1
+        message (Optional[str]): STDOUT or STDERR of checker program, None for built-in checkers
+
+    """
+
+    __slots__ = ('offset', 'line', 'message')
+
+
+def _map(path):
+    """Maps file into memory read-only.
+
+    Args:
+        path (os.PathLike): Path of file
+
+    Returns:
+        bytes|mmap: Content of file
+
+    """
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return b''  # empty files can not be mapped
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _load(expected):
+    """Gets bytes-like object with expected output.
+
+    Args:
+        expected (str|bytes|os.PathLike): Expected output or path of file with it, which is memory-mapped
+
+    Returns:
+        bytes|mmap: Expected output
+
+    """
+    if isinstance(expected, os.PathLike):
+        return _map(expected)
+    return expected.encode('UTF-8') if isinstance(expected, str) else expected
+
+
+class StreamingChecker:
+    """Compares STDOUT of program with expected output while program is running.
+
+    Chunks of STDOUT are compared with corresponding part of expected output as they arrive,
+    so Process can kill program on first difference instead of waiting for it to finish.
+    Output itself is not kept.
+
+    Attributes:
+        expected (bytes|mmap): Expected output
+        offset (int): Number of bytes compared so far
+        line (int): Number of line at offset, starting from 1
+        mismatch (Optional[Mismatch]): First difference with following structure, None if there is no difference
+            {
+                "offset": 10,           # offset in bytes of first differing byte
+                "line": 2,              # number of line of first differing byte, starting from 1
+                "message": None
+            }
+
+    """
+
+    def __init__(self, expected, input=None):
+        """Init method of checker.
+
+        Args:
+            expected (str|bytes|os.PathLike): Expected output or path of file with it, which is memory-mapped
+            input (Optional[str|bytes|os.PathLike]): Input of test, not used by this checker
+
+        """
+        self.expected = _load(expected)
+        self._view = memoryview(self.expected)
+        self.offset = 0
+        self.line = 1
+        self.mismatch = None
+
+    def feed(self, chunk):
+        """Compares next chunk of output.
+
+        Args:
+            chunk (bytes): Next chunk of output
+
+        Returns:
+            bool: False if output differs from expected one or is longer than it
+
+        """
+        if self.mismatch is not None:
+            return False
+
+        end = self.offset + len(chunk)
+        expected = self._view[self.offset:end]
+        if expected == chunk:
+            self.offset = end
+            self.line += chunk.count(b'\n')
+            return True
+
+        # find first differing byte, it is past expected output if program has printed too much
+        index = 0
+        while index < len(expected) and expected[index] == chunk[index]:
+            index += 1
+        self._fail(self.offset + index, self.line + chunk.count(b'\n', 0, index))
+        return False
+
+    def finish(self):
+        """Checks that whole expected output has been printed.
+
+        Returns:
+            bool: True if output is equal to expected one
+
+        """
+        if self.mismatch is None and self.offset < len(self.expected):
+            self._fail(self.offset, self.line)
+        return self.mismatch is None
+
+    def _fail(self, offset, line):
+        self.mismatch = Mismatch(offset=offset, line=line)
+
+
+class TokenChecker(StreamingChecker):
+    """Compares whitespace-separated tokens of STDOUT with tokens of expected output.
+
+    Output is split into tokens in bulk with bytes.split, token cut by end of chunk is kept until next one.
+    Expected output is split block by block, so memory used by checker does not depend on size of output.
+    Mismatch points to first differing token.
+
+    """
+
+    _boundary = SEPARATOR
+
+    def __init__(self, expected, input=None):
+        """Init method of checker.
+
+        Args:
+            expected (str|bytes|os.PathLike): Expected output or path of file with it, which is memory-mapped
+            input (Optional[str|bytes|os.PathLike]): Input of test, not used by this checker
+
+        """
+        super(TokenChecker, self).__init__(expected, input)
+        self._tail = b''
+        self._position = 0
+        self._items = []
+        self._index = 0
+
+    def feed(self, chunk):
+        if self.mismatch is not None:
+            return False
+
+        data = self._tail + chunk if self._tail else chunk
+        cut = self._cut(data)
+        self._tail = data[cut:]
+        return self._consume(data[:cut])
+
+    def finish(self):
+        if self.mismatch is None and self._tail:
+            tail, self._tail = self._tail, b''
+            self._consume(tail, complete=False)
+
+        # only ignorable items may be left in expected output
+        while self.mismatch is None:
+            items = self._take(VECTORIZE_THRESHOLD)
+            if not items:
+                break
+            if not all(self._ignorable(item) for item in items):
+                self._fail(self.offset, self.line)
+        return self.mismatch is None
+
+    @staticmethod
+    def _cut(data):
+        """Finds end of last complete token.
+
+        Args:
+            data (bytes): Output
+
+        Returns:
+            int: Offset right after last whitespace byte, 0 if there is none
+
+        """
+        return max(data.rfind(bytes([byte])) for byte in WHITESPACE) + 1
+
+    @staticmethod
+    def _split(data):
+        return data.split()
+
+    @staticmethod
+    def _locate(data, index):
+        """Finds offset of item in data.
+
+        Args:
+            data (bytes): Output, which starts at item boundary
+            index (int): Number of item, starting from 0
+
+        Returns:
+            int: Offset of item, length of data if there are less items
+
+        """
+        for number, match in enumerate(TOKEN.finditer(data)):
+            if number == index:
+                return match.start()
+        return len(data)
+
+    @staticmethod
+    def _ignorable(item):
+        return not item
+
+    def _take(self, count):
+        """Takes next items of expected output.
+
+        Args:
+            count (int): Number of items
+
+        Returns:
+            list: Items, fewer than count if expected output is over
+
+        """
+        while len(self._items) - self._index < count and self._position < len(self.expected):
+            end = min(self._position + BLOCK_SIZE, len(self.expected))
+            if end < len(self.expected):
+                end = self._cut(self._view[self._position:end].tobytes()) + self._position
+                if end == self._position:
+                    # block is one huge item, it is taken up to next boundary
+                    match = self._boundary.search(self.expected, self._position + BLOCK_SIZE)
+                    end = match.end() if match else len(self.expected)
+            block = self._view[self._position:end].tobytes()
+            self._position = end
+            self._items = self._items[self._index:] + self._split(block)
+            self._index = 0
+
+        items = self._items[self._index:self._index + count]
+        self._index += len(items)
+        return items
+
+    def _compare(self, items, expected):
+        """Finds first differing item.
+
+        Args:
+            items (list): Items of output
+            expected (list): Items of expected output, not longer than items
+
+        Returns:
+            Optional[int]: Index of first differing item, None if all of expected items are equal to output ones
+
+        """
+        if items[:len(expected)] == expected:
+            return None
+        for index, (item, expected_item) in enumerate(zip(items, expected)):
+            if item != expected_item:
+                return index
+        return None
+
+    def _consume(self, data, complete=True):
+        """Compares complete items of output.
+
+        Args:
+            data (bytes): Output ending at item boundary
+            complete (bool[default=True]): Data ends with separator, so last item can not be continued
+
+        Returns:
+            bool: False if output differs from expected one
+
+        """
+        if not data:
+            return True  # chunk has not completed any item, splitting it would give phantom empty line
+        if complete and self._index == len(self._items) and self._view[self._position:self._position + len(data)] == data:
+            # output is byte-identical to expected one so far, so it is not split into items
+            self._position += len(data)
+            self.offset += len(data)
+            self.line += data.count(b'\n')
+            return True
+
+        items = self._split(data)
+        expected = self._take(len(items))
+        index = self._compare(items, expected) if expected else None
+
+        # program has printed more than expected, only ignorable items may follow
+        if index is None and len(expected) < len(items):
+            index = next((i for i in range(len(expected), len(items)) if not self._ignorable(items[i])), None)
+
+        if index is not None:
+            offset = self._locate(data, index)
+            self._fail(self.offset + offset, self.line + data.count(b'\n', 0, offset))
+            return False
+
+        self.offset += len(data)
+        self.line += data.count(b'\n')
+        return True
+
+
+class WhitespaceChecker(TokenChecker):
+    """Compares STDOUT with expected output line by line, ignoring amount of whitespace.
+
+    Leading and trailing whitespace of lines is ignored and runs of whitespace inside them are equal
+    to each other, so are trailing empty lines of output. Mismatch points to first differing line.
+
+    """
+
+    _boundary = re.compile(rb'\n')
+
+    @staticmethod
+    def _cut(data):
+        return data.rfind(b'\n') + 1
+
+    @staticmethod
+    def _split(data):
+        lines = data.split(b'\n')
+        if data.endswith(b'\n'):
+            lines.pop()
+        return [b' '.join(line.split()) for line in lines]
+
+    @staticmethod
+    def _locate(data, index):
+        offset = 0
+        for _ in range(index):
+            offset = data.find(b'\n', offset) + 1
+            if not offset:
+                return len(data)
+        return offset
+
+
+class FloatChecker(TokenChecker):
+    """Compares tokens of STDOUT with tokens of expected output, numbers are compared with tolerance.
+
+    Numbers are equal if absolute or relative difference between them is at most epsilon, other tokens
+    are compared exactly. Batches of tokens are parsed and compared with NumPy if it is installed.
+
+    Attributes:
+        epsilon (float): Maximum absolute or relative difference of equal numbers
+
+    """
+
+    def __init__(self, expected, input=None, epsilon=1e-6):
+        """Init method of checker.
+
+        Args:
+            expected (str|bytes|os.PathLike): Expected output or path of file with it, which is memory-mapped
+            input (Optional[str|bytes|os.PathLike]): Input of test, not used by this checker
+            epsilon (float[default=1e-6]): Maximum absolute or relative difference of equal numbers
+
+        """
+        super(FloatChecker, self).__init__(expected, input)
+        self.epsilon = epsilon
+
+    def _equal(self, item, expected):
+        if item == expected:
+            return True
+        try:
+            return math.isclose(float(item), float(expected), rel_tol=self.epsilon, abs_tol=self.epsilon)
+        except ValueError:
+            return False  # token is not a number
+
+    def _compare(self, items, expected):
+        if items[:len(expected)] == expected:
+            return None
+
+        if numpy is not None and len(expected) >= VECTORIZE_THRESHOLD:
+            try:
+                got = numpy.array(items[:len(expected)]).astype(numpy.float64)
+                wanted = numpy.array(expected).astype(numpy.float64)
+            except ValueError:
+                pass  # some tokens are not numbers, batch is compared one by one
+            else:
+                with numpy.errstate(invalid='ignore'):
+                    tolerance = numpy.maximum(self.epsilon * numpy.maximum(numpy.abs(got), numpy.abs(wanted)),
+                                              self.epsilon)
+                    equal = (got == wanted) | (numpy.abs(got - wanted) <= tolerance)
+                differing = numpy.flatnonzero(~equal)
+                return int(differing[0]) if len(differing) else None
+
+        for index, (item, expected_item) in enumerate(zip(items, expected)):
+            if not self._equal(item, expected_item):
+                return index
+        return None
+
+
+class ProgramChecker:
+    """Runs custom checker program after program has finished.
+
+    STDOUT of program is written to temporary file as it arrives. Checker is run under Process limits
+    with command formatted with paths of input, output of program and expected output, like testlib
+    checkers are, and accepts output if it exits with zero return code.
+
+    Attributes:
+        cmd (str): Command with {input}, {output} and {answer} placeholders
+        time_limit (int): Time limit of checker in milliseconds
+        memory_limit (Optional[int]): Memory limit of checker in bytes
+        mismatch (Optional[Mismatch]): Verdict of checker with following structure, None if output is accepted
+            {
+                "offset": None,
+                "line": None,
+                "message": "..."        # STDOUT or STDERR of checker
+            }
+
+    """
+
+    def __init__(self, expected, input=None, cmd=None, time_limit=10000, memory_limit=None):
+        """Init method of checker.
+
+        Args:
+            expected (str|bytes|os.PathLike): Expected output or path of file with it
+            input (Optional[str|bytes|os.PathLike]): Input of test or path of file with it
+            cmd (str): Command with {input}, {output} and {answer} placeholders, e.g. "./check {input} {output} {answer}"
+            time_limit (int[default=10000]): Time limit of checker in milliseconds
+            memory_limit (Optional[int]): Memory limit of checker in bytes
+
+        """
+        self.cmd, self.time_limit, self.memory_limit = cmd, time_limit, memory_limit
+        self.expected, self.input = expected, input
+        self.mismatch = None
+        self._output = tempfile.NamedTemporaryFile(prefix='carbon-output-')
+
+    def feed(self, chunk):
+        self._output.write(chunk)
+        return True
+
+    def finish(self):
+        files = []
+        try:
+            self._output.flush()
+            paths = {'output': self._output.name}
+            for name, content in (('input', self.input), ('answer', self.expected)):
+                if isinstance(content, os.PathLike):
+                    paths[name] = os.fspath(content)
+                    continue
+                f = tempfile.NamedTemporaryFile(prefix='carbon-{0}-'.format(name))
+                f.write(content.encode('UTF-8') if isinstance(content, str) else (content or b''))
+                f.flush()
+                files.append(f)
+                paths[name] = f.name
+
+            checker = Process(self.cmd.format(**paths), time_limit=self.time_limit, memory_limit=self.memory_limit,
+                              output_limit=65536, stderr_limit=65536)
+            checker.run()
+        finally:
+            for f in files + [self._output]:
+                f.close()
+
+        status = checker.status
+        if status.time_limit_exceeded:
+            message = 'Checker time limit exceeded'
+        elif status.memory_limit_exceeded:
+            message = 'Checker memory limit exceeded'
+        elif status.returncode != 0:
+            message = (status.stdout or status.stderr or 'Checker has exited with {0}'.format(status.returncode))
+        else:
+            return True
+        self.mismatch = Mismatch(message=message.strip())
+        return False
+
+
+class DigestChecker:
+    """Wraps checker, computing hash of output passed to it.
+
+    Attributes:
+        checker: Wrapped checker
+        digest (hashlib.sha256): Hash of output fed so far
+
+    """
+
+    def __init__(self, checker):
+        """Init method of checker.
+
+        Args:
+            checker: Wrapped checker
+
+        """
+        self.checker = checker
+        self.digest = hashlib.sha256()
+
+    @property
+    def mismatch(self):
+        return self.checker.mismatch
+
+    def feed(self, chunk):
+        self.digest.update(chunk)
+        return self.checker.feed(chunk)
+
+    def finish(self):
+        return self.checker.finish()
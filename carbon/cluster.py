@@ -0,0 +1,763 @@
+"""Distributed judging with coordinator and remote workers connected over TCP.
+
+Coordinator keeps queue of jobs, each of them is source tested on pack of tests (see testpack module).
+Workers connect to coordinator, test jobs with their own Engine and report results. Coordinator
+prefers workers which already have pack of job or have compiled its source, so packs are sent over
+network once per worker and compilation cache of worker is hit. Workers send heartbeats, jobs of
+worker which has disconnected or stopped sending them are dispatched again to other workers.
+
+Every message is frame with header and payload lengths, JSON header and binary payload.
+    worker -> coordinator:
+        hello       {"worker", "capacity", "packs"}     # digests of packs worker has
+        heartbeat   {}
+        result      {"job", "result", "error", "retry"}
+    coordinator -> worker:
+        job         {"job", "lang", "checker", "mode", "groups", "pack", "source_size"}, payload is source
+                    followed by pack if worker does not have it
+
+Usage:
+    python carbon/cluster.py worker --connect HOST:PORT [--capacity N] [--cache DIR]
+
+"""
+import argparse
+import collections
+import contextlib
+import hashlib
+import itertools
+import json
+import logging
+import os
+import os.path
+import queue
+import shutil
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import langs_config
+from cache import CompilationCache
+from config import LangConfig
+from daemon import CHECKERS
+from engine import Engine
+import logs
+from ordering import MODES, RUN_ALL
+from testpack import TestPack
+from utils import Map, Record
+from workspace import WorkspacePool
+
+
+# lengths of JSON header and of binary payload of frame
+FRAME = struct.Struct('>II')
+
+# maximum size of JSON header of frame
+MAX_HEADER_SIZE = 16 * 1024 * 1024
+
+# size of chunks payload is received in
+CHUNK_SIZE = 1024 * 1024
+
+# states of job
+PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+
+
+def send_message(connection, message, payload=(), lock=None):
+    """Sends frame.
+
+    Args:
+        connection (socket.socket): Connection
+        message (dict): Header of frame
+        payload (iterable): Parts of payload, each of them is bytes-like object or file sent with sendfile
+        lock (Optional[threading.Lock]): Lock held while frame is sent, so frames of threads do not interleave
+
+    """
+    header = json.dumps(message).encode('UTF-8')
+    sizes = [os.fstat(part.fileno()).st_size if hasattr(part, 'fileno') else len(part) for part in payload]
+    with lock if lock is not None else contextlib.nullcontext():
+        connection.sendall(FRAME.pack(len(header), sum(sizes)) + header)
+        for part in payload:
+            if hasattr(part, 'fileno'):
+                connection.sendfile(part)
+            else:
+                connection.sendall(part)
+
+
+def receive_message(stream):
+    """Receives header of frame, payload is left in stream.
+
+    Args:
+        stream (io.BufferedReader): Reading side of connection
+
+    Returns:
+        tuple: Header of frame and size of its payload, None instead of header if connection is closed
+
+    Raises:
+        ConnectionError: If frame is malformed or connection is closed in the middle of it
+
+    """
+    frame = stream.read(FRAME.size)
+    if not frame:
+        return None, 0
+    if len(frame) < FRAME.size:
+        raise ConnectionError('Connection closed in the middle of frame')
+    header_size, payload_size = FRAME.unpack(frame)
+    if header_size > MAX_HEADER_SIZE:
+        raise ConnectionError('Header of frame is too large')
+    header = _read_exactly(stream, header_size)
+    try:
+        return Map(json.loads(header)), payload_size
+    except ValueError:
+        raise ConnectionError('Header of frame is not JSON')
+
+
+def _read_exactly(stream, size, output=None):
+    """Reads part of payload.
+
+    Args:
+        stream (io.BufferedReader): Reading side of connection
+        size (int): Number of bytes
+        output (Optional[file]): File data is copied to chunk by chunk instead of being returned
+
+    Returns:
+        Optional[bytes]: Data, None if output is given
+
+    Raises:
+        ConnectionError: If connection is closed before size bytes are read
+
+    """
+    chunks = []
+    while size:
+        chunk = stream.read(min(size, CHUNK_SIZE))
+        if not chunk:
+            raise ConnectionError('Connection closed in the middle of frame')
+        size -= len(chunk)
+        if output is not None:
+            output.write(chunk)
+        else:
+            chunks.append(chunk)
+    return b''.join(chunks) if output is None else None
+
+
+class Job(Record):
+    """Job of coordinator (see Coordinator.result for structure).
+
+    """
+
+    __slots__ = ('id', 'state', 'lang', 'checker', 'mode', 'groups', 'pack', 'priority', 'attempts', 'worker',
+                 'submitted', 'finished', 'result', 'error')
+
+
+class _Task(Record):
+    """Job with data coordinator dispatches it by.
+
+    """
+
+    __slots__ = ('job', 'source', 'digest', 'source_digest', 'order')
+
+
+class WorkerInfo(Record):
+    """Worker connected to coordinator.
+
+    Attributes:
+        id (str): Name of worker
+        capacity (int): Number of jobs worker tests in parallel
+        jobs (dict): Tasks of jobs sent to worker by ids of jobs
+        packs (set): Digests of packs worker has
+        sources (set): Digests of sources worker has compiled
+        last_seen (float): Monotonic time of last message from worker
+        outbox (queue.Queue): Jobs waiting to be sent by sender thread of worker, None stops it
+
+    """
+
+    __slots__ = ('id', 'capacity', 'jobs', 'packs', 'sources', 'last_seen', 'connection', 'outbox')
+
+
+class Coordinator:
+    """Dispatches jobs to workers connected over TCP.
+
+    Attributes:
+        address (tuple): Host and port coordinator listens on
+        heartbeat_timeout (float): Seconds without messages after which worker is considered dead
+        max_attempts (int): Number of times job is dispatched before it is failed
+
+    """
+
+    def __init__(self, address=('127.0.0.1', 0), heartbeat_timeout=5.0, max_attempts=3):
+        """Init method of coordinator, starting to listen for workers.
+
+        Args:
+            address (tuple[default=('127.0.0.1', 0)]): Host and port to listen on, port is chosen if 0
+            heartbeat_timeout (float[default=5.0]): Seconds without messages after which worker is considered dead
+            max_attempts (int[default=3]): Number of times job is dispatched before it is failed
+
+        """
+        self.heartbeat_timeout, self.max_attempts = heartbeat_timeout, max_attempts
+        self.logger = logging.getLogger(logs.LOGGER_NAME)
+
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._jobs = {}
+        self._pending = []
+        self._workers = {}
+        self._order = itertools.count()
+        self._pack_digests = {}
+        self._digests_lock = threading.Lock()
+        self._closed = False
+
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                coordinator._serve_worker(self.request, self.rfile)
+
+        self._server = socketserver.ThreadingTCPServer(address, Handler)
+        self._server.daemon_threads = True
+        self.address = self._server.server_address
+
+        self._threads = [threading.Thread(target=target, name=name, daemon=True) for target, name in (
+            (self._server.serve_forever, 'carbon-coordinator'),
+            (self._dispatch, 'carbon-dispatcher'),
+            (self._monitor, 'carbon-monitor'),
+        )]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, lang, source, pack, checker='exact', priority=0, mode=RUN_ALL, groups=None):
+        """Puts job into queue.
+
+        Args:
+            lang (str): Name of lang config of workers
+            source (str|bytes): Source code
+            pack (str): Path of pack of tests
+            checker (str[default='exact']): Name of checker (see daemon.CHECKERS)
+            priority (int[default=0]): Priority of job, lower is dispatched first
+            mode (str[default='run-all']): Mode of execution, workers order tests by failures of pack in fail-fast
+                modes (see ordering module)
+            groups (Optional[list]): Group of every test in group mode
+
+        Returns:
+            str: Id of job
+
+        Raises:
+            ValueError: If checker or mode is unknown
+
+        """
+        if checker not in CHECKERS:
+            raise ValueError('Unknown checker {0}'.format(checker))
+        if mode not in MODES:
+            raise ValueError('Unknown mode {0}'.format(mode))
+        source = source.encode('UTF-8') if isinstance(source, str) else bytes(source)
+        job = Job(id=uuid.uuid4().hex, state=PENDING, lang=lang, checker=checker, mode=mode, groups=groups, pack=pack,
+                  priority=priority, attempts=0, submitted=time.time())
+        task = _Task(job=job, source=source, digest=self._pack_digest(pack),
+                     source_digest=hashlib.sha256(source).hexdigest(), order=next(self._order))
+        with self._lock:
+            self._jobs[job.id] = job
+            self._pending.append(task)
+            self._changed.notify_all()
+        return job.id
+
+    def result(self, id, timeout=None):
+        """Gets job, waiting for it to finish.
+
+        Args:
+            id (str): Id of job
+            timeout (Optional[float]): Seconds to wait for job to finish, waits forever if None
+
+        Returns:
+            Job: Job with following structure
+                {
+                    "id": "f3a0...",
+                    "state": "done",                # pending|running|done|failed
+                    "lang": "py",
+                    "checker": "exact",
+                    "mode": "run-all",
+                    "groups": None,
+                    "pack": "sum.pack",
+                    "priority": 0,
+                    "attempts": 1,                  # number of times job has been dispatched
+                    "worker": "host-1234",          # worker which has tested job
+                    "submitted": 1500000000.0,
+                    "finished": 1500000000.5,
+                    "result": {},                   # result of testing (see Engine.test_suite)
+                    "error": None                   # error if testing has failed
+                }
+
+        Raises:
+            KeyError: If there is no such job
+
+        """
+        with self._lock:
+            job = self._jobs[id]
+            self._changed.wait_for(lambda: job.state in (DONE, FAILED), timeout)
+            return job
+
+    def stats(self):
+        """Gets load of workers.
+
+        Returns:
+            Map: Number of pending jobs and load of every worker
+
+        """
+        with self._lock:
+            return Map({
+                'pending': len(self._pending),
+                'workers': dict((worker.id, {'capacity': worker.capacity, 'jobs': len(worker.jobs),
+                                             'packs': len(worker.packs), 'sources': len(worker.sources)})
+                                for worker in self._workers.values()),
+            })
+
+    def close(self):
+        """Stops coordinator, disconnecting workers.
+
+        """
+        with self._lock:
+            self._closed = True
+            self._changed.notify_all()
+            workers = list(self._workers.values())
+        self._server.shutdown()
+        self._server.server_close()
+        for worker in workers:
+            self._disconnect(worker)
+
+    def _pack_digest(self, path):
+        """Computes hash of pack, hashes are kept until pack is changed.
+
+        Args:
+            path (str): Path of pack
+
+        Returns:
+            str: Hash of pack
+
+        """
+        info = os.stat(path)
+        signature = (info.st_ino, info.st_size, info.st_mtime_ns)
+        # jobs are submitted from several threads, pack is hashed outside of lock
+        with self._digests_lock:
+            cached = self._pack_digests.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        with self._digests_lock:
+            self._pack_digests[path] = (signature, digest.hexdigest())
+        return digest.hexdigest()
+
+    def _serve_worker(self, connection, stream):
+        """Receives messages of worker until it disconnects.
+
+        Args:
+            connection (socket.socket): Connection of worker
+            stream (io.BufferedReader): Reading side of connection
+
+        """
+        worker = None
+        try:
+            hello, _ = receive_message(stream)
+            if hello is None or hello.type != 'hello':
+                return
+            worker = WorkerInfo(id=hello.worker, capacity=max(1, int(hello.capacity or 1)), jobs={},
+                                packs=set(hello.packs or ()), sources=set(), last_seen=time.monotonic(),
+                                connection=connection, outbox=queue.Queue())
+            with self._lock:
+                if worker.id in self._workers or self._closed:
+                    return  # worker with the same name is connected already
+                self._workers[worker.id] = worker
+                self._changed.notify_all()
+            threading.Thread(target=self._send_jobs, args=(worker,), name='carbon-sender-{0}'.format(worker.id),
+                             daemon=True).start()
+            self.logger.info('Worker %s has connected', worker.id)
+
+            while True:
+                message, payload_size = receive_message(stream)
+                if message is None:
+                    break
+                _read_exactly(stream, payload_size)
+                with self._lock:
+                    worker.last_seen = time.monotonic()
+                    if message.type == 'result':
+                        self._finish_job(worker, message)
+        except (OSError, ValueError) as e:
+            self.logger.warning('Connection of worker %s has failed: %s', worker.id if worker else '?', e)
+        finally:
+            if worker is not None:
+                self._drop(worker)
+
+    def _finish_job(self, worker, message):
+        task = worker.jobs.pop(message.job, None)
+        if task is None:
+            return  # job has been dispatched again already
+
+        job = task.job
+        if message.retry and job.attempts < self.max_attempts:
+            worker.packs.discard(task.digest)
+            job.state = PENDING
+            self._pending.append(task)
+        else:
+            worker.sources.add(task.source_digest)
+            job.state = DONE if message.error is None else FAILED
+            job.result, job.error, job.finished = message.result, message.error, time.time()
+        self._changed.notify_all()
+
+    def _drop(self, worker):
+        """Forgets disconnected worker, dispatching its jobs again.
+
+        Args:
+            worker (WorkerInfo): Worker
+
+        """
+        with self._lock:
+            if self._workers.get(worker.id) is not worker:
+                return
+            del self._workers[worker.id]
+            for task in worker.jobs.values():
+                job = task.job
+                if job.attempts >= self.max_attempts:
+                    job.state, job.error, job.finished = FAILED, 'Workers have died', time.time()
+                else:
+                    job.state, job.worker = PENDING, None
+                    self._pending.append(task)
+            worker.jobs = {}
+            self._changed.notify_all()
+        worker.outbox.put(None)
+        self.logger.warning('Worker %s has disconnected', worker.id)
+        self._disconnect(worker)
+
+    @staticmethod
+    def _disconnect(worker):
+        try:
+            worker.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _schedule(self):
+        """Assigns pending jobs to free workers, preferring workers having pack and compiled source of job.
+
+        Returns:
+            list: Worker, task assigned to it and whether worker has pack of task
+
+        """
+        assignments = []
+        self._pending.sort(key=lambda task: (task.job.priority, task.order))
+        for task in list(self._pending):
+            free = [worker for worker in self._workers.values() if len(worker.jobs) < worker.capacity]
+            if not free:
+                break
+            worker = max(free, key=lambda worker: (task.digest in worker.packs, task.source_digest in worker.sources,
+                                                   -len(worker.jobs) / worker.capacity))
+            self._pending.remove(task)
+            job = task.job
+            job.state, job.worker = RUNNING, worker.id
+            job.attempts += 1
+            worker.jobs[job.id] = task
+            assignments.append((worker, task, task.digest in worker.packs))
+            worker.packs.add(task.digest)
+        return assignments
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                assignments = self._schedule()
+                while not assignments and not self._closed:
+                    self._changed.wait()
+                    assignments = self._schedule()
+                if self._closed:
+                    return
+
+            # jobs are sent by sender threads of workers, so transfer of large pack delays only its worker
+            for worker, task, has_pack in assignments:
+                worker.outbox.put((task, has_pack))
+
+    def _send_jobs(self, worker):
+        """Sends jobs assigned to worker in order of assignment until worker is dropped.
+
+        Args:
+            worker (WorkerInfo): Worker
+
+        """
+        while True:
+            item = worker.outbox.get()
+            if item is None:
+                return
+            task, has_pack = item
+            job = task.job
+            message = {'type': 'job', 'job': job.id, 'lang': job.lang, 'checker': job.checker,
+                       'mode': job.mode, 'groups': job.groups, 'pack': task.digest, 'source_size': len(task.source)}
+            try:
+                if has_pack:
+                    send_message(worker.connection, message, [task.source])
+                else:
+                    # pack is sent with sendfile, so it is not read into memory of coordinator
+                    with open(job.pack, 'rb') as f:
+                        send_message(worker.connection, message, [task.source, f])
+            except OSError:
+                self._drop(worker)
+                return
+
+    def _monitor(self):
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                deadline = time.monotonic() - self.heartbeat_timeout
+                dead = [worker for worker in self._workers.values() if worker.last_seen < deadline]
+            for worker in dead:
+                # connection is closed, so receiving thread of worker drops it
+                self._disconnect(worker)
+            time.sleep(self.heartbeat_timeout / 4)
+
+
+class Worker:
+    """Tests jobs of coordinator with engine.
+
+    Attributes:
+        address (tuple): Host and port of coordinator
+        engine (Engine): Engine jobs are tested by
+        id (str): Name of worker
+        capacity (int): Number of jobs tested in parallel
+        cache (str): Directory packs are kept in
+        heartbeat_interval (float): Seconds between heartbeats
+
+    """
+
+    # maximum number of packs kept open while no job uses them
+    OPEN_PACKS = 8
+
+    def __init__(self, address, engine, id=None, capacity=1, cache=None, langs=None, heartbeat_interval=1.0):
+        """Init method of worker.
+
+        Args:
+            address (tuple): Host and port of coordinator
+            engine (Engine): Engine jobs are tested by
+            id (Optional[str]): Name of worker, host name and process id if None
+            capacity (int[default=1]): Number of jobs tested in parallel
+            cache (Optional[str]): Directory packs are kept in between runs, temporary one is used if None
+            langs (Optional[dict]): Lang configs by their names, configs of langs_config module if None
+            heartbeat_interval (float[default=1.0]): Seconds between heartbeats
+
+        Raises:
+            InvalidConfigError: If lang config is invalid
+
+        """
+        self.address, self.engine, self.capacity = address, engine, capacity
+        self.id = id or '{0}-{1}'.format(socket.gethostname(), os.getpid())
+        self.heartbeat_interval = heartbeat_interval
+        langs = langs if langs is not None else {'cpp': langs_config.cpp, 'py': langs_config.py}
+        self.langs = dict((name, LangConfig.load(config)) for name, config in langs.items())
+
+        self._own_cache = cache is None
+        self.cache = cache if cache is not None else tempfile.mkdtemp(prefix='carbon-worker-')
+        os.makedirs(os.path.join(self.cache, 'packs'), exist_ok=True)
+        self.workspace = tempfile.mkdtemp(prefix='carbon-worker-sources-')
+
+        self._packs = collections.OrderedDict()
+        self._pack_users = collections.Counter()
+        self._packs_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._connection = None
+
+    def _pack_path(self, digest):
+        return os.path.join(self.cache, 'packs', digest + '.pack')
+
+    def serve(self):
+        """Connects to coordinator and tests jobs until connection is closed.
+
+        """
+        connection = socket.create_connection(self.address)
+        self._connection = connection
+        lock = threading.Lock()
+        executor = ThreadPoolExecutor(self.capacity)
+        try:
+            packs = [name[:-len('.pack')] for name in os.listdir(os.path.join(self.cache, 'packs'))
+                     if name.endswith('.pack')]
+            send_message(connection, {'type': 'hello', 'worker': self.id, 'capacity': self.capacity,
+                                      'packs': packs}, lock=lock)
+            threading.Thread(target=self._heartbeat, args=(connection, lock), daemon=True).start()
+
+            with connection.makefile('rb') as stream:
+                while True:
+                    message, payload_size = receive_message(stream)
+                    if message is None:
+                        break
+                    if message.type != 'job':
+                        _read_exactly(stream, payload_size)
+                        continue
+                    source = _read_exactly(stream, message.source_size)
+                    if payload_size > message.source_size:
+                        self._store_pack(stream, message.pack, payload_size - message.source_size)
+                    executor.submit(self._test, connection, lock, message, source)
+        except OSError as e:
+            self.engine.logger.warning('Connection to coordinator has failed: %s', e)
+        finally:
+            connection.close()
+            executor.shutdown(wait=True)
+
+    def serve_forever(self, retry_interval=1.0):
+        """Serves coordinator, reconnecting to it until worker is closed.
+
+        Args:
+            retry_interval (float[default=1.0]): Seconds between attempts to connect
+
+        """
+        while not self._stopped.is_set():
+            try:
+                self.serve()
+            except OSError as e:
+                self.engine.logger.warning('Coordinator is not available: %s', e)
+            self._stopped.wait(retry_interval)
+
+    def close(self):
+        """Disconnects from coordinator and removes temporary files.
+
+        """
+        self._stopped.set()
+        if self._connection is not None:
+            try:
+                self._connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        shutil.rmtree(self.workspace, ignore_errors=True)
+        # packs of jobs still being tested are closed when they are released
+        with self._packs_lock:
+            for digest in [digest for digest in self._packs if digest not in self._pack_users]:
+                self._packs.pop(digest).close()
+        if self._own_cache:
+            shutil.rmtree(self.cache, ignore_errors=True)
+
+    def _heartbeat(self, connection, lock):
+        while not self._stopped.wait(self.heartbeat_interval):
+            try:
+                send_message(connection, {'type': 'heartbeat'}, lock=lock)
+            except OSError:
+                return
+
+    def _store_pack(self, stream, digest, size):
+        """Receives pack into cache.
+
+        Args:
+            stream (io.BufferedReader): Reading side of connection
+            digest (str): Hash of pack
+            size (int): Size of pack
+
+        """
+        tmp = '{0}.{1}.tmp'.format(self._pack_path(digest), uuid.uuid4().hex)
+        try:
+            with open(tmp, 'wb') as f:
+                _read_exactly(stream, size, f)
+            os.rename(tmp, self._pack_path(digest))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _pack(self, digest):
+        """Opens pack from cache, packs are opened once and shared by jobs.
+
+        Args:
+            digest (str): Hash of pack
+
+        Returns:
+            Optional[TestPack]: Pack, None if worker does not have it. Pack is used by job until it is released
+                by _release_pack
+
+        """
+        with self._packs_lock:
+            if digest not in self._packs:
+                if not os.path.isfile(self._pack_path(digest)):
+                    return None
+                self._packs[digest] = TestPack(self._pack_path(digest))
+            self._packs.move_to_end(digest)
+            self._pack_users[digest] += 1
+            return self._packs[digest]
+
+    def _release_pack(self, digest):
+        """Releases pack of finished job, closing least recently used packs nobody uses above OPEN_PACKS.
+
+        Args:
+            digest (str): Hash of pack
+
+        """
+        with self._packs_lock:
+            self._pack_users[digest] -= 1
+            if not self._pack_users[digest]:
+                del self._pack_users[digest]
+            unused = [digest for digest in self._packs if digest not in self._pack_users]
+            limit = 0 if self._stopped.is_set() else self.OPEN_PACKS
+            for digest in unused[:max(len(self._packs) - limit, 0)]:
+                self._packs.pop(digest).close()
+
+    def _test(self, connection, lock, message, source):
+        reply = {'type': 'result', 'job': message.job, 'result': None, 'error': None, 'retry': False}
+        pack = None
+        try:
+            pack = self._pack(message.pack)
+            if pack is None:
+                reply['error'], reply['retry'] = 'Pack is missing', True
+            elif message.lang not in self.langs:
+                reply['error'] = 'Unknown lang {0}'.format(message.lang)
+            else:
+                config = self.langs[message.lang]
+                # engine substitutes file name into commands like "./{filename}", so path is relative
+                filename = os.path.relpath(os.path.join(self.workspace, '{0}.{1}'.format(message.job,
+                                                                                        config.extension)))
+                with open(filename, 'wb') as f:
+                    f.write(source)
+                # failures are recorded per pack, so workers order tests of the same pack alike
+                with logs.context(submission=message.job):
+                    result = self.engine.test_suite(filename, config, pack, autoremove=True,
+                                                    checker=CHECKERS.get(message.checker, CHECKERS['exact']),
+                                                    mode=message.mode or RUN_ALL, groups=message.groups,
+                                                    problem=message.pack)
+                reply['result'] = result.to_dict()
+        except Exception as e:
+            reply['error'] = str(e)
+            self.engine.logger.error('Testing of job %s has failed: %s', message.job, e)
+        finally:
+            if pack is not None:
+                self._release_pack(message.pack)
+
+        try:
+            send_message(connection, reply, lock=lock)
+        except OSError:
+            pass  # coordinator dispatches job again when it notices that worker is gone
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    worker = commands.add_parser('worker', help='test jobs of coordinator')
+    worker.add_argument('--connect', required=True, help='HOST:PORT of coordinator')
+    worker.add_argument('--id', help='name of worker')
+    worker.add_argument('--capacity', type=int, default=1, help='number of jobs tested in parallel')
+    worker.add_argument('--cache', help='directory packs and compilation results are kept in')
+    worker.add_argument('--workspaces', help='directory of workspaces of runs, tmpfs if available by default')
+    worker.add_argument('--verbose', action='store_true', help='log every test')
+    worker.add_argument('--json-logs', action='store_true', help='log JSON lines with ids of jobs and tests')
+    args = parser.parse_args()
+
+    host, port = args.connect.rsplit(':', 1)
+    cache = CompilationCache(os.path.join(args.cache, 'compilation')) if args.cache else None
+    workspaces = WorkspacePool(args.workspaces, 2 * args.capacity)
+    engine = Engine(logging.INFO if args.verbose else logging.WARNING, compilation_cache=cache,
+                    workspaces=workspaces, structured_logs=args.json_logs)
+    worker = Worker((host, int(port)), engine, args.id, args.capacity, args.cache)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        worker.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.close()
+        engine.close()
+        workspaces.close()
+
+
+if __name__ == '__main__':
+    main()
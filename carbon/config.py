@@ -0,0 +1,315 @@
+"""Typed lang configs, validated once when they are loaded.
+
+Dict configs (see Program's class Attributes for structure) are loaded with LangConfig.load, which returns
+LangConfig objects as they are, so config can be loaded once and shared by all programs. Commands are split
+into argv when config is loaded, only file name is substituted into them afterwards.
+
+"""
+import shlex
+
+from errors import InvalidConfigError
+from limits import BACKENDS
+from utils import FrozenRecord
+
+
+def _section(config, name, keys, required=()):
+    """Checks that section of config is dict with known keys.
+
+    Args:
+        config (dict): Section of config
+        name (str): Name of section for error messages
+        keys (iterable): Allowed keys
+        required (iterable): Keys which must be present
+
+    Returns:
+        dict: Section of config
+
+    Raises:
+        InvalidConfigError: If section is not dict, has unknown keys or lacks required ones
+
+    """
+    if not isinstance(config, dict):
+        raise InvalidConfigError(name, 'expected dict, got {0}'.format(type(config).__name__))
+    unknown = set(config) - set(keys)
+    if unknown:
+        raise InvalidConfigError(name, 'unknown keys {0}'.format(', '.join(sorted(unknown))))
+    missing = [key for key in required if config.get(key) is None]
+    if missing:
+        raise InvalidConfigError(name, 'missing keys {0}'.format(', '.join(missing)))
+    return config
+
+
+def _positive(config, name, key):
+    value = config.get(key)
+    if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0):
+        raise InvalidConfigError('{0}.{1}'.format(name, key), 'expected positive number, got {0!r}'.format(value))
+    return value
+
+
+def _template(template, name):
+    """Checks that template has no placeholders other than {filename}.
+
+    Args:
+        template (str): Template of command or file name
+        name (str): Name of template for error messages
+
+    Returns:
+        str: Template
+
+    Raises:
+        InvalidConfigError: If template is not string or has other placeholders
+
+    """
+    if not isinstance(template, str):
+        raise InvalidConfigError(name, 'expected string, got {0}'.format(type(template).__name__))
+    try:
+        template.format(filename='')
+    except (KeyError, IndexError, ValueError) as e:
+        raise InvalidConfigError(name, 'only {{filename}} can be substituted ({0})'.format(e))
+    return template
+
+
+class Command(FrozenRecord):
+    """Command template split into argv.
+
+    Attributes:
+        template (str): Command with {filename} placeholder, e.g. "g++ -o {filename}.o {filename}"
+        argv (tuple): Arguments of command before substitution
+
+    """
+
+    __slots__ = ('template', 'argv', '_holes')
+
+    def __init__(self, template, name='cmd'):
+        """Init method of command.
+
+        Args:
+            template (str): Command with {filename} placeholder
+            name (str[default='cmd']): Name of command in config for error messages
+
+        Raises:
+            InvalidConfigError: If template can not be split or has other placeholders
+
+        """
+        _template(template, name)
+        try:
+            argv = tuple(shlex.split(template))
+        except ValueError as e:
+            raise InvalidConfigError(name, str(e))
+        if not argv:
+            raise InvalidConfigError(name, 'command is empty')
+        super(Command, self).__init__(template=template, argv=argv,
+                                      _holes=tuple(i for i, arg in enumerate(argv) if '{' in arg or '}' in arg))
+
+    def format(self, filename):
+        """Substitutes file name into command.
+
+        Args:
+            filename (str): File name of program, it is always one argument even if it has spaces
+
+        Returns:
+            list: Arguments of command
+
+        """
+        argv = list(self.argv)
+        for index in self._holes:
+            argv[index] = argv[index].format(filename=filename)
+        return argv
+
+    def __str__(self):
+        return self.template
+
+
+class Limits(FrozenRecord):
+    """Limits of compilation or execution.
+
+    Attributes:
+        time (Optional[int]): Time limit in milliseconds
+        vms (Optional[int]): Memory limit in bytes (virtual memory size)
+        sample_interval (Optional[int]): Interval between memory samples in milliseconds
+        backend (Optional[str]): Limit backend (see limits.BACKENDS)
+        backend_options (dict): Options of limit backend
+        output (Optional[int]): STDOUT limit in bytes
+        stderr (Optional[int]): STDERR limit in bytes
+
+    """
+
+    __slots__ = ('time', 'vms', 'sample_interval', 'backend', 'backend_options', 'output', 'stderr')
+
+    @classmethod
+    def load(cls, config, name='limits'):
+        """Loads limits from dict.
+
+        Args:
+            config (Optional[dict]): Limits section of config
+            name (str[default='limits']): Name of section for error messages
+
+        Returns:
+            Limits: Limits
+
+        Raises:
+            InvalidConfigError: If config is invalid
+
+        """
+        config = _section(config if config is not None else {}, name, cls.__slots__)
+        values = dict((key, _positive(config, name, key))
+                      for key in ('time', 'vms', 'sample_interval', 'output', 'stderr'))
+
+        backend = config.get('backend')
+        if backend is not None and backend not in BACKENDS:
+            raise InvalidConfigError(name + '.backend', 'expected one of {0}, got {1!r}'.format(
+                ', '.join(sorted(BACKENDS)), backend))
+        options = config.get('backend_options') or {}
+        if not isinstance(options, dict):
+            raise InvalidConfigError(name + '.backend_options', 'expected dict')
+        return cls(backend=backend, backend_options=dict(options), **values)
+
+
+class Compilation(FrozenRecord):
+    """Compilation section of lang config.
+
+    Attributes:
+        need (bool): True if compilation is needed
+        cmd (Optional[Command]): Command compiling source
+        executable (Optional[str]): Template of executable name, e.g. "{filename}.o"
+        limits (Limits): Limits of compilation
+
+    """
+
+    __slots__ = ('need', 'cmd', 'executable', 'limits')
+
+    @classmethod
+    def load(cls, config, name='compilation'):
+        """Loads compilation section from dict.
+
+        Args:
+            config (dict): Compilation section of config
+            name (str[default='compilation']): Name of section for error messages
+
+        Returns:
+            Compilation: Compilation section
+
+        Raises:
+            InvalidConfigError: If config is invalid
+
+        """
+        config = _section(config, name, cls.__slots__, ('need',))
+        if not config['need']:
+            return cls(need=False, limits=Limits.load(config.get('limits'), name + '.limits'))
+
+        _section(config, name, cls.__slots__, ('cmd', 'executable'))
+        return cls(need=True, cmd=Command(config['cmd'], name + '.cmd'),
+                   executable=_template(config['executable'], name + '.executable'),
+                   limits=Limits.load(config.get('limits'), name + '.limits'))
+
+
+class ZygoteConfig(FrozenRecord):
+    """Warm interpreters of execution config (see zygote module).
+
+    Attributes:
+        cmd (str): Command starting Python interpreter
+        size (int): Number of interpreters kept ready
+
+    """
+
+    __slots__ = ('cmd', 'size')
+
+    @classmethod
+    def load(cls, config, name='zygote'):
+        """Loads zygote section from dict.
+
+        Args:
+            config (dict): Zygote section of execution config
+            name (str[default='zygote']): Name of section for error messages
+
+        Returns:
+            ZygoteConfig: Zygote section
+
+        Raises:
+            InvalidConfigError: If config is invalid
+
+        """
+        config = _section(config, name, cls.__slots__, ('cmd',))
+        size = config.get('size', 1)
+        if isinstance(size, bool) or not isinstance(size, int) or size < 1:
+            raise InvalidConfigError(name + '.size', 'expected positive integer, got {0!r}'.format(size))
+        return cls(cmd=Command(config['cmd'], name + '.cmd').template, size=size)
+
+
+class Execution(FrozenRecord):
+    """Execution section of lang config.
+
+    Attributes:
+        cmd (Command): Command executing program
+        zygote (Optional[ZygoteConfig]): Warm interpreters program is executed in
+        limits (Limits): Limits of execution
+
+    """
+
+    __slots__ = ('cmd', 'zygote', 'limits')
+
+    @classmethod
+    def load(cls, config, name='execution'):
+        """Loads execution section from dict.
+
+        Args:
+            config (dict): Execution section of config
+            name (str[default='execution']): Name of section for error messages
+
+        Returns:
+            Execution: Execution section
+
+        Raises:
+            InvalidConfigError: If config is invalid or command can not be run in warm interpreter
+
+        """
+        config = _section(config, name, cls.__slots__, ('cmd',))
+        cmd, zygote = Command(config['cmd'], name + '.cmd'), config.get('zygote')
+        if zygote:
+            zygote = ZygoteConfig.load(zygote, name + '.zygote')
+            # warm interpreter runs only script, so its command must be the whole command without script
+            interpreter = Command(zygote.cmd, name + '.zygote.cmd').argv
+            if cmd.argv[:-1] != interpreter or '{filename}' not in cmd.argv[-1]:
+                raise InvalidConfigError(name + '.zygote', 'command {0!r} is not "{1} <script>"'.format(
+                    cmd.template, zygote.cmd))
+        return cls(cmd=cmd, zygote=zygote or None, limits=Limits.load(config.get('limits'), name + '.limits'))
+
+
+class LangConfig(FrozenRecord):
+    """Configuration of programming lang (see Program's class Attributes for structure).
+
+    Attributes:
+        extension (str): Extension of source file
+        compilation (Compilation): Compilation section
+        execution (Execution): Execution section
+        info (dict): Human-readable information about lang
+
+    """
+
+    __slots__ = ('extension', 'compilation', 'execution', 'info')
+
+    @classmethod
+    def load(cls, config):
+        """Loads lang config from dict.
+
+        Args:
+            config (dict|LangConfig): Lang config
+
+        Returns:
+            LangConfig: Lang config, config itself if it is LangConfig already
+
+        Raises:
+            InvalidConfigError: If config is invalid
+
+        """
+        if isinstance(config, cls):
+            return config
+
+        config = _section(config, 'config', cls.__slots__, ('extension', 'compilation', 'execution'))
+        if not isinstance(config['extension'], str):
+            raise InvalidConfigError('extension', 'expected string')
+        info = config.get('info') or {}
+        if not isinstance(info, dict):
+            raise InvalidConfigError('info', 'expected dict')
+        return cls(extension=config['extension'], compilation=Compilation.load(config['compilation']),
+                   execution=Execution.load(config['execution']), info=dict(info))
@@ -0,0 +1,645 @@
+"""Long-running judge serving testing of submissions over HTTP on Unix or TCP socket.
+
+One daemon owns one Engine, so compilation cache, warm interpreters, cores and test data are shared
+by all clients, and submissions wait in bounded priority queue instead of overloading machine.
+
+API:
+    POST /submissions           submit source, body is JSON with following structure
+        {
+            "lang": "py",                   # name of lang config
+            "source": "print(9)",           # source code
+            "tests": [["4 5", "9"]],        # pairs of input and expected output, or
+            "problem": "sum",               #   name of directory with tests in problems directory
+            "priority": 0,                  # optional, lower is tested first, e.g. 0 for contest, 10 for practice
+            "checker": "token",             # optional, exact|token|whitespace|float
+            "epsilon": 1e-6,                # optional, tolerance of float checker
+            "mode": "stop-on-first",        # optional, run-all|stop-on-first|group (see ordering module)
+            "groups": [1, 1, 2]             # optional, group of every test in group mode
+        }
+        replies 202 with submission, 400 on invalid submission and 503 with Retry-After if queue is full
+    GET /submissions/<id>       get submission, ?wait=<seconds> waits for it to be tested
+    GET /queue                  get depth of queue and load of judge
+    GET /metrics                get metrics of engine and judge in Prometheus text format
+
+Every reply has X-Queue-Depth header, so clients can back off before queue is full.
+
+Usage:
+    python carbon/daemon.py --unix /run/carbon.sock [--workers N] [--queue-size N] [--problems DIR] [--cache DIR]
+    python carbon/daemon.py --port 8000 ...
+
+"""
+import argparse
+import collections
+import heapq
+import itertools
+import json
+import logging
+import os
+import os.path
+import shutil
+import signal
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import langs_config
+from cache import CompilationCache
+from calibration import Calibrator
+from checkers import StreamingChecker, TokenChecker, WhitespaceChecker, FloatChecker
+from config import LangConfig
+from engine import Engine
+import logs
+from ordering import FailureStats, MODES, RUN_ALL, STOP_IN_GROUP
+from testpack import TestPack
+from errors import *
+from utils import Map, Record
+from workspace import WorkspacePool
+
+
+# checkers available to clients, checker programs are not, since their command would be run by judge
+CHECKERS = {
+    'exact': StreamingChecker,
+    'token': TokenChecker,
+    'whitespace': WhitespaceChecker,
+    'float': FloatChecker,
+}
+
+# maximum size of request body in bytes
+MAX_REQUEST_SIZE = 64 * 1024 * 1024
+
+# states of submission
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+class Submission(Record):
+    """Submission tested by judge (see Judge.get for structure).
+
+    """
+
+    __slots__ = ('id', 'state', 'lang', 'priority', 'submitted', 'started', 'finished', 'result', 'error')
+
+
+class SubmissionQueue:
+    """Bounded priority queue of submissions.
+
+    Submissions with lower priority value are taken first, submissions of same priority are taken
+    in order of arrival.
+
+    Attributes:
+        capacity (int): Maximum number of submissions in queue
+
+    """
+
+    def __init__(self, capacity):
+        """Init method of queue.
+
+        Args:
+            capacity (int): Maximum number of submissions in queue
+
+        """
+        self.capacity = capacity
+        self._heap = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def __len__(self):
+        return len(self._heap)
+
+    def put(self, item, priority=0):
+        """Adds submission to queue.
+
+        Args:
+            item: Submission
+            priority (int[default=0]): Priority of submission, lower is taken first
+
+        Raises:
+            QueueFullError: If queue has reached its capacity
+
+        """
+        with self._condition:
+            if len(self._heap) >= self.capacity:
+                raise QueueFullError(len(self._heap), self.capacity)
+            heapq.heappush(self._heap, (priority, next(self._order), item))
+            self._condition.notify()
+
+    def get(self):
+        """Takes submission from queue, waiting for one to arrive.
+
+        Returns:
+            Optional[object]: Submission, None if queue is closed
+
+        """
+        with self._condition:
+            while not self._heap and not self._closed:
+                self._condition.wait()
+            if self._closed:
+                return None
+            return heapq.heappop(self._heap)[2]
+
+    def depths(self):
+        """Counts submissions waiting in queue per priority.
+
+        Returns:
+            dict: Number of submissions by priority
+
+        """
+        with self._condition:
+            return dict(sorted(collections.Counter(priority for priority, _, _ in self._heap).items()))
+
+    def close(self):
+        """Wakes up all consumers, making them stop.
+
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class Judge:
+    """Tests submissions from queue in worker threads with shared engine.
+
+    Attributes:
+        engine (Engine): Engine submissions are tested by
+        langs (dict): Loaded lang configs by their names
+        queue (SubmissionQueue): Submissions waiting for testing
+        workers (int): Number of submissions tested in parallel
+        problems (Optional[str]): Directory with problems, each of them is either pack of tests named as
+            <problem>.pack (see testpack module) or directory with tests named as <name>.in and <name>.out
+        workspace (str): Directory sources are written to
+
+    """
+
+    def __init__(self, engine, langs=None, workers=1, queue_size=100, problems=None, workspace=None, history=1000):
+        """Init method of judge, starting worker threads.
+
+        Args:
+            engine (Engine): Engine submissions are tested by
+            langs (Optional[dict]): Lang configs (dict or LangConfig) by their names, configs of langs_config
+                module if None
+            workers (int[default=1]): Number of submissions tested in parallel
+            queue_size (int[default=100]): Maximum number of submissions waiting for testing
+            problems (Optional[str]): Directory with problems
+            workspace (Optional[str]): Directory sources are written to, temporary one is created if None
+            history (int[default=1000]): Number of finished submissions kept for clients to fetch
+
+        Raises:
+            InvalidConfigError: If lang config is invalid
+
+        """
+        self.engine = engine
+        # configs are validated once, so invalid config is reported at start instead of on submission
+        langs = langs if langs is not None else {'cpp': langs_config.cpp, 'py': langs_config.py}
+        self.langs = dict((name, LangConfig.load(config)) for name, config in langs.items())
+        # langs are calibrated before the first submission, so its testing does not include calibration
+        for config in self.langs.values():
+            engine.calibrate(config)
+        self.queue = SubmissionQueue(queue_size)
+        self.workers, self.problems, self.history = workers, problems, history
+
+        self._own_workspace = workspace is None
+        self.workspace = workspace if workspace is not None else tempfile.mkdtemp(prefix='carbon-judge-')
+
+        self._lock = threading.Lock()
+        self._finished = threading.Condition(self._lock)
+        self._submissions = collections.OrderedDict()
+        self._problem_tests = {}
+        # packs are counted by submissions using them, replaced pack is closed when the last of them finishes
+        self._pack_users = collections.Counter()
+        self._retired_packs = set()
+        self._running = 0
+
+        metrics = engine.metrics
+        self._received = metrics.counter('carbon_submissions_total', 'Number of received submissions', ('result',))
+        self._queue_depth = metrics.gauge('carbon_queue_depth', 'Number of submissions waiting for testing')
+        self._running_gauge = metrics.gauge('carbon_running_submissions', 'Number of submissions being tested')
+        self._wait_seconds = metrics.histogram('carbon_queue_wait_seconds', 'Time submissions wait in queue',
+                                               buckets=(0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300))
+
+        self._threads = [threading.Thread(target=self._work, name='carbon-judge-{0}'.format(number), daemon=True)
+                         for number in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, lang, source, tests=None, problem=None, priority=0, checker='exact', epsilon=None, mode=RUN_ALL,
+               groups=None):
+        """Puts submission into queue.
+
+        Args:
+            lang (str): Name of lang config
+            source (str): Source code
+            tests (Optional[list]): Pairs of input and expected output
+            problem (Optional[str]): Name of problem tests are taken from if tests are not given
+            priority (int[default=0]): Priority of submission, lower is tested first
+            checker (str[default='exact']): Name of checker (see CHECKERS)
+            epsilon (Optional[float]): Tolerance of float checker
+            mode (str[default='run-all']): Mode of execution, run-all, stop-on-first or group (see ordering module)
+            groups (Optional[list]): Group of every test in group mode
+
+        Returns:
+            Submission: Submission (see get for structure)
+
+        Raises:
+            ValueError: If submission is invalid
+            QueueFullError: If queue is full
+
+        """
+        # request is validated completely before source is written
+        if lang not in self.langs:
+            raise ValueError('Unknown lang {0}'.format(lang))
+        if not isinstance(source, str):
+            raise ValueError('Source must be string')
+        if checker not in CHECKERS:
+            raise ValueError('Unknown checker {0}'.format(checker))
+        if not isinstance(priority, int):
+            raise ValueError('Priority must be integer')
+        if mode not in MODES:
+            raise ValueError('Unknown mode {0}'.format(mode))
+
+        checker_factory = CHECKERS[checker]
+        if epsilon is not None:
+            if checker != 'float':
+                raise ValueError('Epsilon is supported only by float checker')
+            checker_factory = partial(FloatChecker, epsilon=float(epsilon))
+
+        # failures are recorded only for tests of problem, inline tests differ from submission to submission
+        problem = problem if tests is None else None
+        tests = self._tests(tests, problem)
+        try:
+            if mode == STOP_IN_GROUP and (not isinstance(groups, list) or len(groups) != len(tests) or
+                                          not all(isinstance(group, (int, str)) for group in groups)):
+                raise ValueError('Group of every test must be given in group mode')
+
+            config = self.langs[lang]
+            submission = Submission(id=uuid.uuid4().hex, state=QUEUED, lang=lang, priority=priority,
+                                    submitted=time.time())
+
+            # engine substitutes file name into commands like "./{filename}", so path is relative
+            filename = os.path.relpath(os.path.join(self.workspace, '{0}.{1}'.format(submission.id,
+                                                                                    config.extension)))
+            with open(filename, 'w') as f:
+                f.write(source)
+
+            with self._lock:
+                try:
+                    self.queue.put((submission, filename, config, tests, checker_factory, mode, groups, problem),
+                                   priority)
+                except QueueFullError:
+                    os.remove(filename)
+                    self._received.inc(result='rejected')
+                    raise
+                self._remember(submission)
+                self._received.inc(result='queued')
+                self._queue_depth.set(len(self.queue))
+        except Exception:
+            self._release_tests(tests)
+            raise
+        return submission
+
+    def get(self, id, timeout=None):
+        """Gets submission.
+
+        Args:
+            id (str): Id of submission
+            timeout (Optional[float]): Seconds to wait for submission to be tested
+
+        Returns:
+            Optional[Submission]: None if there is no such submission, otherwise submission with following structure
+                {
+                    "id": "f3a0...",
+                    "state": "done",                # queued|running|done|failed
+                    "lang": "py",
+                    "priority": 0,
+                    "submitted": 1500000000.0,      # time of submission, testing start and finish
+                    "started": 1500000000.1,
+                    "finished": 1500000000.5,
+                    "result": {},                   # result of testing (see Engine.test_suite)
+                    "error": None                   # error if testing has failed
+                }
+
+        """
+        with self._lock:
+            if timeout:
+                self._finished.wait_for(lambda: id not in self._submissions or
+                                        self._submissions[id].state in (DONE, FAILED), timeout)
+            return self._submissions.get(id)
+
+    def stats(self):
+        """Gets load of judge.
+
+        Returns:
+            Map: Load with following structure
+                {
+                    "depth": 3,                     # number of submissions waiting in queue
+                    "capacity": 100,                # maximum number of them
+                    "depths": {"0": 1, "10": 2},    # number of waiting submissions by priority
+                    "running": 2,                   # number of submissions being tested
+                    "workers": 2                    # maximum number of them
+                }
+
+        """
+        with self._lock:
+            running = self._running
+        return Map({'depth': len(self.queue), 'capacity': self.queue.capacity,
+                    'depths': dict((str(priority), count) for priority, count in self.queue.depths().items()),
+                    'running': running, 'workers': self.workers})
+
+    def close(self):
+        """Stops worker threads after submissions being tested and drops waiting ones.
+
+        """
+        self.queue.close()
+        for thread in self._threads:
+            thread.join()
+        with self._lock:
+            for _, tests in self._problem_tests.values():
+                if isinstance(tests, TestPack):
+                    tests.close()
+            self._problem_tests = {}
+        if self._own_workspace:
+            shutil.rmtree(self.workspace, ignore_errors=True)
+
+    def _tests(self, tests, problem):
+        """Gets tests of submission.
+
+        Args:
+            tests (Optional[list]): Pairs of input and expected output
+            problem (Optional[str]): Name of problem
+
+        Returns:
+            list|TestPack: Pairs of input and expected output, tests of problem are given as paths or pack.
+                Pack is used by submission until it is released by _release_tests
+
+        Raises:
+            ValueError: If tests are invalid or problem does not exist
+
+        """
+        if tests is not None:
+            if not all(isinstance(test, (list, tuple)) and len(test) == 2 and
+                       all(isinstance(part, str) for part in test) for test in tests):
+                raise ValueError('Tests must be pairs of input and expected output')
+            return [tuple(test) for test in tests]
+
+        if self.problems is None or not isinstance(problem, str) or problem.startswith('.') or '/' in problem:
+            raise ValueError('Either tests or name of problem must be given')
+        # problem is either pack of tests or directory with them
+        path = os.path.join(self.problems, problem + '.pack')
+        if not os.path.isfile(path):
+            path = os.path.join(self.problems, problem)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            raise ValueError('Unknown problem {0}'.format(problem))
+
+        # packs are mapped and directories are listed once per change, so all submissions share their pages
+        with self._lock:
+            cached = self._problem_tests.get(problem)
+            if cached is not None and cached[0] == (path, mtime):
+                self._use_tests(cached[1])
+                return cached[1]
+
+        if path.endswith('.pack'):
+            try:
+                tests = TestPack(path)
+            except InvalidTestPackError as e:
+                raise ValueError(str(e))
+        else:
+            inputs = sorted(name for name in os.listdir(path) if name.endswith('.in'))
+            tests = [(Path(path, name), Path(path, name[:-len('.in')] + '.out')) for name in inputs
+                     if os.path.isfile(os.path.join(path, name[:-len('.in')] + '.out'))]
+        if not len(tests):
+            if isinstance(tests, TestPack):
+                tests.close()
+            raise ValueError('Problem {0} has no tests'.format(problem))
+
+        with self._lock:
+            replaced = self._problem_tests.get(problem)
+            self._problem_tests[problem] = ((path, mtime), tests)
+            if replaced is not None and isinstance(replaced[1], TestPack):
+                self._retired_packs.add(replaced[1])
+                self._close_unused(replaced[1])
+            self._use_tests(tests)
+        return tests
+
+    def _use_tests(self, tests):
+        # called with lock held
+        if isinstance(tests, TestPack):
+            self._pack_users[tests] += 1
+
+    def _release_tests(self, tests):
+        """Releases tests of finished or rejected submission, closing replaced pack nobody uses anymore.
+
+        Args:
+            tests (list|TestPack): Tests returned by _tests
+
+        """
+        if not isinstance(tests, TestPack):
+            return
+        with self._lock:
+            self._pack_users[tests] -= 1
+            self._close_unused(tests)
+
+    def _close_unused(self, pack):
+        # called with lock held
+        if pack in self._retired_packs and self._pack_users[pack] <= 0:
+            self._retired_packs.discard(pack)
+            del self._pack_users[pack]
+            pack.close()
+
+    def _remember(self, submission):
+        self._submissions[submission.id] = submission
+        while len(self._submissions) > self.history:
+            oldest = next(iter(self._submissions.values()))
+            if oldest.state not in (DONE, FAILED):
+                break  # only finished submissions are forgotten
+            self._submissions.popitem(last=False)
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            submission, filename, config, tests, checker, mode, groups, problem = item
+
+            with self._lock:
+                submission.state, submission.started = RUNNING, time.time()
+                self._running += 1
+                self._queue_depth.set(len(self.queue))
+                self._running_gauge.set(self._running)
+            self._wait_seconds.observe(submission.started - submission.submitted)
+
+            result, error = None, None
+            try:
+                with logs.context(submission=submission.id):
+                    result = self.engine.test_suite(filename, config, tests, autoremove=True, checker=checker,
+                                                    mode=mode, groups=groups if mode == STOP_IN_GROUP else None,
+                                                    problem=problem)
+            except Exception as e:
+                error = str(e)
+                self.engine.logger.error('Testing of submission %s has failed: %s', submission.id, e)
+            finally:
+                self._release_tests(tests)
+
+            with self._lock:
+                submission.result, submission.error = result, error
+                submission.state, submission.finished = (DONE if error is None else FAILED), time.time()
+                self._running -= 1
+                self._running_gauge.set(self._running)
+                self._finished.notify_all()
+
+
+class JudgeHandler(BaseHTTPRequestHandler):
+    """Handler of HTTP API of judge (see module docstring).
+
+    """
+
+    server_version = 'carbon'
+
+    def do_GET(self):
+        judge = self.server.judge
+        url = urlsplit(self.path)
+        if url.path == '/queue':
+            self._reply(200, judge.stats())
+        elif url.path == '/metrics':
+            self._reply(200, judge.engine.metrics.to_prometheus(), 'text/plain; version=0.0.4')
+        elif url.path.startswith('/submissions/'):
+            try:
+                timeout = float(parse_qs(url.query).get('wait', [0])[0])
+            except ValueError:
+                return self._reply(400, {'error': 'Invalid wait'})
+            submission = judge.get(url.path[len('/submissions/'):], timeout)
+            if submission is None:
+                return self._reply(404, {'error': 'Unknown submission'})
+            self._reply(200, submission)
+        else:
+            self._reply(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        judge = self.server.judge
+        if urlsplit(self.path).path != '/submissions':
+            return self._reply(404, {'error': 'Not found'})
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            return self._reply(400, {'error': 'Invalid Content-Length'})
+        if length > MAX_REQUEST_SIZE:
+            self.close_connection = True
+            return self._reply(413, {'error': 'Submission is larger than {0} bytes'.format(MAX_REQUEST_SIZE)})
+
+        try:
+            body = json.loads(self.rfile.read(length))
+            if not isinstance(body, dict):
+                raise ValueError('Submission must be JSON object')
+            submission = judge.submit(**body)
+        except QueueFullError as e:
+            # clients should retry later instead of piling up submissions
+            return self._reply(503, {'error': str(e), 'depth': e.depth, 'capacity': e.capacity},
+                               headers={'Retry-After': '1'})
+        except (ValueError, TypeError) as e:
+            return self._reply(400, {'error': str(e)})
+        self._reply(202, submission)
+
+    def _reply(self, code, body, content_type='application/json', headers=None):
+        data = (body if isinstance(body, str) else json.dumps(body, default=Record.to_dict)).encode('UTF-8')
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('X-Queue-Depth', str(len(self.server.judge.queue)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        self.server.judge.engine.logger.debug('%s - ' + format, self.client_address[0], *args)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP server listening on Unix socket.
+
+    """
+
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super(UnixHTTPServer, self).get_request()
+        # handler expects address of client to be pair of host and port
+        return request, ('unix', 0)
+
+
+def make_server(judge, address):
+    """Creates HTTP server of judge.
+
+    Args:
+        judge (Judge): Judge serving requests
+        address (str|tuple): Path of Unix socket or pair of host and port
+
+    Returns:
+        socketserver.BaseServer: Server, requests are served after serve_forever is called
+
+    """
+    if isinstance(address, str):
+        if os.path.exists(address):
+            os.remove(address)  # socket left by previous run
+        server = UnixHTTPServer(address, JudgeHandler)
+    else:
+        server = ThreadingHTTPServer(address, JudgeHandler)
+        server.daemon_threads = True
+    server.judge = judge
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    listen = parser.add_mutually_exclusive_group(required=True)
+    listen.add_argument('--unix', help='path of Unix socket to listen on')
+    listen.add_argument('--port', type=int, help='TCP port to listen on')
+    parser.add_argument('--host', default='127.0.0.1', help='TCP host to listen on')
+    parser.add_argument('--workers', type=int, default=1, help='number of submissions tested in parallel')
+    parser.add_argument('--queue-size', type=int, default=100, help='maximum number of waiting submissions')
+    parser.add_argument('--problems', help='directory with tests of problems')
+    parser.add_argument('--cache', help='directory of compilation cache')
+    parser.add_argument('--cpus', type=int, nargs='+', help='cores tests are pinned to')
+    parser.add_argument('--workspaces', help='directory of workspaces of runs, tmpfs if available by default')
+    parser.add_argument('--failure-stats', help='JSON file failure statistics of tests of problems are kept in')
+    parser.add_argument('--calibration', choices=('off', 'report', 'subtract'), default='off',
+                        help='measure startup of langs and report it in results or subtract it from runs')
+    parser.add_argument('--verbose', action='store_true', help='log every test')
+    parser.add_argument('--json-logs', action='store_true', help='log JSON lines with ids of submissions and tests')
+    args = parser.parse_args()
+
+    cache = CompilationCache(args.cache) if args.cache else None
+    # every submission holds workspace of its executable and one workspace per run
+    workspaces = WorkspacePool(args.workspaces, 2 * args.workers)
+    failure_stats = FailureStats(args.failure_stats)
+    calibrator = Calibrator(subtract=args.calibration == 'subtract') if args.calibration != 'off' else None
+    engine = Engine(logging.INFO if args.verbose else logging.WARNING, compilation_cache=cache, cpus=args.cpus,
+                    workspaces=workspaces, failure_stats=failure_stats, structured_logs=args.json_logs,
+                    calibrator=calibrator)
+    judge = Judge(engine, workers=args.workers, queue_size=args.queue_size, problems=args.problems)
+    server = make_server(judge, args.unix or (args.host, args.port))
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        judge.close()
+        engine.close()
+        workspaces.close()
+        failure_stats.save()
+        if args.unix:
+            os.remove(args.unix)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,37 @@
 import os.path
-import logging
-from colorlog import ColoredFormatter
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from errors import *
-from utils import Map
+from utils import Record
+from config import LangConfig
 from program import Program
+from verdicts import *
+from affinity import CorePool
+from checkers import StreamingChecker, DigestChecker
+from cache import CachedResult
+from zygote import ZygotePool
+from hooks import Hooks
+from metrics import MetricsRegistry
+import logs
+from ordering import FailureStats, RUN_ALL, STOP_IN_GROUP, MODES
+
+
+class TestResult(Record):
+    """Result of one test (see Engine.test_suite for structure).
+
+    """
+
+    __slots__ = ('verdict', 'time', 'cpu_time', 'memory', 'mismatch', 'phases', 'cached', 'timing')
+
+
+class SuiteResult(Record):
+    """Result of testing of source (see Engine.test_suite for structure).
+
+    """
+
+    __slots__ = ('verdict', 'compilation_error', 'cache_hit', 'calibration', 'phases', 'tests')
 
 
 class Engine:
@@ -12,75 +39,776 @@ class Engine:
     In this class all components are together. Program will be compiled, executed and checked
     for the right answer here.
 
+    Attributes:
+        metrics (MetricsRegistry): Counters and histograms of compilations, tests and their phases per lang
+        hooks (Hooks): Callbacks subscribed to events of engine, which are
+            compiled(program, result)           # source is compiled or compilation has failed
+            test(program, number, test)         # test is finished
+            suite(program, result)              # testing of source is finished
+
     """
 
-    def __init__(self, logging_level):
+    def __init__(self, logging_level, compilation_cache=None, workers=1, cpus=None, isolate_cpus=False,
+                 metrics=None, result_cache=None, workspaces=None, failure_stats=None, structured_logs=False,
+                 timing=None, calibrator=None):
         """Init method of engine.
 
         Args:
             logging_level (int): Minimal level for logging of events
+            compilation_cache (Optional[CompilationCache]): Cache of compilation results shared by programs
+            workers (int[default=1]): Number of tests executed in parallel
+            cpus (Optional[iterable]): Cores test runs are pinned to, one run per core. If None, runs are
+                pinned to cores available to engine when workers > 1 and are not pinned otherwise
+            isolate_cpus (bool[default=False]): Keep supervisor threads off cores test runs are pinned to
+            metrics (Optional[MetricsRegistry]): Registry metrics are recorded to, new one is created if None
+            result_cache (Optional[ResultCache]): Cache of results of tests, tests of the same executable,
+                input, limits and checker are not executed again
+            workspaces (Optional[WorkspacePool]): Workspaces compilations and test runs are isolated in, size
+                of pool should be workers plus one, programs are run in directory of source if None
+            failure_stats (Optional[FailureStats]): Failure statistics tests of problems are ordered by in fail-fast
+                modes, statistics are kept in memory if None
+            structured_logs (bool[default=False]): Log JSON lines with ids of submission and test instead of
+                colored text, logger is shared by all engines, so the last created engine sets its format
+            timing (Optional[StatisticalTiming]): Policy of reruns of runs close to time limit, every run is
+                executed once if None
+            calibrator (Optional[Calibrator]): Startup baselines of langs reported in results and, if calibrator
+                subtracts them, subtracted from time and memory of runs
 
         """
-        # init logging
-        handler = logging.StreamHandler()
-        handler.setFormatter(
-            ColoredFormatter(
-                ('%(green)s%(asctime)s%(reset)s ' +
-                 '%(cyan)s%(filename)s:%(lineno)d%(reset)s ' +
-                 '%(log_color)s%(bold)s%(levelname)-8s%(reset)s ' +
-                 '%(log_color)s%(message)s%(reset)s'),
-                datefmt=None,
-                reset=True,
-                log_colors={
-                        'DEBUG':    'cyan',
-                        'INFO':     'green',
-                        'WARNING':  'yellow',
-                        'ERROR':    'red',
-                        'CRITICAL': 'red',
-                },
-                secondary_log_colors={},
-                style='%'
-            )
-        )
-        self.logger = logging.getLogger('carbon_engine')
-        self.logger.addHandler(handler)
-        self.logger.setLevel(logging_level)
-
-    def test_program(self, filename, lang_config, input, output, autoremove=False):
+        self.compilation_cache, self.result_cache, self.workspaces = compilation_cache, result_cache, workspaces
+        self.failure_stats = failure_stats if failure_stats is not None else FailureStats()
+        self.timing, self.calibrator = timing, calibrator
+
+        self.core_pool = None
+        if cpus is not None or workers > 1 or isolate_cpus:
+            self.core_pool = CorePool(cpus, isolate_cpus)
+        self.workers = min(workers, len(self.core_pool)) if self.core_pool else workers
+
+        self.hooks = Hooks()
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self._compilations = self.metrics.counter('carbon_compilations_total', 'Number of compilations',
+                                                  ('lang', 'result'))
+        self._compilation_seconds = self.metrics.histogram('carbon_compilation_seconds', 'Duration of compilations',
+                                                           ('lang',))
+        self._tests = self.metrics.counter('carbon_tests_total', 'Number of executed tests', ('lang', 'verdict'))
+        self._test_seconds = self.metrics.histogram('carbon_test_seconds', 'Duration of test runs',
+                                                    ('lang', 'verdict'))
+        self._phase_seconds = self.metrics.histogram('carbon_phase_seconds', 'Duration of phases of test runs',
+                                                     ('lang', 'phase'))
+        self._suites = self.metrics.counter('carbon_suites_total', 'Number of tested sources', ('lang', 'verdict'))
+        self._cached_results = self.metrics.counter('carbon_result_cache_total', 'Lookups of results of tests in cache',
+                                                    ('lang', 'result'))
+
+        # warm interpreters are shared by all programs of the same zygote config
+        self.zygote_pools = {}
+        self._zygote_lock = threading.Lock()
+
+        # handler is attached once and records are written by background thread (see logs module)
+        self.logger = logs.setup(logging_level, structured_logs)
+
+    def test_program(self, filename, lang_config, input, output, autoremove=False, checker=StreamingChecker):
         """Checking source code for passing one test.
 
         Args:
             filename (str): File name of source
-            lang_config (dict|Map): Config for Program (see Program's class Attributes for structure)
-            input (str): Input to be passed into program STDIN
-            output (str): Output expected to be got from program
+            lang_config (dict|LangConfig): Config for Program (see Program's class Attributes for structure)
+            input (str|os.PathLike): Input to be passed into program STDIN or path of file with it
+            output (str|os.PathLike): Output expected to be got from program or path of file with it
             autoremove (bool[default=False]): Remove file after execution
+            checker (callable[default=StreamingChecker]): Checker factory (see test_suite)
+
+        Returns:
+            SuiteResult: Result of testing (see test_suite for structure)
 
         Raises:
             FileDoesNotExistError: File named by filename arg is not found
 
         """
+        return self.test_suite(filename, lang_config, [(input, output)], autoremove, checker)
 
-        # check if file exists
-        if not os.path.isfile(filename):
-            raise FileDoesNotExistError()
+    def test_suite(self, filename, lang_config, tests, autoremove=False, checker=StreamingChecker, mode=RUN_ALL,
+                   groups=None, problem=None):
+        """Checking source code for passing several tests, compiling it only once.
+
+        Args:
+            filename (str): File name of source
+            lang_config (dict|LangConfig): Config for Program (see Program's class Attributes for structure)
+            tests (list): Pairs of input to be passed into program STDIN and output expected to be got from program.
+                Tests given as paths (e.g. pathlib.Path) are connected to STDIN and memory-mapped by checker,
+                so they are never read into memory of engine, so are tests of TestPack (see testpack module).
+            autoremove (bool[default=False]): Remove file after all tests are executed
+            checker (callable[default=StreamingChecker]): Checker factory called as checker(output, input) for
+                every test, e.g. TokenChecker or functools.partial(FloatChecker, epsilon=1e-9) (see checkers module)
+            mode (str[default='run-all']): Mode of execution (see ordering module): run-all executes all tests,
+                stop-on-first stops testing at the first failure and group stops testing of group at it
+            groups (Optional[list]): Group of every test in group mode, e.g. [1, 1, 2, 2, 2] for two subtasks
+            problem (Optional[str]): Name of problem, its tests which fail most often are executed first
+                in fail-fast modes and failures are recorded to failure statistics of engine
 
-        if not isinstance(lang_config, Map):
-            lang_config = Map(lang_config)
+        Returns:
+            SuiteResult: Result of testing with following structure, converted to dict by to_dict. Tests are
+                in given order, whatever order they were executed in.
+                {
+                    "verdict": "OK",                    # verdict of failed test with the least number or OK
+                    "compilation_error": None,          # text of compilation error if source was not compiled
+                    "cache_hit": None,                  # was compilation result taken from cache (see Program)
+                    "calibration": {                    # startup baseline of lang, None without calibrator
+                        "time": 21.0,                   #   (see calibration module), time and memory of tests
+                        "memory": 9216.0,               #   have it subtracted if calibrator subtracts it
+                        "runs": 10,
+                        "measured": 1500000000.0
+                    },
+                    "phases": {                         # duration of phases of testing in milliseconds
+                        "compilation": 512.3,
+                        "testing": 40.1
+                    },
+                    "tests": [
+                        {
+                            "verdict": "OK",            # verdict of test, SK if test was skipped
+                            "time": 15,                 # execution time in milliseconds
+                            "cpu_time": 12,             # CPU time in milliseconds
+                            "memory": 5120.0,           # maximum memory use in kB
+                            "mismatch": None,           # first difference of STDOUT for WA (see StreamingChecker)
+                            "phases": {},               # duration of phases of run (see Process status)
+                            "cached": None,             # was result taken from result cache, None without cache
+                            "timing": None              # statistics of reruns of borderline run, None if it was
+                                                        #   executed once (see StatisticalTiming.summarize)
+                        }
+                    ]
+                }
+
+        Raises:
+            FileDoesNotExistError: File named by filename arg is not found
+            InvalidConfigError: If lang config is invalid
+            ValueError: If mode is unknown or groups do not match tests
+
+        """
+        order = self._order_tests(tests, mode, groups, problem)
+        program, result = self.compile_suite(filename, lang_config)
+        if result.verdict != COMPILATION_ERROR:
+            self._execute_suite(program, result, tests, order, autoremove, checker, mode, groups, problem)
+        return result
 
-        program = Program(filename, lang_config)
+    def compile_suite(self, filename, lang_config):
+        """Compiles source, the first stage of test_suite.
 
-        self.logger.info('Compiling {0}...'.format(program.filename))
+        Stages can be run by different threads, e.g. source of the next submission is compiled while tests
+        of the previous one are executed (see pipeline module).
+
+        Args:
+            filename (str): File name of source
+            lang_config (dict|LangConfig): Config for Program
+
+        Returns:
+            tuple: Program and result of testing (see test_suite for structure). If compilation has failed,
+                verdict of result is CE, result is final and program is closed.
+
+        Raises:
+            FileDoesNotExistError: File named by filename arg is not found
+            InvalidConfigError: If lang config is invalid
+
+        """
+        program, result = self._prepare_suite(filename, lang_config)
+
+        self.logger.info('Compiling %s...', program.filename)
+        start = time.perf_counter()
         try:
             program.compile()
         except Exception as e:
-            self.logger.fatal(e)
+            self._compilation_failed(result, e)
+        finally:
+            self._compiled(program, result, start)
+        return program, result
+
+    def execute_suite(self, program, result, tests, autoremove=False, checker=StreamingChecker, mode=RUN_ALL,
+                      groups=None, problem=None):
+        """Executes tests on program compiled by compile_suite, the second stage of test_suite.
+
+        Args:
+            program (Program): Compiled program, it is closed when testing is finished
+            result (SuiteResult): Result of compilation, filled with results of tests
+            tests (list): Pairs of input and expected output (see test_suite)
+            autoremove (bool[default=False]): Remove file after all tests are executed
+            checker (callable[default=StreamingChecker]): Checker factory (see test_suite)
+            mode (str[default='run-all']): Mode of execution (see test_suite)
+            groups (Optional[list]): Group of every test in group mode
+            problem (Optional[str]): Name of problem (see test_suite)
+
+        Returns:
+            SuiteResult: Result of testing (see test_suite for structure)
 
-        self.logger.info('Executing {0}...'.format(program.filename))
-        status = Map({'stdout': None})
+        Raises:
+            ValueError: If mode is unknown or groups do not match tests
+
+        """
         try:
-            status = program.execute(input, autoremove)
-        except Exception as e:
-            self.logger.fatal(e)
+            order = self._order_tests(tests, mode, groups, problem)
+        except ValueError:
+            program.close()
+            raise
+        self._execute_suite(program, result, tests, order, autoremove, checker, mode, groups, problem)
+        return result
+
+    def _execute_suite(self, program, result, tests, order, autoremove, checker, mode, groups, problem):
+        """Executes tests in given order, finishing suite.
+
+        Args:
+            program (Program): Compiled program
+            result (SuiteResult): Result of testing
+            tests (list): Pairs of input and expected output
+            order (list): Indexes of tests in order of execution (see _order_tests)
+            autoremove (bool): Remove file after all tests are executed
+            checker (callable): Checker factory
+            mode (str): Mode of execution
+            groups (Optional[list]): Group of every test
+            problem (Optional[str]): Name of problem
+
+        """
+        # groups tests are stopped in, None in run-all mode
+        stops = self._stops(len(order), mode, groups)
+        failed = set()
+        result.tests = [None] * len(order)
+        # worker threads do not inherit context of caller, so submission is passed to them
+        submission = logs.SUBMISSION.get()
+
+        def run(index):
+            if stops is not None and stops[index] in failed:
+                result.tests[index] = TestResult(verdict=SKIPPED, phases={})
+                return
+            input, output = tests[index]
+            with logs.context(submission, index + 1):
+                self.logger.info('Executing %s on test %d...', program.filename, index + 1)
+                test = result.tests[index] = self._run_test(program, input, output, checker)
+                self._test_finished(program, index + 1, test)
+            if stops is not None and test.verdict != ACCEPTED:
+                failed.add(stops[index])
+
+        start = time.perf_counter()
+        try:
+            # isolated supervisor runs tests from pinned worker threads even in serial mode
+            if self.workers > 1 or (self.core_pool and self.core_pool.supervisor_cpus):
+                initializer = self.core_pool.pin_supervisor if self.core_pool else None
+                with ThreadPoolExecutor(self.workers, initializer=initializer) as executor:
+                    list(executor.map(run, order))
+            else:
+                for index in order:
+                    run(index)
+        finally:
+            self._finish_suite(program, result, autoremove, start, problem)
+
+    def _order_tests(self, tests, mode, groups, problem):
+        """Gets order tests of suite are executed in.
+
+        Args:
+            tests (list): Tests of suite
+            mode (str): Mode of execution (see ordering module)
+            groups (Optional[list]): Group of every test
+            problem (Optional[str]): Name of problem
+
+        Returns:
+            list: Indexes of tests in order of execution. In fail-fast modes tests which fail most often are
+                first, in group mode groups are executed in order of their first tests.
+
+        Raises:
+            ValueError: If mode is unknown or groups do not match tests
+
+        """
+        if mode not in MODES:
+            raise ValueError('Unknown mode {0}, expected one of {1}'.format(mode, ', '.join(MODES)))
+        if mode == STOP_IN_GROUP and (groups is None or len(groups) != len(tests)):
+            raise ValueError('Group of every test must be given in group mode')
+
+        numbers = range(1, len(tests) + 1)
+        if mode != RUN_ALL and problem is not None:
+            numbers = self.failure_stats.order(problem, numbers)
+        if mode == STOP_IN_GROUP:
+            first = {}
+            for index, group in enumerate(groups):
+                first.setdefault(group, index)
+            numbers = sorted(numbers, key=lambda number: first[groups[number - 1]])
+        return [number - 1 for number in numbers]
+
+    @staticmethod
+    def _stops(count, mode, groups):
+        """Gets groups tests are stopped in.
+
+        Args:
+            count (int): Number of tests
+            mode (str): Mode of execution
+            groups (Optional[list]): Group of every test
+
+        Returns:
+            Optional[list]: Group of every test, the same for all tests in stop-on-first mode, None in run-all mode
+
+        """
+        if mode == RUN_ALL:
+            return None
+        return list(groups) if mode == STOP_IN_GROUP else [None] * count
+
+    def _prepare_suite(self, filename, lang_config, program_class=Program):
+        """Creates program and empty result of testing.
+
+        Args:
+            filename (str): File name of source
+            lang_config (dict|LangConfig): Config for Program
+            program_class (type[default=Program]): Class of program
+
+        Returns:
+            tuple: Program and result of testing (see test_suite for structure)
+
+        Raises:
+            FileDoesNotExistError: File named by filename arg is not found
+            InvalidConfigError: If lang config is invalid
+
+        """
+
+        # check if file exists
+        if not os.path.isfile(filename):
+            raise FileDoesNotExistError()
+
+        lang_config = LangConfig.load(lang_config)
+
+        program = program_class(filename, lang_config, self.compilation_cache, self._zygote_pool(lang_config),
+                                self.workspaces)
+        result = SuiteResult(verdict=ACCEPTED, phases={}, tests=[])
+        if self.calibrator is not None:
+            result.calibration = self.calibrate(lang_config)
+            if self.calibrator.subtract:
+                program.calibration = result.calibration
+        return program, result
+
+    def _zygote_pool(self, lang_config):
+        """Gets pool of warm interpreters for lang config, starting it on first use.
+
+        Args:
+            lang_config (LangConfig): Config for Program
+
+        Returns:
+            Optional[ZygotePool]: Pool of warm interpreters or None if lang config does not use them
+
+        """
+        zygote = lang_config.execution.zygote
+        if not zygote:
+            return None
+
+        key = (zygote.cmd, zygote.size or 1)
+        with self._zygote_lock:
+            if key not in self.zygote_pools:
+                self.zygote_pools[key] = ZygotePool(*key)
+            return self.zygote_pools[key]
+
+    def calibrate(self, lang_config):
+        """Gets startup baseline of lang, calibrating it if it is missing or stale.
+
+        Langs are calibrated on first use, so calling this at start keeps calibration out of the first suite.
+
+        Args:
+            lang_config (dict|LangConfig): Config for Program
+
+        Returns:
+            Optional[Calibration]: Baseline, None if engine has no calibrator or lang can not be calibrated
+
+        """
+        if self.calibrator is None:
+            return None
+        lang_config = LangConfig.load(lang_config)
+        return self.calibrator.get(lang_config, self._zygote_pool(lang_config))
+
+    def close(self):
+        """Stops warm interpreters started by engine.
+
+        """
+        with self._zygote_lock:
+            for pool in self.zygote_pools.values():
+                pool.close()
+            self.zygote_pools = {}
+
+    @staticmethod
+    def _lang(program):
+        """Gets lang label of metrics.
+
+        Args:
+            program (Program): Tested program
+
+        Returns:
+            str: Human-readable lang name or extension of source if lang config has no name
+
+        """
+        return program.config.info.get('lang') or program.config.extension
+
+    def _compiled(self, program, result, start):
+        """Records finished compilation.
 
-        self.logger.info('Comparing STDOUT and expected output... ' + str(status.stdout == output))
+        Args:
+            program (Program): Tested program
+            result (SuiteResult): Result of testing
+            start (float): Time compilation was started at
+
+        """
+        elapsed = time.perf_counter() - start
+        result.cache_hit = program.cache_hit
+        result.phases['compilation'] = round(elapsed * 1000, 3)
+
+        if result.verdict == COMPILATION_ERROR:
+            outcome = 'error'
+        elif not program.config.compilation.need:
+            outcome = 'skipped'
+        else:
+            outcome = 'cached' if program.cache_hit else 'ok'
+        lang = self._lang(program)
+        self._compilations.inc(lang=lang, result=outcome)
+        self._compilation_seconds.observe(elapsed, lang=lang)
+        self.hooks.emit('compiled', program=program, result=result)
+
+        # no tests are executed after compilation error
+        if result.verdict == COMPILATION_ERROR:
+            program.close()
+            self._suites.inc(lang=lang, verdict=result.verdict)
+            self.hooks.emit('suite', program=program, result=result)
+
+    def _compilation_failed(self, result, error):
+        """Fills result of testing with compilation error.
+
+        Args:
+            result (SuiteResult): Result of testing
+            error (Exception): Error raised by compilation
+
+        Returns:
+            SuiteResult: Result of testing
+
+        """
+        self.logger.fatal(error)
+        result.verdict = COMPILATION_ERROR
+        result.compilation_error = str(error)
+        return result
+
+    def _test_finished(self, program, number, test):
+        """Records finished test.
+
+        Args:
+            program (Program): Tested program
+            number (int): Number of test, starting from 1
+            test (TestResult): Result of test
+
+        """
+        self.logger.info('Test %d verdict: %s', number, test.verdict)
+
+        lang = self._lang(program)
+        self._tests.inc(lang=lang, verdict=test.verdict)
+        if 'total' in test.phases:
+            self._test_seconds.observe(test.phases['total'] / 1000, lang=lang, verdict=test.verdict)
+        for phase, duration in test.phases.items():
+            if phase != 'total':
+                self._phase_seconds.observe(duration / 1000, lang=lang, phase=phase)
+        self.hooks.emit('test', program=program, number=number, test=test)
+
+    def _finish_suite(self, program, result, autoremove, start, problem=None):
+        """Computes overall verdict, records failures and removes program if needed.
+
+        Args:
+            program (Program): Tested program
+            result (SuiteResult): Result of testing
+            autoremove (bool): Remove program file
+            start (float): Time testing was started at
+            problem (Optional[str]): Name of problem failures are recorded for
+
+        """
+        result.phases['testing'] = round((time.perf_counter() - start) * 1000, 3)
+        # tests are None if testing has been interrupted by error
+        executed = dict((number, test) for number, test in enumerate(result.tests, 1)
+                        if test is not None and test.verdict != SKIPPED)
+        for number in sorted(executed):
+            if executed[number].verdict != ACCEPTED:
+                result.verdict = executed[number].verdict
+                break
+        if problem is not None and executed:
+            self.failure_stats.record(problem, dict((number, test.verdict != ACCEPTED)
+                                                    for number, test in executed.items()))
+
+        if autoremove and os.path.isfile(program.filename):
+            os.remove(program.filename)
+        program.close()
+
+        self._suites.inc(lang=self._lang(program), verdict=result.verdict)
+        self.hooks.emit('suite', program=program, result=result)
+
+    def _run_test(self, program, input, output, checker=StreamingChecker):
+        """Executes compiled program on one test.
+
+        Args:
+            program (Program): Compiled program
+            input (str|os.PathLike): Input to be passed into program STDIN or path of file with it
+            output (str|os.PathLike): Output expected to be got from program or path of file with it
+            checker (callable[default=StreamingChecker]): Checker factory (see test_suite)
+
+        Returns:
+            TestResult: Result of test (see test_suite for structure)
+
+        """
+        if self.core_pool is not None:
+            with self.core_pool.acquire() as cpu:
+                return self._execute_test(program, input, output, {cpu}, checker)
+        return self._execute_test(program, input, output, checker=checker)
+
+    def _execute_test(self, program, input, output, cpus=None, checker=StreamingChecker):
+        """Executes compiled program on one test, pinning it to given cores.
+
+        Args:
+            program (Program): Compiled program
+            input (str|os.PathLike): Input to be passed into program STDIN or path of file with it
+            output (str|os.PathLike): Output expected to be got from program or path of file with it
+            cpus (Optional[set]): Cores program is pinned to
+            checker (callable[default=StreamingChecker]): Checker factory (see test_suite)
+
+        Returns:
+            TestResult: Result of test (see test_suite for structure)
+
+        """
+        key, entry, test = self._lookup_result(program, input, output, checker)
+        if test is not None:
+            return test
+
+        # every run gets its own checker, so digest of output is taken from the run test is judged by
+        checkers = [self._make_checker(checker, input, output, key)]
+        runs = [self._measure(program, input, cpus, checkers[0])]
+
+        # borderline runs are executed again, verdict is taken from run with median time
+        test = runs[0]
+        if self.timing is not None:
+            spent = 0
+            while self._rerun_needed(program, runs, spent):
+                checkers.append(self._make_checker(checker, input, output, key))
+                runs.append(self._measure(program, input, cpus, checkers[-1]))
+                spent += runs[-1].time or 0
+            test = self._timed(program, runs)
+
+        if key is not None:
+            self._store_result(program, key, entry, test, self._checker_of(test, runs, checkers))
+        return test
+
+    @staticmethod
+    def _make_checker(factory, input, output, key):
+        """Creates checker of one run, hashing output when result is stored in result cache.
+
+        Args:
+            factory (callable): Checker factory
+            input (str|os.PathLike): Input of test
+            output (str|os.PathLike): Expected output
+            key (Optional[str]): Key of test in result cache, None if result is not cached
+
+        Returns:
+            StreamingChecker: Checker of run
+
+        """
+        checker = factory(output, input)
+        return checker if key is None else DigestChecker(checker)
+
+    @staticmethod
+    def _checker_of(test, runs, checkers):
+        """Gets checker of run test is judged by.
+
+        Args:
+            test (TestResult): Result of test, one of runs
+            runs (list): Results of runs of test
+            checkers (list): Checkers of runs
+
+        Returns:
+            StreamingChecker: Checker of run
+
+        """
+        return next(checker for run, checker in zip(runs, checkers) if run is test)
+
+    def _measure(self, program, input, cpus, checker):
+        """Executes program once and judges run.
+
+        Args:
+            program (Program): Compiled program
+            input (str|os.PathLike): Input to be passed into program STDIN or path of file with it
+            cpus (Optional[set]): Cores program is pinned to
+            checker (StreamingChecker): Checker of STDOUT
+
+        Returns:
+            TestResult: Result of run
+
+        """
+        try:
+            status = program.execute(input, cpus=cpus, checker=checker, time_limit=self._time_limit(program))
+        except (ExecutionTimeLimitExceededError, ExecutionMemoryLimitExceededError, OutputLimitExceededError,
+                ExecutionFailedError) as e:
+            return self._judge(e.status, e)
+        return self._judge(status)
+
+    def _time_limit(self, program):
+        """Gets time limit runs are executed with, it is extended by margin in statistical timing mode.
+
+        Args:
+            program (Program): Compiled program
+
+        Returns:
+            Optional[int]: Time limit in milliseconds, None to use limit of config
+
+        """
+        if self.timing is None:
+            return None
+        return self.timing.limit(program.config.execution.limits.time)
+
+    def _rerun_needed(self, program, runs, spent):
+        """Checks if borderline run should be executed once more.
+
+        Args:
+            program (Program): Compiled program
+            runs (list): Results of runs of test so far
+            spent (int): Time of reruns so far in milliseconds
+
+        Returns:
+            bool: True if the first run is borderline and more runs are allowed by timing policy
+
+        """
+        first = runs[0]
+        return (len(runs) < self.timing.runs and
+                self.timing.borderline(first.time, program.config.execution.limits.time) and
+                self.timing.affordable(spent, first.time))
+
+    def _timed(self, program, runs):
+        """Gets result of test from its runs in statistical timing mode.
+
+        Args:
+            program (Program): Compiled program
+            runs (list): Results of runs of test
+
+        Returns:
+            TestResult: Result of run with median time, time limit is exceeded if median time exceeds it
+
+        """
+        time_limit = program.config.execution.limits.time
+        if not self.timing.borderline(runs[0].time, time_limit):
+            return runs[0]
+
+        runs = sorted(runs, key=lambda run: run.time)
+        test = runs[len(runs) // 2]
+        test.timing = self.timing.summarize([run.time for run in runs])
+        if test.timing.noisy:
+            self.logger.warning('Time of %s is noisy: median %s ms, stddev %s ms over %d runs',
+                                program.filename, test.timing.median, test.timing.stddev, test.timing.runs)
+        # runs are executed with extended limit, so limit itself is checked here
+        if test.time > time_limit and test.verdict != TIME_LIMIT_EXCEEDED:
+            test.verdict, test.mismatch = TIME_LIMIT_EXCEEDED, None
+        return test
+
+    def _lookup_result(self, program, input, output, checker):
+        """Looks up result of test in result cache.
+
+        Args:
+            program (Program): Compiled program
+            input (str|os.PathLike): Input of test or path of file with it
+            output (str|os.PathLike): Expected output or path of file with it
+            checker (callable): Checker factory
+
+        Returns:
+            tuple: Key of test, cached entry and result of test. Key is None if engine has no result cache,
+                result is None if test should be executed, which is the case on miss and on hit to be verified
+
+        """
+        if self.result_cache is None:
+            return None, None, None
+
+        key = self.result_cache.key(program.filename, program.config.execution, input, output, checker,
+                                    self._result_settings(program))
+        entry = self.result_cache.get(key)
+        if entry is None:
+            self._cached_results.inc(lang=self._lang(program), result='miss')
+            return key, None, None
+        if self.result_cache.sample():
+            return key, entry, None  # hit is checked by executing test again
+
+        self._cached_results.inc(lang=self._lang(program), result='hit')
+        return key, entry, TestResult(verdict=entry.verdict, time=entry.time, cpu_time=entry.cpu_time,
+                                      memory=entry.memory, mismatch=entry.mismatch, phases={}, cached=True)
+
+    def _result_settings(self, program):
+        """Describes settings of engine results of tests depend on, so they are part of result cache key.
+
+        Args:
+            program (Program): Compiled program
+
+        Returns:
+            dict: Policy of statistical timing and subtracted startup baseline, None if they are not used
+
+        """
+        timing = self.timing and {'runs': self.timing.runs, 'margin': self.timing.margin,
+                                  'budget': self.timing.budget}
+        calibration = program.calibration and {'time': program.calibration.time,
+                                                'memory': program.calibration.memory}
+        return {'timing': timing, 'calibration': calibration}
+
+    def _cacheable(self, program, test):
+        """Checks if result of test can be reused.
+
+        Args:
+            program (Program): Compiled program
+            test (TestResult): Result of test
+
+        Returns:
+            bool: False for TLE which depends on time close to limit. Run is killed at the limit, so only
+                run exceeding extended limit of statistical timing far from borderline is clearly TLE
+
+        """
+        if test.verdict != TIME_LIMIT_EXCEEDED:
+            return True
+        return self.timing is not None and test.timing is None and \
+            not self.timing.borderline(test.time, program.config.execution.limits.time)
+
+    def _store_result(self, program, key, entry, test, checker):
+        """Stores result of executed test in result cache, comparing it with verified entry.
+
+        Args:
+            program (Program): Compiled program
+            key (str): Key of test
+            entry (Optional[CachedResult]): Cached entry being verified, None on miss
+            test (TestResult): Result of test
+            checker (DigestChecker): Checker test was executed with
+
+        """
+        test.cached = False
+        if not self._cacheable(program, test):
+            return
+        digest = checker.digest.hexdigest()
+        if entry is not None:
+            if entry.verdict != test.verdict or entry.output_digest != digest:
+                # program or checker is nondeterministic, so its results can not be reused
+                self.logger.warning('Cached result of %s differs from rerun: %s -> %s',
+                                    program.filename, entry.verdict, test.verdict)
+                self._cached_results.inc(lang=self._lang(program), result='nondeterministic')
+                self.result_cache.invalidate(key)
+                return
+            self._cached_results.inc(lang=self._lang(program), result='verified')
+
+        self.result_cache.put(key, CachedResult(verdict=test.verdict, time=test.time, cpu_time=test.cpu_time,
+                                                memory=test.memory, mismatch=test.mismatch, output_digest=digest))
+
+    def _judge(self, status, error=None):
+        """Gets result of test from status of program executed with checker.
+
+        Args:
+            status (Status): Status object of Process class
+            error (Optional[Exception]): Execution error raised by program
+
+        Returns:
+            TestResult: Result of test (see test_suite for structure)
+
+        """
+        test = TestResult(verdict=ACCEPTED, time=status.time, cpu_time=status.cpu_time, memory=status.memory,
+                          phases=status.phases)
+        if isinstance(error, ExecutionTimeLimitExceededError):
+            test.verdict = TIME_LIMIT_EXCEEDED
+        elif isinstance(error, ExecutionMemoryLimitExceededError):
+            test.verdict = MEMORY_LIMIT_EXCEEDED
+        elif isinstance(error, OutputLimitExceededError):
+            test.verdict = OUTPUT_LIMIT_EXCEEDED
+        elif isinstance(error, ExecutionFailedError):
+            test.verdict = RUNTIME_ERROR
+        elif status.wrong_answer:
+            self.logger.debug('STDOUT differs from expected output at %s', status.mismatch)
+            test.verdict = WRONG_ANSWER
+            test.mismatch = status.mismatch
+        return test
@@ -7,6 +7,67 @@ class FileDoesNotExistError(Exception):
     def __str__(self):
         return 'File does not exist where it should be'
 
+
+class InvalidConfigError(Exception):
+    """Raised when lang config is invalid.
+
+    Args:
+        key (str): Path of invalid key in config, e.g. "execution.limits.time"
+        message (str): Description of problem
+
+    Attributes:
+        key (str): Path of invalid key in config
+        message (str): Description of problem
+
+    """
+
+    def __init__(self, key, message):
+        self.key, self.message = key, message
+
+    def __str__(self):
+        return 'Invalid config at {0}: {1}'.format(self.key, self.message)
+
+
+class InvalidTestPackError(Exception):
+    """Raised when test pack is damaged or is not a test pack.
+
+    Args:
+        path (str): Path of test pack
+        message (str): Description of problem
+
+    Attributes:
+        path (str): Path of test pack
+        message (str): Description of problem
+
+    """
+
+    def __init__(self, path, message):
+        self.path, self.message = path, message
+
+    def __str__(self):
+        return 'Invalid test pack {0}: {1}'.format(self.path, self.message)
+
+
+class CgroupUnavailableError(Exception):
+    """Raised when parent cgroup of cgroup limit backend can not enforce limits.
+
+    Args:
+        path (str): Path of parent cgroup
+        message (str): Description of problem
+
+    Attributes:
+        path (str): Path of parent cgroup
+        message (str): Description of problem
+
+    """
+
+    def __init__(self, path, message):
+        self.path, self.message = path, message
+
+    def __str__(self):
+        return 'Cgroup {0} can not be used: {1}'.format(self.path, self.message)
+
+
 # Compilation Errors
 class CompilationTimeLimitExceededError(Exception):
     """Raised when compilation time limit is exceeded.
@@ -116,6 +177,26 @@ class ExecutionMemoryLimitExceededError(Exception):
         return 'Execution memory limit exceeded - {0} kB ({1} kB expected)'.format(self.given, self.expected)
 
 
+class OutputLimitExceededError(Exception):
+    """Raised when output limit of execution is exceeded.
+
+    Args:
+        given (int): Size of output in bytes when program was stopped by engine
+        expected (int):  Output limit in bytes
+
+    Attributes:
+        given (int): Size of output in bytes when program was stopped by engine
+        expected (int):  Output limit in bytes
+
+    """
+
+    def __init__(self, given, expected):
+        self.given, self.expected = given, expected
+
+    def __str__(self):
+        return 'Output limit exceeded - {0} bytes ({1} bytes expected)'.format(self.given, self.expected)
+
+
 class ExecutionFailedError(Exception):
     """Raised when execution has not finished successfully.
 
@@ -133,4 +214,25 @@ class ExecutionFailedError(Exception):
         self.returncode, self.stderr = returncode, stderr
 
     def __str__(self):
-        return 'Execution failed ({0} return code):\n{1}'.format(self.returncode, self.stderr)
\ No newline at end of file
+        return 'Execution failed ({0} return code):\n{1}'.format(self.returncode, self.stderr)
+
+
+# Judge Errors
+class QueueFullError(Exception):
+    """Raised when submission is rejected because queue of judge is full.
+
+    Args:
+        depth (int): Number of submissions waiting in queue
+        capacity (int): Maximum number of submissions in queue
+
+    Attributes:
+        depth (int): Number of submissions waiting in queue
+        capacity (int): Maximum number of submissions in queue
+
+    """
+
+    def __init__(self, depth, capacity):
+        self.depth, self.capacity = depth, capacity
+
+    def __str__(self):
+        return 'Submission queue is full - {0} submissions ({1} allowed)'.format(self.depth, self.capacity)
@@ -0,0 +1,59 @@
+import logging
+import threading
+
+
+class Hooks:
+    """Callbacks subscribed to events of engine.
+
+    Callbacks are called synchronously in thread which has emitted event, exceptions raised by them
+    are logged and do not affect testing.
+
+    """
+
+    def __init__(self):
+        """Init method of hooks.
+
+        """
+        self._lock = threading.Lock()
+        self._callbacks = {}
+
+    def subscribe(self, event, callback):
+        """Subscribes callback to event.
+
+        Args:
+            event (str): Name of event
+            callback (callable): Function called with keyword arguments of event
+
+        """
+        with self._lock:
+            self._callbacks.setdefault(event, []).append(callback)
+
+    def unsubscribe(self, event, callback):
+        """Unsubscribes callback from event.
+
+        Args:
+            event (str): Name of event
+            callback (callable): Subscribed function
+
+        Raises:
+            ValueError: If callback is not subscribed to event
+
+        """
+        with self._lock:
+            self._callbacks.get(event, []).remove(callback)
+
+    def emit(self, event, **payload):
+        """Calls callbacks subscribed to event.
+
+        Args:
+            event (str): Name of event
+            **payload: Keyword arguments callbacks are called with
+
+        """
+        with self._lock:
+            callbacks = list(self._callbacks.get(event, ()))
+        for callback in callbacks:
+            try:
+                callback(**payload)
+            except Exception:
+                logging.getLogger('carbon_engine').exception('Hook of {0} event has failed'.format(event))
@@ -10,7 +10,8 @@ cpp = {
         "executable": "{filename}.o",
         "limits": {
             "time": 1000,
-            "vms": 104857600
+            "vms": 104857600,
+            "stderr": 1048576
         }
     },
 
@@ -18,7 +19,9 @@ cpp = {
         "cmd": "./{filename}",
         "limits": {
             "time": 1000,
-            "vms": 104857600
+            "vms": 104857600,
+            "output": 67108864,
+            "stderr": 65536
         }
     },
 
@@ -38,7 +41,36 @@ py = {
         "cmd": "python3 ./{filename}",
         "limits": {
             "time": 1000,
-            "vms": 104857600
+            "vms": 104857600,
+            "output": 67108864,
+            "stderr": 65536
+        }
+    },
+
+    "info": {
+        "lang": "Python 3.4"
+    }
+}
+
+# py executed in warm interpreters (see zygote module), they keep running until Engine.close is called
+py_warm = {
+    "extension": "py",
+
+    "compilation": {
+        "need": False
+    },
+
+    "execution": {
+        "cmd": "python3 ./{filename}",
+        "zygote": {
+            "cmd": "python3",
+            "size": 2
+        },
+        "limits": {
+            "time": 1000,
+            "vms": 104857600,
+            "output": 67108864,
+            "stderr": 65536
         }
     },
 
@@ -0,0 +1,260 @@
+import math
+import os
+import os.path
+import resource
+import signal
+import uuid
+
+from errors import CgroupUnavailableError
+
+
+# controllers parent cgroup must enable for its children
+CGROUP_CONTROLLERS = ('cpu', 'memory')
+
+
+class PollingBackend:
+    """Limit backend sampling memory of process from user space.
+
+    Memory limit is checked against VMS samples taken by Process every memory_sample_interval
+    milliseconds, time limit is checked against wall clock.
+
+    Attributes:
+        samples_memory (bool): Process should sample memory of program
+        wall_time_factor (float): Wall clock deadline is time limit multiplied by this factor
+
+    """
+
+    samples_memory = True
+    wall_time_factor = 1
+
+    def __init__(self, **kwargs):
+        """Init method of backend.
+
+        Args:
+            **kwargs: Backend options from lang config, ignored by this backend
+
+        """
+
+    def prepare(self, process):
+        """Called before process is spawned.
+
+        Args:
+            process (Process): Process limits are applied to
+
+        """
+
+    def attach(self, process, pid):
+        """Called by engine before program starts, with pid of process stopped before exec or,
+        for warm interpreters, with pid of interpreter.
+
+        Args:
+            process (Process): Process limits are applied to
+            pid (int): Pid of process running program
+
+        """
+
+    def collect(self, process, rusage):
+        """Called after process is reaped to fill status of process.
+
+        Args:
+            process (Process): Process limits are applied to
+            rusage (Optional[struct_rusage]): Resource usage of process returned by wait4
+
+        """
+
+    def cleanup(self, process):
+        """Called after process is finished, even if it has failed to start.
+
+        Args:
+            process (Process): Process limits are applied to
+
+        """
+
+
+class RlimitBackend(PollingBackend):
+    """Limit backend applying limits with setrlimit before exec.
+
+    Address space is limited with RLIMIT_AS, CPU time with RLIMIT_CPU and size of written
+    files with RLIMIT_FSIZE, all of them are set with prlimit. Time limit is checked against CPU time (user + sys) of process.
+    Allocations past memory limit fail inside program, so they are reported as failed execution
+    rather than memory_limit_exceeded. Use CgroupBackend to get exact memory verdicts.
+
+    Attributes:
+        file_size_limit (Optional[int]): Maximum size of file written by process in bytes
+
+    """
+
+    samples_memory = False
+
+    def __init__(self, file_size_limit=None, wall_time_factor=2, **kwargs):
+        """Init method of backend.
+
+        Args:
+            file_size_limit (Optional[int]): Maximum size of file written by process in bytes
+            wall_time_factor (float[default=2]): Wall clock deadline is time limit multiplied by this factor
+            **kwargs: Other backend options from lang config, ignored by this backend
+
+        """
+        self.file_size_limit, self.wall_time_factor = file_size_limit, wall_time_factor
+
+    def attach(self, process, pid):
+        if process.memory_limit is not None:
+            resource.prlimit(pid, resource.RLIMIT_AS, (process.memory_limit, process.memory_limit))
+        if process.time_limit is not None:
+            seconds = math.ceil(process.time_limit / 1000)
+            resource.prlimit(pid, resource.RLIMIT_CPU, (seconds, seconds + 1))
+        if self.file_size_limit is not None:
+            resource.prlimit(pid, resource.RLIMIT_FSIZE, (self.file_size_limit, self.file_size_limit))
+
+    def collect(self, process, rusage):
+        status = process.status
+        if process.time_limit is not None and status.cpu_time is not None \
+                and status.cpu_time > process.time_limit:
+            status.time_limit_exceeded = True
+        if process.process.returncode == -signal.SIGXCPU:
+            status.time_limit_exceeded = True
+
+
+class CgroupBackend(RlimitBackend):
+    """Limit backend placing process into its own cgroup v2.
+
+    Memory limit is enforced by memory.max, exceeding it is detected by oom_kill counter of
+    memory.events. CPU time and peak memory are read from cpu.stat and memory.peak, so they
+    include all children of process. Parent cgroup must exist in cgroup v2 hierarchy, be writable by
+    engine and have cpu and memory controllers enabled in cgroup.subtree_control, which is checked
+    before process is spawned.
+
+    Attributes:
+        root (str): Path of parent cgroup
+        path (Optional[str]): Path of cgroup of current process
+
+    """
+
+    def __init__(self, root='/sys/fs/cgroup/carbon', file_size_limit=None, wall_time_factor=2, **kwargs):
+        """Init method of backend.
+
+        Args:
+            root (str[default='/sys/fs/cgroup/carbon']): Path of parent cgroup
+            file_size_limit (Optional[int]): Maximum size of file written by process in bytes
+            wall_time_factor (float[default=2]): Wall clock deadline is time limit multiplied by this factor
+            **kwargs: Other backend options from lang config, ignored by this backend
+
+        """
+        super(CgroupBackend, self).__init__(file_size_limit, wall_time_factor)
+        self.root, self.path = root, None
+        self._checked = False
+
+    def _write(self, name, value):
+        with open(os.path.join(self.path, name), 'w') as f:
+            f.write(str(value))
+
+    def _read(self, name):
+        try:
+            with open(os.path.join(self.path, name)) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _read_keyed(self, name):
+        content = self._read(name) or ''
+        return dict((key, int(value)) for key, value in (line.split() for line in content.splitlines()))
+
+    def _check_root(self):
+        """Checks that parent cgroup is in cgroup v2 hierarchy and enables controllers for children.
+
+        Raises:
+            CgroupUnavailableError: If limits can not be enforced in parent cgroup
+
+        """
+        # only cgroup v2 has cgroup.controllers, in other file systems directories are plain directories
+        try:
+            with open(os.path.join(self.root, 'cgroup.controllers')) as f:
+                available = f.read().split()
+            with open(os.path.join(self.root, 'cgroup.subtree_control')) as f:
+                enabled = f.read().split()
+        except OSError as e:
+            raise CgroupUnavailableError(self.root, 'not a cgroup v2 hierarchy ({0})'.format(e))
+        missing = [name for name in CGROUP_CONTROLLERS if name not in available or name not in enabled]
+        if missing:
+            raise CgroupUnavailableError(self.root, 'controllers {0} are not enabled in cgroup.subtree_control'
+                                         .format(', '.join(missing)))
+        self._checked = True
+
+    def prepare(self, process):
+        if not self._checked:
+            self._check_root()
+        path = os.path.join(self.root, 'carbon-{0}'.format(uuid.uuid4().hex))
+        os.mkdir(path)
+        # kernel creates interface files of controllers in every new cgroup
+        if not os.path.isfile(os.path.join(path, 'memory.max')):
+            os.rmdir(path)
+            raise CgroupUnavailableError(self.root, 'memory controller files are missing in child cgroup')
+        self.path = path
+        if process.memory_limit is not None:
+            self._write('memory.max', process.memory_limit)
+            try:
+                self._write('memory.swap.max', 0)
+            except OSError:
+                pass  # swap accounting is disabled
+
+    def attach(self, process, pid):
+        self._write('cgroup.procs', pid)
+        if self.file_size_limit is not None:
+            resource.prlimit(pid, resource.RLIMIT_FSIZE, (self.file_size_limit, self.file_size_limit))
+
+    def collect(self, process, rusage):
+        status = process.status
+
+        cpu = self._read_keyed('cpu.stat')
+        if 'usage_usec' in cpu:
+            status.cpu_time = round(cpu['usage_usec'] / 1000)
+
+        peak = self._read('memory.peak')
+        if peak:
+            status.peak_rss = int(peak) / 1024
+
+        if self._read_keyed('memory.events').get('oom_kill'):
+            status.memory_limit_exceeded = True
+
+        if process.time_limit is not None and status.cpu_time is not None \
+                and status.cpu_time > process.time_limit:
+            status.time_limit_exceeded = True
+
+    def cleanup(self, process):
+        if self.path is None:
+            return
+
+        # kill processes left by program, they prevent cgroup removal
+        try:
+            self._write('cgroup.kill', 1)
+        except OSError:
+            pass  # cgroup.kill is not supported by kernel
+        try:
+            os.rmdir(self.path)
+        except OSError:
+            pass
+        self.path = None
+
+
+BACKENDS = {
+    'polling': PollingBackend,
+    'rlimit': RlimitBackend,
+    'cgroup': CgroupBackend,
+}
+
+
+def make_backend(name=None, **options):
+    """Creates limit backend by its name.
+
+    Args:
+        name (Optional[str]): One of keys of BACKENDS, PollingBackend is used if None
+        **options: Options passed to backend's init method
+
+    Returns:
+        PollingBackend: Limit backend
+
+    Raises:
+        KeyError: If backend with such name does not exist
+
+    """
+    return BACKENDS[name or 'polling'](**options)
@@ -0,0 +1,149 @@
+"""Logging of engine through one background writer shared by all engines.
+
+Records of carbon_engine logger are put into queue by QueueHandler and formatted and written by thread of
+QueueListener, so judging threads never wait for stream. Handler is attached once, whatever number of engines
+is created. Messages are formatted lazily: arguments are substituted only for records which pass level, and
+timestamps, colors and JSON are rendered by writer thread.
+
+Ids of submission and test being judged are kept in context variables and added to every record, structured
+mode writes them with every line of JSON.
+    {"time": 1500000000.1, "level": "INFO", "file": "engine.py", "line": 409, "message": "Test 3 verdict: OK",
+     "submission": "f3a0...", "test": 3}
+
+"""
+import atexit
+import contextlib
+import contextvars
+import json
+import logging
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+from colorlog import ColoredFormatter
+
+
+LOGGER_NAME = 'carbon_engine'
+
+# ids of submission and test being judged by current thread or task
+SUBMISSION = contextvars.ContextVar('submission', default=None)
+TEST = contextvars.ContextVar('test', default=None)
+
+COLORED_FORMAT = ('%(green)s%(asctime)s%(reset)s ' +
+                  '%(cyan)s%(filename)s:%(lineno)d%(reset)s ' +
+                  '%(log_color)s%(bold)s%(levelname)-8s%(reset)s ' +
+                  '%(log_color)s%(message)s%(reset)s')
+
+LOG_COLORS = {
+    'DEBUG':    'cyan',
+    'INFO':     'green',
+    'WARNING':  'yellow',
+    'ERROR':    'red',
+    'CRITICAL': 'red',
+}
+
+_lock = threading.Lock()
+_handler = None
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as JSON lines with ids of submission and test.
+
+    """
+
+    def format(self, record):
+        line = {
+            'time': record.created,
+            'level': record.levelname,
+            'file': record.filename,
+            'line': record.lineno,
+            'message': record.getMessage(),
+            'submission': getattr(record, 'submission', None),
+            'test': getattr(record, 'test', None),
+        }
+        if record.exc_info:
+            line['exception'] = self.formatException(record.exc_info)
+        return json.dumps(line, default=str)
+
+
+class _ContextQueueHandler(QueueHandler):
+    """Queue handler adding ids of context to records and leaving their formatting to listener.
+
+    """
+
+    def prepare(self, record):
+        # only arguments are substituted here, since they may change after record is queued
+        record.msg, record.args = record.getMessage(), None
+        record.submission, record.test = SUBMISSION.get(), TEST.get()
+        return record
+
+
+def setup(level, structured=False, stream=None):
+    """Sets up logger of engine, handler and writer thread are created only once.
+
+    Args:
+        level (int): Minimal level of logged records
+        structured (bool[default=False]): Write JSON lines instead of colored text
+        stream (Optional[file]): Stream records are written to, STDERR if None
+
+    Returns:
+        Logger: Logger of engine
+
+    """
+    global _handler, _listener
+
+    logger = logging.getLogger(LOGGER_NAME)
+    with _lock:
+        if _handler is None:
+            records = queue.SimpleQueue()
+            _handler = _ContextQueueHandler(records)
+            _listener = QueueListener(records, logging.StreamHandler(stream))
+            _listener.start()
+            atexit.register(shutdown)
+            logger.addHandler(_handler)
+
+        output = _listener.handlers[0]
+        if stream is not None and stream is not output.stream:
+            output.setStream(stream)
+        if structured:
+            output.setFormatter(JsonFormatter())
+        elif not isinstance(output.formatter, ColoredFormatter):
+            output.setFormatter(ColoredFormatter(COLORED_FORMAT, reset=True, log_colors=LOG_COLORS, style='%'))
+    logger.setLevel(level)
+    return logger
+
+
+def shutdown():
+    """Writes queued records and stops writer thread, next setup starts it again.
+
+    """
+    global _handler, _listener
+
+    with _lock:
+        if _handler is None:
+            return
+        logging.getLogger(LOGGER_NAME).removeHandler(_handler)
+        _listener.stop()
+        _handler = _listener = None
+
+
+@contextlib.contextmanager
+def context(submission=None, test=None):
+    """Sets ids of submission and test added to records logged inside block.
+
+    Args:
+        submission (Optional[str]): Id of submission, id of outer block is kept if None
+        test (Optional[int]): Number of test, number of outer block is kept if None
+
+    """
+    tokens = []
+    if submission is not None:
+        tokens.append((SUBMISSION, SUBMISSION.set(submission)))
+    if test is not None:
+        tokens.append((TEST, TEST.set(test)))
+    try:
+        yield
+    finally:
+        for variable, token in reversed(tokens):
+            variable.reset(token)
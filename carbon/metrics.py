@@ -0,0 +1,336 @@
+import json
+import math
+import threading
+
+from utils import Map
+
+
+# default upper bounds of histogram buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = ('{0}="{1}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+               for name, value in labels)
+    return '{' + ','.join(escaped) + '}'
+
+
+class Counter:
+    """Monotonically increasing value per combination of labels.
+
+    Attributes:
+        name (str): Name of metric
+        help (str): Description of metric
+        labels (tuple): Names of labels
+
+    """
+
+    type = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        """Init method of counter.
+
+        Args:
+            name (str): Name of metric
+            help (str): Description of metric
+            labels (iterable): Names of labels
+
+        """
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError('Metric {0} has labels {1}, got {2}'.format(self.name, self.labels, sorted(labels)))
+        return tuple(labels[name] for name in self.labels)
+
+    def inc(self, value=1, **labels):
+        """Increases counter.
+
+        Args:
+            value (int|float[default=1]): Increment
+            **labels: Values of all labels of metric
+
+        Raises:
+            ValueError: If set of labels differs from labels of metric
+
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels):
+        """Gets current value of counter.
+
+        Args:
+            **labels: Values of all labels of metric
+
+        Returns:
+            int|float: Value, 0 if counter has not been increased yet
+
+        """
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        """Gets samples of metric.
+
+        Returns:
+            list: Tuples of name suffix, labels and value
+
+        """
+        with self._lock:
+            return [('', tuple(zip(self.labels, key)), value) for key, value in sorted(self._values.items())]
+
+    def to_dict(self):
+        with self._lock:
+            values = [{'labels': dict(zip(self.labels, key)), 'value': value}
+                      for key, value in sorted(self._values.items())]
+        return {'type': self.type, 'help': self.help, 'values': values}
+
+
+class Gauge(Counter):
+    """Value per combination of labels, which can go up and down.
+
+    """
+
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        """Sets value of gauge.
+
+        Args:
+            value (int|float): New value
+            **labels: Values of all labels of metric
+
+        Raises:
+            ValueError: If set of labels differs from labels of metric
+
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, value=1, **labels):
+        """Decreases gauge.
+
+        Args:
+            value (int|float[default=1]): Decrement
+            **labels: Values of all labels of metric
+
+        Raises:
+            ValueError: If set of labels differs from labels of metric
+
+        """
+        self.inc(-value, **labels)
+
+
+class Histogram(Counter):
+    """Distribution of observed values per combination of labels.
+
+    Attributes:
+        buckets (tuple): Upper bounds of buckets, +Inf bucket is added implicitly
+
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        """Init method of histogram.
+
+        Args:
+            name (str): Name of metric
+            help (str): Description of metric
+            labels (iterable): Names of labels
+            buckets (iterable[default=DEFAULT_BUCKETS]): Upper bounds of buckets
+
+        """
+        super(Histogram, self).__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def inc(self, value=1, **labels):
+        raise TypeError('Histogram {0} can only observe values'.format(self.name))
+
+    def observe(self, value, **labels):
+        """Adds value to distribution.
+
+        Args:
+            value (int|float): Observed value
+            **labels: Values of all labels of metric
+
+        Raises:
+            ValueError: If set of labels differs from labels of metric
+
+        """
+        key = self._key(labels)
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = [[0] * len(self.buckets), 0, 0]
+            counts, _, _ = state = self._values[key]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def value(self, **labels):
+        """Gets current distribution.
+
+        Args:
+            **labels: Values of all labels of metric
+
+        Returns:
+            Map: Cumulative count per bucket, sum and count of observed values
+
+        """
+        counts, total, count = self._values.get(self._key(labels), [[0] * len(self.buckets), 0, 0])
+        return Map({'buckets': self._cumulative(counts), 'sum': total, 'count': count})
+
+    def _cumulative(self, counts):
+        cumulative, buckets = 0, []
+        for bound, bucket in zip(self.buckets, counts):
+            cumulative += bucket
+            buckets.append((bound, cumulative))
+        return buckets
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                labels = tuple(zip(self.labels, key))
+                for bound, cumulative in self._cumulative(counts):
+                    samples.append(('_bucket', labels + (('le', _format_value(bound)),), cumulative))
+                samples.append(('_sum', labels, total))
+                samples.append(('_count', labels, count))
+        return samples
+
+    def to_dict(self):
+        with self._lock:
+            values = [{'labels': dict(zip(self.labels, key)),
+                       'buckets': [[_format_value(bound), cumulative] for bound, cumulative in self._cumulative(counts)],
+                       'sum': total, 'count': count}
+                      for key, (counts, total, count) in sorted(self._values.items())]
+        return {'type': self.type, 'help': self.help, 'values': values}
+
+
+class MetricsRegistry:
+    """Set of metrics exported together.
+
+    Metrics are created on first request and shared afterwards, so several components can
+    record values to the same metric.
+
+    """
+
+    def __init__(self):
+        """Init method of registry.
+
+        """
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get(self, metric_class, name, help, labels, **options):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = metric_class(name, help, labels, **options)
+            metric = self._metrics[name]
+        if type(metric) is not metric_class or metric.labels != tuple(labels):
+            raise ValueError('Metric {0} is already registered with another type or labels'.format(name))
+        return metric
+
+    def counter(self, name, help, labels=()):
+        """Gets counter, creating it on first request.
+
+        Args:
+            name (str): Name of metric
+            help (str): Description of metric
+            labels (iterable): Names of labels
+
+        Returns:
+            Counter: Counter
+
+        Raises:
+            ValueError: If metric with such name has another type or labels
+
+        """
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        """Gets gauge, creating it on first request.
+
+        Args:
+            name (str): Name of metric
+            help (str): Description of metric
+            labels (iterable): Names of labels
+
+        Returns:
+            Gauge: Gauge
+
+        Raises:
+            ValueError: If metric with such name has another type or labels
+
+        """
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        """Gets histogram, creating it on first request.
+
+        Args:
+            name (str): Name of metric
+            help (str): Description of metric
+            labels (iterable): Names of labels
+            buckets (iterable[default=DEFAULT_BUCKETS]): Upper bounds of buckets
+
+        Returns:
+            Histogram: Histogram
+
+        Raises:
+            ValueError: If metric with such name has another type or labels
+
+        """
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def metrics(self):
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def to_prometheus(self):
+        """Exports metrics in Prometheus text format.
+
+        Returns:
+            str: Metrics in text exposition format
+
+        """
+        lines = []
+        for metric in self.metrics():
+            lines.append('# HELP {0} {1}'.format(metric.name, metric.help.replace('\\', '\\\\').replace('\n', '\\n')))
+            lines.append('# TYPE {0} {1}'.format(metric.name, metric.type))
+            for suffix, labels, value in metric.samples():
+                lines.append('{0}{1}{2} {3}'.format(metric.name, suffix, _format_labels(labels), _format_value(value)))
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self):
+        """Exports metrics as dict.
+
+        Returns:
+            dict: Metrics by their names
+
+        """
+        return dict((metric.name, metric.to_dict()) for metric in self.metrics())
+
+    def to_json(self):
+        """Exports metrics as JSON.
+
+        Returns:
+            str: Metrics by their names
+
+        """
+        return json.dumps(self.to_dict())
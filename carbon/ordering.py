@@ -0,0 +1,130 @@
+"""Modes of suite execution and failure statistics tests are ordered by.
+
+In fail-fast modes engine stops executing tests after the first failure, either of whole suite or of group
+of tests (subtask), the rest of tests get SKIPPED verdict. Tests of problem which fail most often are executed
+first, so wrong submissions are usually rejected after one or two runs.
+
+"""
+import json
+import os
+import os.path
+import threading
+import time
+
+
+# all tests are executed
+RUN_ALL = 'run-all'
+
+# testing is stopped at the first failed test
+STOP_ON_FIRST = 'stop-on-first'
+
+# testing of group is stopped at its first failed test, other groups are executed
+STOP_IN_GROUP = 'group'
+
+MODES = (RUN_ALL, STOP_ON_FIRST, STOP_IN_GROUP)
+
+
+class FailureStats:
+    """Number of runs and failures of every test of problems.
+
+    Attributes:
+        path (Optional[str]): JSON file statistics are kept in, they are kept only in memory if None
+        save_interval (float): Minimal number of seconds between saves of statistics
+
+    """
+
+    def __init__(self, path=None, save_interval=10.0):
+        """Init method of statistics, loading them from file if it exists.
+
+        Args:
+            path (Optional[str]): JSON file statistics are kept in
+            save_interval (float[default=10.0]): Minimal number of seconds between saves of statistics
+
+        """
+        self.path, self.save_interval = path, save_interval
+        self._lock = threading.Lock()
+        self._problems = {}
+        self._saved = time.monotonic()
+        self._dirty = False
+
+        if path is not None and os.path.isfile(path):
+            try:
+                with open(path) as f:
+                    self._problems = json.load(f)
+            except ValueError:
+                pass  # damaged statistics are collected again
+
+    def order(self, problem, numbers):
+        """Orders tests by their failure rate.
+
+        Args:
+            problem (str): Name of problem
+            numbers (iterable): Numbers of tests, starting from 1
+
+        Returns:
+            list: Numbers of tests, the most often failed first, tests which fail equally often keep their order
+
+        """
+        with self._lock:
+            tests = self._problems.get(problem, {})
+            rates = dict((number, self._rate(tests.get(str(number)))) for number in numbers)
+        return sorted(rates, key=lambda number: -rates[number])
+
+    @staticmethod
+    def _rate(counts):
+        if counts is None:
+            return 0
+        runs, failures = counts
+        # one extra run keeps single failure of rarely executed test below frequent failures of others
+        return failures / (runs + 1)
+
+    def record(self, problem, failures):
+        """Records executed tests, saving statistics if save interval has passed.
+
+        Args:
+            problem (str): Name of problem
+            failures (dict): Was test failed by its number
+
+        """
+        with self._lock:
+            tests = self._problems.setdefault(problem, {})
+            for number, failed in failures.items():
+                counts = tests.setdefault(str(number), [0, 0])
+                counts[0] += 1
+                counts[1] += int(bool(failed))
+            self._dirty = True
+            due = self.path is not None and time.monotonic() - self._saved >= self.save_interval
+        if due:
+            self.save()
+
+    def get(self, problem):
+        """Gets statistics of problem.
+
+        Args:
+            problem (str): Name of problem
+
+        Returns:
+            dict: Numbers of runs and failures by numbers of tests
+                {
+                    "1": [120, 3],
+                    "2": [118, 40]
+                }
+
+        """
+        with self._lock:
+            return dict((number, list(counts)) for number, counts in self._problems.get(problem, {}).items())
+
+    def save(self):
+        """Writes statistics to file if they have changed.
+
+        """
+        with self._lock:
+            if self.path is None or not self._dirty:
+                return
+            data = json.dumps(self._problems)
+            self._dirty, self._saved = False, time.monotonic()
+
+        tmp = '{0}.{1}.{2}.tmp'.format(self.path, os.getpid(), threading.get_ident())
+        with open(tmp, 'w') as f:
+            f.write(data)
+        os.replace(tmp, self.path)
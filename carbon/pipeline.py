@@ -0,0 +1,281 @@
+"""Pipeline testing submissions in two stages, compilation and execution, with their own pools of threads.
+
+Engine compiles source of suite only after tests of the previous suite have finished, though compilers are
+heavy on disk and memory and tests are bound by CPU. Pipeline splits test_suite of engine into stages: compilers
+take submissions from unbounded queue and put compiled programs into bounded queue, executors take programs from
+it and run their tests. While executors are busy with tests of one submission, the next ones are compiled.
+
+Sources which fail to compile get their result right away and never take place of executor. Compilations are
+bounded by memory budget, every compilation reserves its memory limit. Queue between stages is bounded, so
+compilers stop when executors fall behind instead of holding executables of many submissions.
+
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from checkers import StreamingChecker
+from config import LangConfig
+import logs
+from ordering import RUN_ALL
+from utils import Map, Record
+from verdicts import COMPILATION_ERROR
+
+
+COMPILATION = 'compilation'
+EXECUTION = 'execution'
+
+
+class _Submission(Record):
+    """Submission passed between stages.
+
+    """
+
+    __slots__ = ('future', 'filename', 'config', 'tests', 'autoremove', 'checker', 'mode', 'groups', 'problem',
+                 'context', 'queued', 'program', 'result')
+
+
+class Pipeline:
+    """Tests submissions with engine, compiling next submissions while tests of previous ones are executed.
+
+    Attributes:
+        engine (Engine): Engine submissions are tested by, its workers execute tests of one submission in parallel
+        compilers (int): Number of sources compiled in parallel
+        executors (int): Number of submissions whose tests are executed in parallel
+        memory_budget (Optional[int]): Total memory limit of parallel compilations, in units of vms limit of
+            compilation (see Limits), compilations are bounded only by their number if None
+
+    """
+
+    def __init__(self, engine, compilers=1, executors=1, memory_budget=None, queue_size=None):
+        """Init method of pipeline, starting threads of stages.
+
+        Args:
+            engine (Engine): Engine submissions are tested by
+            compilers (int[default=1]): Number of sources compiled in parallel
+            executors (int[default=1]): Number of submissions whose tests are executed in parallel
+            memory_budget (Optional[int]): Total memory limit of parallel compilations. Compilation without
+                memory limit reserves the whole budget, compilation over budget is run alone
+            queue_size (Optional[int]): Maximum number of compiled submissions waiting for executor, number of
+                executors if None
+
+        """
+        self.engine = engine
+        self.compilers, self.executors, self.memory_budget = compilers, executors, memory_budget
+
+        self._sources = queue.Queue()
+        self._programs = queue.Queue(queue_size or executors)
+
+        self._memory = threading.Condition()
+        self._reserved = 0
+
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stopped = 0
+        self._started = time.perf_counter()
+        self._stages = dict((stage, Map(workers=workers, active=0, busy=0.0, processed=0, waited=0.0))
+                            for stage, workers in ((COMPILATION, compilers), (EXECUTION, executors)))
+        # start of work in progress by stage and thread
+        self._running = {}
+
+        self._compilers = [threading.Thread(target=self._compile, name='carbon-compiler-{0}'.format(number),
+                                            daemon=True) for number in range(compilers)]
+        self._executors = [threading.Thread(target=self._execute, name='carbon-executor-{0}'.format(number),
+                                            daemon=True) for number in range(executors)]
+        for thread in self._compilers + self._executors:
+            thread.start()
+
+    def submit(self, filename, lang_config, tests, autoremove=False, checker=StreamingChecker, mode=RUN_ALL,
+               groups=None, problem=None):
+        """Puts submission into queue of compilation stage.
+
+        Args:
+            filename (str): File name of source
+            lang_config (dict|LangConfig): Config for Program
+            tests (list): Pairs of input and expected output (see Engine.test_suite)
+            autoremove (bool[default=False]): Remove file after all tests are executed
+            checker (callable[default=StreamingChecker]): Checker factory (see Engine.test_suite)
+            mode (str[default='run-all']): Mode of execution (see ordering module)
+            groups (Optional[list]): Group of every test in group mode
+            problem (Optional[str]): Name of problem (see Engine.test_suite)
+
+        Returns:
+            Future: Future of SuiteResult (see Engine.test_suite for structure), errors of testing (e.g.
+                FileDoesNotExistError) are raised by its result method
+
+        Raises:
+            InvalidConfigError: If lang config is invalid
+            RuntimeError: If pipeline is closed
+
+        """
+        submission = _Submission(future=Future(), filename=filename, config=LangConfig.load(lang_config),
+                                 tests=tests, autoremove=autoremove, checker=checker, mode=mode, groups=groups,
+                                 problem=problem, context=logs.SUBMISSION.get(), queued=time.perf_counter())
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Pipeline is closed')
+            self._sources.put(submission)
+        return submission.future
+
+    def test_suite(self, *args, **kwargs):
+        """Tests submission in pipeline, waiting for its result.
+
+        Args:
+            *args: Positional args of submit
+            **kwargs: Keyword args of submit
+
+        Returns:
+            SuiteResult: Result of testing (see Engine.test_suite for structure)
+
+        """
+        return self.submit(*args, **kwargs).result()
+
+    def stats(self):
+        """Gets load of stages.
+
+        Returns:
+            Map: Load of every stage and number of submissions waiting for it. Busy is total time of work of
+                threads of stage in seconds, utilization is busy divided by time threads have existed, waited is
+                total time submissions have waited in queue of stage in seconds.
+                {
+                    "elapsed": 60.0,
+                    "compilation": {"workers": 1, "active": 1, "busy": 48.2, "processed": 40, "waited": 3.1,
+                                    "queued": 2, "utilization": 0.803},
+                    "execution": {"workers": 1, "active": 1, "busy": 57.9, "processed": 38, "waited": 12.4,
+                                  "queued": 1, "utilization": 0.965}
+                }
+
+        """
+        now = time.perf_counter()
+        elapsed = now - self._started
+        result = Map(elapsed=round(elapsed, 3))
+        with self._lock:
+            for stage, queued in ((COMPILATION, self._sources), (EXECUTION, self._programs)):
+                stats = Map(self._stages[stage])
+                # work in progress is counted up to now
+                stats.busy += sum(now - start for (running, _), start in self._running.items() if running == stage)
+                stats.queued = queued.qsize()
+                stats.utilization = round(stats.busy / (elapsed * stats.workers), 3) if elapsed and stats.workers else 0
+                stats.busy, stats.waited = round(stats.busy, 3), round(stats.waited, 3)
+                result[stage] = stats
+        return result
+
+    def close(self, wait=True):
+        """Stops pipeline, submissions already in queue are tested.
+
+        Args:
+            wait (bool[default=True]): Wait for queued submissions to be tested
+
+        """
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                for _ in self._compilers:
+                    self._sources.put(None)
+        if wait:
+            for thread in self._compilers + self._executors:
+                thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _compile(self):
+        while True:
+            submission = self._sources.get()
+            if submission is None:
+                break
+            if not submission.future.set_running_or_notify_cancel():
+                continue
+
+            memory = self._reserve(submission.config)
+            start = self._begin(COMPILATION, submission.queued)
+            try:
+                with logs.context(submission.context):
+                    program, result = self.engine.compile_suite(submission.filename, submission.config)
+            except Exception as e:
+                submission.future.set_exception(e)
+                continue
+            finally:
+                self._end(COMPILATION, start)
+                self._release(memory)
+
+            if result.verdict == COMPILATION_ERROR:
+                # nothing to execute, so result is final
+                submission.future.set_result(result)
+                continue
+            submission.program, submission.result = program, result
+            submission.queued = time.perf_counter()
+            self._programs.put(submission)
+
+        # the last compiler stops executors, after all compiled programs, since queue is FIFO
+        with self._lock:
+            self._stopped += 1
+            last = self._stopped == self.compilers
+        if last:
+            for _ in self._executors:
+                self._programs.put(None)
+
+    def _execute(self):
+        while True:
+            submission = self._programs.get()
+            if submission is None:
+                break
+
+            start = self._begin(EXECUTION, submission.queued)
+            try:
+                with logs.context(submission.context):
+                    self.engine.execute_suite(submission.program, submission.result, submission.tests,
+                                              submission.autoremove, submission.checker, submission.mode,
+                                              submission.groups, submission.problem)
+            except Exception as e:
+                submission.future.set_exception(e)
+            else:
+                submission.future.set_result(submission.result)
+            finally:
+                self._end(EXECUTION, start)
+
+    def _reserve(self, config):
+        """Waits until compilation fits into memory budget.
+
+        Args:
+            config (LangConfig): Lang config of source
+
+        Returns:
+            int: Reserved memory
+
+        """
+        if self.memory_budget is None or not config.compilation.need:
+            return 0
+        memory = min(config.compilation.limits.vms or self.memory_budget, self.memory_budget)
+        with self._memory:
+            self._memory.wait_for(lambda: self._reserved + memory <= self.memory_budget)
+            self._reserved += memory
+        return memory
+
+    def _release(self, memory):
+        if memory:
+            with self._memory:
+                self._reserved -= memory
+                self._memory.notify_all()
+
+    def _begin(self, stage, queued):
+        start = time.perf_counter()
+        with self._lock:
+            stats = self._stages[stage]
+            stats.active += 1
+            if queued is not None:
+                stats.waited += start - queued
+            self._running[stage, threading.get_ident()] = start
+        return start
+
+    def _end(self, stage, start):
+        with self._lock:
+            stats = self._stages[stage]
+            stats.active -= 1
+            stats.busy += time.perf_counter() - start
+            stats.processed += 1
+            del self._running[stage, threading.get_ident()]
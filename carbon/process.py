@@ -1,181 +1,761 @@
+import fcntl
+import os
+import resource
+import selectors
+import stat
 import shlex
-from subprocess import Popen, PIPE, TimeoutExpired
-from queue import Queue, Empty
-from threading import Thread
+import signal
+from subprocess import Popen, PIPE
 import psutil
 import time
 
-from utils import Map
+from utils import Record
+from limits import PollingBackend
+
+
+# default interval between memory samples in milliseconds
+MEMORY_SAMPLE_INTERVAL = 10
+
+# maximum number of bytes read from or written to pipe at once, also used as pipe buffer size
+PIPE_CHUNK = 1024 * 1024
+
+# number of bytes kept from head and from tail of output exceeding its limit
+OUTPUT_DIAGNOSTICS_SIZE = 4096
+
+# shell stopping itself before exec of command, so engine applies affinity and limits to it by pid before
+# program starts, without running Python code in forked child of threaded engine
+TRAMPOLINE = ['/bin/sh', '-c', 'kill -STOP $$ && exec "$@"', 'carbon']
+
+
+class OutputCapture:
+    """Collects output of process, keeping at most limit bytes of it.
+
+    Once limit is exceeded only OUTPUT_DIAGNOSTICS_SIZE bytes from head and from tail of output are kept,
+    so memory used by capture does not depend on amount of output.
+
+    Attributes:
+        limit (Optional[int]): Maximum size of output in bytes
+        store (bool): Keep output, only its size is counted if False
+        size (int): Size of output received so far
+        exceeded (bool): Is limit exceeded
+
+    """
+
+    def __init__(self, limit=None, store=True):
+        """Init method of capture.
+
+        Args:
+            limit (Optional[int]): Maximum size of output in bytes, output is not limited if None
+            store (bool[default=True]): Keep output, only its size is counted if False
+
+        """
+        self.limit, self.store = limit, store
+        self.size = 0
+        self.exceeded = False
+        self._data = bytearray()
+        self._tail = bytearray()
+
+    def extend(self, chunk):
+        """Appends chunk of output.
+
+        Args:
+            chunk (bytes): Chunk of output
+
+        Returns:
+            bool: False if limit is exceeded
+
+        """
+        self.size += len(chunk)
+        if not self.exceeded and (self.limit is None or self.size <= self.limit):
+            if self.store:
+                self._data.extend(chunk)
+            return True
+
+        if self.store:
+            if not self.exceeded:
+                self._tail = self._data[-OUTPUT_DIAGNOSTICS_SIZE:]
+                del self._data[OUTPUT_DIAGNOSTICS_SIZE:]
+            self._tail.extend(chunk)
+            del self._tail[:-OUTPUT_DIAGNOSTICS_SIZE]
+        self.exceeded = True
+        return False
+
+    def value(self):
+        """Gets captured output.
+
+        Returns:
+            bytearray: Whole output or its head and tail separated by line with dots if limit is exceeded
+
+        """
+        if not self.exceeded:
+            return self._data
+        return self._data + b'\n...\n' + self._tail
+
+    def decode(self, encoding):
+        """Gets captured output decoded.
+
+        Args:
+            encoding (Optional[str]): Encoding of output, bytes are returned if None
+
+        Returns:
+            str|bytes: Captured output, characters cut at head and tail boundaries are replaced
+
+        """
+        if not encoding:
+            return bytes(self.value())
+        return self.value().decode(encoding, 'replace' if self.exceeded else 'strict')
+
+
+class Status(Record):
+    """Status of process (see Process's class Attributes for description of attributes).
+
+    """
+
+    __slots__ = ('time_limit_exceeded', 'memory_limit_exceeded', 'output_limit_exceeded', 'stdout', 'stderr',
+                 'stdout_size', 'stderr_size', 'time', 'memory', 'cpu_time', 'peak_rss', 'returncode', 'wrong_answer',
+                 'killed_by_checker', 'mismatch', 'phases')
 
 
 class Process:
     """Allows to run processes with limits
 
     Attributes:
-        cmd (str): Command to execute
-        input (Optional[str]): Input to be passed to processes STDIN
+        cmd (list): Arguments of command to execute
+        input (Optional[bytes]): Input to be passed to processes STDIN
         time_limit (Optional[int]): Time limit in milliseconds
-        memory_limit (Optional[int]): Memory limit in kB
-        stdout_file (Optional[str]): Name of file STDOUT should be written to
-        stderr_file (Optional[str]): Name of file STDERR should be written to
+        memory_limit (Optional[int]): Memory limit in bytes
+        stdout_file (Optional[str|int|file]): File STDOUT of process is connected to
+        stderr_file (Optional[str|int|file]): File STDERR of process is connected to
+        stdin_file (Optional[str|int|file]): File STDIN of process is connected to
+        zygote (Optional[Zygote]): Warm interpreter program is run in instead of spawning command
+        cwd (Optional[str]): Working directory of process, directory of engine if None
+        memory_sample_interval (int): Interval between memory samples in milliseconds
+        backend (PollingBackend): Limit backend enforcing and measuring limits (see limits module)
+        cpus (Optional[set]): Cores process is pinned to
+        checker (Optional[StreamingChecker]): Checker STDOUT is passed to instead of being collected
+        encoding (Optional[str]): Encoding of STDOUT and STDERR, they are kept as bytes if None
+        output_limit (Optional[int]): Maximum size of STDOUT in bytes
+        stderr_limit (Optional[int]): Maximum size of STDERR in bytes
         process (Popen): Popen process object
-        status (Map): Current status of program including
+        status (Status): Current status of program including
             time_limit_exceeded (bool): Is time limit exceeded
             memory_limit_exceeded (bool): Is memory limit exceeded
-            stdout (str): All STDOUT of process
-            stderr (str): All STDERR of process
+            output_limit_exceeded (bool): Is STDOUT or STDERR limit exceeded
+            stdout (str|bytes): All STDOUT of process (head and tail of it if limit is exceeded),
+                None if checker or stdout_file is set
+            stderr (str|bytes): All STDERR of process (head and tail of it if limit is exceeded),
+                None if stderr_file is set
+            stdout_size (int): Size of STDOUT in bytes
+            stderr_size (int): Size of STDERR in bytes
             time (int): Execution time on milliseconds. This attribute is None until process finished.
             memory (int): Maximum memory use in kB. This attribute is None until process finished.
+            cpu_time (int): CPU time (user + sys) in milliseconds. This attribute is None until process finished.
+            peak_rss (int): Peak resident set size in kB. This attribute is None until process finished.
             retuncode (int): Return code of process. This attribute is None until process finished.
+            wrong_answer (bool): Checker has found difference in STDOUT, process is killed at first difference
+            killed_by_checker (bool): Process has been killed by checker at first difference of STDOUT, so its
+                return code is not its own
+            mismatch (Mismatch): First difference found by checker (see StreamingChecker), None if there is none
+            phases (dict): Duration of phases of run in milliseconds
+                {
+                    "spawn": 1.2,       # start of process and its bootstrap
+                    "resume": 0.1,      # resume of process after bootstrap
+                    "stdin": 0.3,       # writing of STDIN from resume, absent if STDIN is connected to file
+                    "run": 15.4,        # from resume until process is reaped
+                    "drain": 0.2,       # reading of output left in pipes after process is reaped
+                    "check": 0.5,       # comparison of STDOUT by checker, absent if there is no checker
+                    "total": 17.6       # whole run
+                }
 
     """
 
-    def __init__(self, cmd, input=None, time_limit=None, memory_limit=None, stdout_file=None, stderr_file=None):
+    def __init__(self, cmd, input=None, time_limit=None, memory_limit=None, stdout_file=None, stderr_file=None,
+                 memory_sample_interval=None, backend=None, cpus=None, checker=None, encoding='UTF-8',
+                 output_limit=None, stderr_limit=None, stdin_file=None, zygote=None, cwd=None):
         """Init method of process
 
         Args:
-            cmd (str): Command to execute
-            input (Optional[str]): Input to be passed to processes STDIN
+            cmd (str|list): Command to execute or its arguments
+            input (Optional[str|bytes]): Input to be passed to processes STDIN, any bytes-like object
+                (e.g. mmap) is written without copying
             time_limit (Optional[int]): Time limit in milliseconds
-            memory_limit (Optional[int]): Memory limit in kB
-            stdout_file (Optional[str]): Name of file STDOUT should be written to
-            stderr_file (Optional[str]): Name of file STDERR should be written to
+            memory_limit (Optional[int]): Memory limit in bytes
+            stdout_file (Optional[str|int|file]): Path, file descriptor or file object STDOUT is connected to.
+                Output does not pass through supervisor, checker reads it from file after process exits
+                and output_limit is enforced with RLIMIT_FSIZE.
+            stderr_file (Optional[str|int|file]): Path, file descriptor or file object STDERR is connected to
+            memory_sample_interval (Optional[int]): Interval between memory samples in milliseconds
+            backend (Optional[PollingBackend]): Limit backend, PollingBackend is used if None
+            cpus (Optional[iterable]): Cores process is pinned to, process is not pinned if None
+            checker (Optional[StreamingChecker]): Checker STDOUT is passed to instead of being collected
+            encoding (Optional[str][default='UTF-8']): Encoding of STDOUT and STDERR, keep them as bytes if None
+            output_limit (Optional[int]): Maximum size of STDOUT in bytes, process is killed when it is exceeded
+            stderr_limit (Optional[int]): Maximum size of STDERR in bytes, process is killed when it is exceeded
+            stdin_file (Optional[str|int|file]): Path, file descriptor or file object STDIN is connected to
+                instead of input
+            zygote (Optional[Zygote]): Warm interpreter taken from ZygotePool. Command must then be command of
+                interpreter followed by script and its arguments, only script with arguments is passed to zygote.
+            cwd (Optional[str]): Working directory of process, relative paths of command are resolved in it
 
         """
         self.cmd, self.input, self.time_limit, self.memory_limit, self.stdout_file, self.stderr_file\
-            = shlex.split(cmd), input, time_limit, memory_limit, stdout_file, stderr_file
+            = shlex.split(cmd) if isinstance(cmd, str) else list(cmd), input, time_limit, memory_limit, stdout_file, stderr_file
+        self.memory_sample_interval = memory_sample_interval or MEMORY_SAMPLE_INTERVAL
+        self.backend = backend or PollingBackend()
+        self.cpus = set(cpus) if cpus is not None else None
+        self.checker, self.encoding = checker, encoding
+        self.output_limit, self.stderr_limit = output_limit, stderr_limit
+        self.stdin_file, self.zygote, self.cwd = stdin_file, zygote, cwd
 
-        if self.input:
+        if isinstance(self.input, str):
             self.input = self.input.encode('UTF-8')
 
         self.process = None
 
         # status variables
-        self.status = Map()
-        self.status.time_limit_exceeded = False
-        self.status.memory_limit_exceeded = False
-
-        self.status.stdout = None
-        self.status.stderr = None
-        self.status.time = None
-        self.status.memory = None
-        self.status.returncode = None
+        self.status = Status(time_limit_exceeded=False, memory_limit_exceeded=False, output_limit_exceeded=False,
+                             wrong_answer=False, killed_by_checker=False, phases={})
 
     def run(self):
         """Runs process with configuration set.
 
         """
-        self.process = Popen(self.cmd, stdin=PIPE, stdout=PIPE, stderr=PIPE)
-        psutil_process = psutil.Process(self.process.pid)
+        try:
+            self.backend.prepare(self)
+        except Exception:
+            self._discard_zygote()
+            raise
+        try:
+            self._run()
+        finally:
+            self.backend.cleanup(self)
+            self._close_files()
+            self._discard_zygote()
 
-        # pause process to allow bootstrap code execute before it
-        psutil_process.suspend()
+    def _run(self):
+        spawn = time.perf_counter()
+        psutil_process = self._spawn()
 
-        stdout_summary = ''
-        stderr_summary = ''
+        # all pipes and process exit are watched by one selector in this thread
+        selector = selectors.DefaultSelector()
+        self._watch_output(selector, self.process.stdout, self._consume_stdout)
+        self._watch_output(selector, self.process.stderr, self._consume_stderr)
 
-        if self.memory_limit is None:
-            try:
-                psutil_process.resume()
-                start = time.time()
-                (stdout_summary, stderr_summary) = self.process.communicate(self.input, self.time_limit)
-                # strange line
-                self.status.time = time.time() - start
-                self.status.returncode = self.process.poll()
-            except TimeoutExpired:
+        rusage = None
+
+        # start timer
+        start = time.perf_counter()
+        self._phase('spawn', spawn, start)
+
+        # bootstrap finished, resume
+        self._resume(psutil_process)
+        self._phase('resume', start)
+
+        # write data to STDIN of program
+        self._watch_input(selector, self.process.stdin, self.input or b'', lambda: self._phase('stdin', start))
+
+        # start main cycle, sleeping until process exits, pipes are ready or next memory sample is due
+        pidfd = self._open_pidfd()
+        if pidfd is not None:
+            selector.register(pidfd, selectors.EVENT_READ)
+        deadline = self._deadline(start)
+        try:
+            while not self._sample_memory(psutil_process):
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                timeout = self._timeout(deadline, pidfd is not None)
+
+                exited = pidfd is None
+                for key, _ in selector.select(timeout):
+                    if key.data is None:
+                        exited = True
+                    else:
+                        key.data()
+
+                # process finished
+                rusage = self._reap() if exited else None
+                if rusage is not None:
+                    self.status.returncode = self.process.returncode
+                    break
+        finally:
+            if pidfd is not None:
+                selector.unregister(pidfd)
+                os.close(pidfd)
+
+        # Time limit exceeded
+        if self.status.returncode is None:
+            if not self.status.memory_limit_exceeded:
                 self.status.time_limit_exceeded = True
-                self.process.kill()
+            self._kill()
+            rusage = self._reap(block=True)
+
+        reaped = time.perf_counter()
+        self._phase('run', start, reaped)
+        self._finish(start, rusage)
+
+        # program has finished without reading whole STDIN
+        if self.process.stdin is not None and not self.process.stdin.closed:
+            selector.unregister(self.process.stdin)
+            self.process.stdin.close()
+
+        # get lost STDOUT and STDERR
+        while selector.get_map():
+            for key, _ in selector.select():
+                key.data()
+        selector.close()
+        self._phase('drain', reaped)
+
+        self._save_output()
+        self._phase('total', spawn)
+
+    @staticmethod
+    def _watch_output(selector, pipe, consume):
+        """Registers pipe in selector to be read until EOF.
+
+        Args:
+            selector (BaseSelector): Selector of supervisor
+            pipe (file): Pipe to read from
+            consume (callable): Function every read chunk is passed to
+
+        """
+        if pipe is None:
+            return  # stream is connected to file
+
+        fd = pipe.fileno()
+        os.set_blocking(fd, False)
+        try:
+            fcntl.fcntl(fd, fcntl.F_SETPIPE_SZ, PIPE_CHUNK)
+        except (AttributeError, OSError):
+            pass  # pipe size can not be changed, program will be read in smaller chunks
+
+        def on_readable():
+            try:
+                chunk = os.read(fd, PIPE_CHUNK)
+            except BlockingIOError:
+                return
+            if chunk:
+                consume(chunk)
+                return
+            selector.unregister(pipe)
+            pipe.close()
+
+        selector.register(pipe, selectors.EVENT_READ, on_readable)
+
+    @staticmethod
+    def _watch_input(selector, pipe, data, done=None):
+        """Registers pipe in selector to write data to it and close it.
+
+        Args:
+            selector (BaseSelector): Selector of supervisor
+            pipe (file): Pipe to write to
+            data (bytes): Data to be written
+            done (Optional[callable]): Function called when pipe is closed
+
+        """
+        if pipe is None:
+            return  # stream is connected to file
+
+        fd = pipe.fileno()
+        os.set_blocking(fd, False)
+        view = memoryview(data)
+
+        def on_writable():
+            nonlocal view
+            try:
+                view = view[os.write(fd, view[:PIPE_CHUNK]):]
+            except BlockingIOError:
+                return
+            except BrokenPipeError:
+                view = view[:0]  # program does not accept any STDIN
+            if not view:
+                selector.unregister(pipe)
+                pipe.close()
+                if done is not None:
+                    done()
+
+        if view:
+            selector.register(pipe, selectors.EVENT_WRITE, on_writable)
         else:
-            def enqueue_output(out, queue):
-                for line in iter(out.readline, b''):
-                    queue.put(line)
-                out.close()
+            pipe.close()
+            if done is not None:
+                done()
+
+    def _spawn(self):
+        """Starts suspended process.
+
+        Returns:
+            psutil.Process: psutil object of started process
 
-            stdout_queue = Queue()
-            stdout_thread = Thread(target=enqueue_output, args=(self.process.stdout, stdout_queue))
-            stdout_thread.daemon = True
-            stdout_thread.start()
+        """
+        self._max_mem = 0
+        self._next_sample = 0
+        self._stdout = OutputCapture(self.output_limit, store=self.checker is None)
+        self._stderr = OutputCapture(self.stderr_limit)
+
+        # files are connected to process directly, so their content never passes through supervisor
+        self._files = []
+        stdin = self._open_file(self.stdin_file, os.O_RDONLY)
+        stdout = self._open_file(self.stdout_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        stderr = self._open_file(self.stderr_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        self._stdout_fd = stdout if stdout != PIPE else None
+        self._stderr_fd = stderr if stderr != PIPE else None
+        self._cpu_offset = 0
+
+        if self.zygote is not None:
+            return self._spawn_warm(stdin, stdout, stderr)
 
-            stderr_queue = Queue()
-            stderr_thread = Thread(target=enqueue_output, args=(self.process.stderr, stderr_queue))
-            stderr_thread.daemon = True
-            stderr_thread.start()
+        self.process = Popen(TRAMPOLINE + self.cmd, stdin=stdin, stdout=stdout, stderr=stderr, cwd=self.cwd)
 
-            max_mem = 0
+        # process stays stopped until resume, so bootstrap is done before program starts
+        _, exitstatus = os.waitpid(self.process.pid, os.WUNTRACED)
+        if not os.WIFSTOPPED(exitstatus):
+            self.process.returncode = os.waitstatus_to_exitcode(exitstatus)
+            raise OSError('Process has exited before start with {0} return code'.format(self.process.returncode))
+        self._attach(self.process.pid)
+        return psutil.Process(self.process.pid)
+
+    def _spawn_warm(self, stdin, stdout, stderr):
+        """Prepares warm interpreter to run program, it waits for program instead of being suspended.
+
+        Args:
+            stdin (int): File descriptor or PIPE for STDIN
+            stdout (int): File descriptor or PIPE for STDOUT
+            stderr (int): File descriptor or PIPE for STDERR
 
-            # start timer
-            start = time.time()
+        Returns:
+            psutil.Process: psutil object of interpreter
 
-            # bootstrap finished, resume
+        """
+        self.process = self.zygote.process
+        self._attach(self.process.pid)
+
+        # pipes are created here instead of Popen, child ends of them are sent to zygote on resume
+        self._child_fds = []
+        streams = []
+        for fd, mode in ((stdin, 'wb'), (stdout, 'rb'), (stderr, 'rb')):
+            if fd != PIPE:
+                self._child_fds.append(fd)
+                streams.append(None)
+                continue
+            read, write = os.pipe()
+            child, parent = (read, write) if mode == 'wb' else (write, read)
+            self._files.append(child)
+            self._child_fds.append(child)
+            streams.append(open(parent, mode, buffering=0))
+        self.process.stdin, self.process.stdout, self.process.stderr = streams
+
+        psutil_process = psutil.Process(self.process.pid)
+        times = psutil_process.cpu_times()
+        self._cpu_offset = (times.user + times.system) * 1000
+        return psutil_process
+
+    def _resume(self, psutil_process):
+        """Lets process run program after bootstrap.
+
+        Args:
+            psutil_process (psutil.Process): psutil object of process
+
+        """
+        if self.zygote is None:
             psutil_process.resume()
+            return
 
-            # write data to STDIN of program
-            if self.input:
-                try:
-                    self.process.stdin.write(self.input)
-                    self.process.stdin.close()
-                except BrokenPipeError:
-                    pass  # program does not accept any STDIN
-
-            # start main cycle
-            while time.time() - start <= (self.time_limit or float('inf')):
-                max_mem = max(max_mem, psutil_process.memory_info().vms)
-                # Memory limit exceeded
-                if max_mem > self.memory_limit:
-                    self.status.memory_limit_exceeded = True
-                    break
+        # command starts with interpreter of zygote (see Execution config), the rest is passed to it
+        self.zygote.run(self.cmd[len(self.zygote.argv):], self._child_fds, self.cwd)
 
-                # process finished
-                if self.process.poll() is not None:
-                    self.status.returncode = self.process.returncode
-                    break
+        # child ends of pipes are owned by zygote now, so EOF is seen when program exits
+        for fd in self._child_fds:
+            if fd in self._files:
+                self._files.remove(fd)
+                os.close(fd)
 
-            # Time limit exceeded
-            if self.status.returncode is None:
-                if not self.status.memory_limit_exceeded:
-                    self.status.time_limit_exceeded = True
-                self.process.kill()
-
-            self.status.time = round((time.time() - start) * 1000)
-            self.status.memory = max_mem / 1024
-
-            stdout_thread.join()
-            stderr_thread.join()
-
-            # get lost STDOUT
-            to_file = isinstance(self.stdout_file, str)
-            if to_file:
-                f = open(self.stdout_file, 'w')
-            while True:
-                try:
-                    line = stdout_queue.get_nowait().decode('UTF-8')
-                except Empty:
-                    break
-                else:
-                    if to_file:
-                        f.write(line)
-                    stdout_summary += line
-            if to_file:
-                f.close()
-
-            # get lost STDERR
-            to_file = isinstance(self.stderr_file, str)
-            if to_file:
-                f = open(self.stderr_file, 'w')
-            while True:
-                try:
-                    line = stderr_queue.get_nowait().decode('UTF-8')
-                except Empty:
+    def _open_file(self, file, flags):
+        """Gets file descriptor stream of process is connected to.
+
+        Args:
+            file (Optional[str|int|file]): Path, file descriptor or file object
+            flags (int): Flags path is opened with
+
+        Returns:
+            int: File descriptor or PIPE if file is None
+
+        """
+        if file is None:
+            return PIPE
+        if isinstance(file, int):
+            return file
+        if hasattr(file, 'fileno'):
+            return file.fileno()
+        fd = os.open(file, flags, 0o644)
+        self._files.append(fd)
+        return fd
+
+    def _close_files(self):
+        """Closes files opened by process.
+
+        """
+        for fd in getattr(self, '_files', ()):
+            os.close(fd)
+        self._files = []
+
+    def _discard_zygote(self):
+        """Stops warm interpreter which has not been given program, e.g. because output file can not be opened.
+
+        """
+        if self.zygote is not None:
+            self.zygote.close()
+
+    def _deadline(self, start):
+        """Computes wall clock time process should be stopped at.
+
+        Args:
+            start (float): Time process was started at
+
+        Returns:
+            Optional[float]: Deadline or None if there is no time limit
+
+        """
+        if not self.time_limit:
+            return None
+        return start + self.time_limit * self.backend.wall_time_factor / 1000
+
+    def _timeout(self, deadline, exit_notified):
+        """Computes how long supervisor may sleep before next check.
+
+        Args:
+            deadline (Optional[float]): Deadline of process
+            exit_notified (bool): Supervisor is woken up when process exits
+
+        Returns:
+            Optional[float]: Timeout in seconds, None to sleep until process exits
+
+        """
+        now = time.perf_counter()
+        timeout = None
+        if self.backend.samples_memory:
+            timeout = max(self._next_sample - now, 0)
+        elif not exit_notified:
+            timeout = self.memory_sample_interval / 1000
+        if deadline is not None:
+            remaining = max(deadline - now, 0)
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+
+    def _sample_memory(self, psutil_process):
+        """Samples memory of process if backend needs it and sample is due.
+
+        Args:
+            psutil_process (psutil.Process): psutil object of process
+
+        Returns:
+            bool: True if memory limit is exceeded
+
+        """
+        if not self.backend.samples_memory:
+            return False
+
+        now = time.perf_counter()
+        if now < self._next_sample:
+            return False
+        self._next_sample = now + self.memory_sample_interval / 1000
+
+        try:
+            self._max_mem = max(self._max_mem, psutil_process.memory_info().vms)
+        except psutil.NoSuchProcess:
+            pass  # process finished between samples
+        # Memory limit exceeded
+        if self.memory_limit is not None and self._max_mem > self.memory_limit:
+            self.status.memory_limit_exceeded = True
+            return True
+        return False
+
+    def _finish(self, start, rusage):
+        """Fills time and memory of status after process is reaped.
+
+        Args:
+            start (float): Time process was started at
+            rusage (Optional[struct_rusage]): Resource usage of process
+
+        """
+        self.status.time = round((time.perf_counter() - start) * 1000)
+        if self.backend.samples_memory:
+            self.status.memory = self._max_mem / 1024
+        if rusage is not None:
+            # CPU time used by warm interpreter before program was given to it is not counted
+            self.status.cpu_time = round((rusage.ru_utime + rusage.ru_stime) * 1000 - self._cpu_offset)
+            self.status.peak_rss = rusage.ru_maxrss
+        self.backend.collect(self, rusage)
+        if self.process.returncode == -signal.SIGXFSZ:
+            self.status.output_limit_exceeded = True
+        # process has exited by itself before checker has killed it
+        if self.status.killed_by_checker and self.process.returncode != -signal.SIGKILL:
+            self.status.killed_by_checker = False
+        if not self.backend.samples_memory:
+            self.status.memory = self.status.peak_rss
+
+    def _phase(self, name, start, end=None):
+        """Adds duration to phase of run.
+
+        Args:
+            name (str): Name of phase
+            start (float): Time phase was started at
+            end (Optional[float]): Time phase was finished at, current time if None
+
+        """
+        end = time.perf_counter() if end is None else end
+        self.status.phases[name] = round(self.status.phases.get(name, 0) + (end - start) * 1000, 3)
+
+    def _consume_stdout(self, chunk):
+        """Passes chunk of STDOUT to capture and checker.
+
+        Process is killed on first difference found by checker or when output limit is exceeded.
+
+        Args:
+            chunk (bytes): Chunk of STDOUT
+
+        """
+        if not self._stdout.extend(chunk) and not self.status.output_limit_exceeded:
+            self.status.output_limit_exceeded = True
+            self._kill()
+
+        if self.checker is not None and not self.status.wrong_answer:
+            check = time.perf_counter()
+            if not self.checker.feed(chunk):
+                self.status.wrong_answer = True
+                # process may have exited already, then its return code is its own
+                self.status.killed_by_checker = self.process.returncode is None
+                self._kill()
+            self._phase('check', check)
+
+    def _consume_stderr(self, chunk):
+        """Passes chunk of STDERR to capture.
+
+        Process is killed when STDERR limit is exceeded.
+
+        Args:
+            chunk (bytes): Chunk of STDERR
+
+        """
+        if not self._stderr.extend(chunk) and not self.status.output_limit_exceeded:
+            self.status.output_limit_exceeded = True
+            self._kill()
+
+    def _save_output(self):
+        """Saves captured STDOUT and STDERR of process to status.
+
+        """
+        if self._stdout_fd is not None:
+            self._stdout.size = self._file_size(self._stdout_fd)
+            if self.checker is not None and not (self.status.time_limit_exceeded or
+                                                 self.status.memory_limit_exceeded or
+                                                 self.status.output_limit_exceeded):
+                self._check_file(self._stdout_fd)
+        if self._stderr_fd is not None:
+            self._stderr.size = self._file_size(self._stderr_fd)
+
+        # output of killed process is cut short, so it is not checked
+        if self.checker is not None and not (self.status.wrong_answer or self.status.time_limit_exceeded or
+                                             self.status.memory_limit_exceeded or
+                                             self.status.output_limit_exceeded):
+            check = time.perf_counter()
+            self.status.wrong_answer = not self.checker.finish()
+            self._phase('check', check)
+        if self.checker is not None:
+            self.status.mismatch = self.checker.mismatch
+
+        # save STDOUT and STDERR to class vars, decoding each of them once
+        self.status.stdout_size, self.status.stderr_size = self._stdout.size, self._stderr.size
+        if self._stdout.size and self._stdout.store and self._stdout_fd is None:
+            self.status.stdout = self._stdout.decode(self.encoding)
+        if self._stderr.size and self._stderr_fd is None:
+            self.status.stderr = self._stderr.decode(self.encoding)
+
+    @staticmethod
+    def _file_size(fd):
+        """Gets size of output written to file.
+
+        Args:
+            fd (int): File descriptor of file
+
+        Returns:
+            int: Size of file in bytes, 0 if it is not a regular file
+
+        """
+        info = os.fstat(fd)
+        return info.st_size if stat.S_ISREG(info.st_mode) else 0
+
+    def _check_file(self, fd):
+        """Passes STDOUT written to file to checker, reading it chunk by chunk.
+
+        Args:
+            fd (int): File descriptor of file STDOUT is connected to
+
+        """
+        if not stat.S_ISREG(os.fstat(fd).st_mode):
+            return  # output can not be read back, e.g. it is /dev/null
+
+        # descriptor may be write-only, so file is opened again for reading
+        check = time.perf_counter()
+        reader = os.open('/proc/self/fd/{0}'.format(fd), os.O_RDONLY)
+        try:
+            for chunk in iter(lambda: os.read(reader, PIPE_CHUNK), b''):
+                if not self.checker.feed(chunk):
+                    self.status.wrong_answer = True
                     break
-                else:
-                    if to_file:
-                        f.write(line)
-                    stderr_summary += line
-            if to_file:
-                f.close()
-
-        # save STDOUT and STDERR to class vars
-        if stdout_summary:
-            self.status.stdout = stdout_summary
-        if stderr_summary:
-            self.status.stderr = stderr_summary
\ No newline at end of file
+        finally:
+            os.close(reader)
+            self._phase('check', check)
+
+    def _attach(self, pid):
+        """Applies affinity and limits to stopped process or warm interpreter before it runs program.
+
+        Args:
+            pid (int): Pid of process
+
+        """
+        if self.cpus is not None:
+            os.sched_setaffinity(pid, self.cpus)
+        self.backend.attach(self, pid)
+
+        # output connected to files is limited by kernel, exceeding limit kills process with SIGXFSZ
+        limits = [limit for fd, limit in ((self._stdout_fd, self.output_limit), (self._stderr_fd, self.stderr_limit))
+                  if fd is not None and limit is not None]
+        if limits:
+            soft, hard = resource.prlimit(pid, resource.RLIMIT_FSIZE)
+            limit = min(limits) if soft == resource.RLIM_INFINITY else min(limits + [soft])
+            resource.prlimit(pid, resource.RLIMIT_FSIZE, (limit, limit))
+
+    def _open_pidfd(self):
+        """Opens file descriptor referring to running process.
+
+        Returns:
+            Optional[int]: pidfd of process or None if system does not support it
+
+        """
+        try:
+            return os.pidfd_open(self.process.pid)
+        except (AttributeError, OSError):
+            return None
+
+    def _kill(self):
+        """Kills process without reaping it, so its resource usage can still be collected.
+
+        """
+        if self.process.returncode is None:
+            os.kill(self.process.pid, signal.SIGKILL)
+
+    def _reap(self, block=False):
+        """Reaps finished process, saving its return code to Popen object.
+
+        Args:
+            block (bool[default=False]): Wait for process to exit
+
+        Returns:
+            Optional[struct_rusage]: Resource usage of process or None if it is still running
+
+        """
+        pid, exitstatus, rusage = os.wait4(self.process.pid, 0 if block else os.WNOHANG)
+        if pid == 0:
+            return None
+        self.process.returncode = os.waitstatus_to_exitcode(exitstatus)
+        return rusage
\ No newline at end of file
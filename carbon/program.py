@@ -3,8 +3,9 @@ import logging
 import os
 import os.path
 
-from utils import Map
+from config import LangConfig
 from process import Process
+from limits import make_backend
 from errors import *
 
 
@@ -13,7 +14,7 @@ class Program:
 
     Attributes:
         logger (Logger): Engine's logger
-        config (dict|Map): Configuration of source's programming lang with following structure
+        config (LangConfig): Configuration of source's programming lang, loaded from dict with following structure
             {
                 "extension": "cpp",                             # extension of source file
                 "compilation": {
@@ -22,14 +23,27 @@ class Program:
                     "executable": "{filename}.o",               # executable name after compilation
                     "limits": {
                         "time": 1000,                           # compilation time limit
-                        "vms": 104857600                        # compilation memory limit
+                        "vms": 104857600,                       # compilation memory limit
+                        "sample_interval": 10,                  # optional, ms between memory samples
+                        "backend": "polling",                   # optional, limit backend (polling|rlimit|cgroup)
+                        "backend_options": {},                  # optional, options of limit backend
+                        "stderr": 1048576                       # optional, compiler STDERR limit in bytes
                     }
                 },
                 "execution": {
                     "cmd": "./{filename}",                      # terminal command to execute program
+                    "zygote": {                                 # optional, run Python programs in warm
+                        "cmd": "python3",                       #   interpreters started by this command,
+                        "size": 2                               #   keeping this number of them ready
+                    },
                     "limits": {
                         "time": 1000,                           # execution time limit
-                        "vms": 104857600                        # execution memory limit
+                        "vms": 104857600,                       # execution memory limit
+                        "sample_interval": 10,                  # optional, ms between memory samples
+                        "backend": "polling",                   # optional, limit backend (polling|rlimit|cgroup)
+                        "backend_options": {},                  # optional, options of limit backend
+                        "output": 67108864,                     # optional, STDOUT limit in bytes
+                        "stderr": 65536                         # optional, STDERR limit in bytes
                     }
                 },
                 "info": {
@@ -38,18 +52,34 @@ class Program:
             }
         filename (str): File name of source
         compiled (bool): Is program compiled
+        cache (Optional[CompilationCache]): Cache of compilation results
+        cache_hit (Optional[bool]): Was compilation result taken from cache, None if cache was not used
+        zygote_pool (Optional[ZygotePool]): Warm interpreters program is executed in
+        workspaces (Optional[WorkspacePool]): Workspaces compiler and every execution are run in, program is
+            compiled and executed in directory of source if None
+        workspace (Optional[Workspace]): Workspace source is compiled in, executable is kept there until close
+        calibration (Optional[Calibration]): Startup baseline of lang, limits of execution are extended by it
+            and it is subtracted from time and memory of runs (see calibration module)
+        process_class (type): Class of processes compiler and program are run in
 
     """
 
-    def __init__(self, filename, config):
+    process_class = Process
+
+    def __init__(self, filename, config, cache=None, zygote_pool=None, workspaces=None):
         """Init method of program.
 
         Args:
             filename (str): File name of source
-            config (dict|Map): Configuration object explained in Attributes section of Program class
+            config (dict|LangConfig): Configuration object explained in Attributes section of Program class
+            cache (Optional[CompilationCache]): Cache of compilation results
+            zygote_pool (Optional[ZygotePool]): Warm interpreters program is executed in, they are used
+                only if execution command is interpreter followed by script
+            workspaces (Optional[WorkspacePool]): Workspaces compiler and every execution are run in
 
         Raises:
             FileDoesNotExistError: File named by filename arg is not found
+            InvalidConfigError: If config is invalid
 
         """
 
@@ -57,12 +87,14 @@ class Program:
         if not os.path.isfile(filename):
             raise FileDoesNotExistError()
 
-        self.filename, self.config = filename, config
+        self.filename, self.config, self.cache, self.zygote_pool = filename, config, cache, zygote_pool
+        self.workspaces, self.workspace = workspaces, None
+        self.calibration = None
+        self.cache_hit = None
 
         self.logger = logging.getLogger('carbon_engine')
 
-        if not isinstance(self.config, Map):
-            self.config = Map(self.config)
+        self.config = LangConfig.load(self.config)
 
         self.compiled = not self.config.compilation.need
 
@@ -75,55 +107,159 @@ class Program:
             CompilationMemoryLimitExceededError: If compilation exceeded memory limit
             FileDoesNotExistError: File named by filename arg is not found
 
+        """
+        compiler = self._prepare_compilation()
+        if compiler is not None:
+            compiler.run()
+            self._finish_compilation(compiler)
+
+    def _prepare_compilation(self):
+        """Checks if compilation is needed and creates compiler process.
+
+        Returns:
+            Optional[Process]: Compiler process or None if nothing should be compiled
+
+        Raises:
+            CompilationFailedError: If failed compilation of the same source is cached
+            FileDoesNotExistError: File named by filename arg is not found
+
         """
         # check if compilation is needed
         if not self.config.compilation.need:
             self.logger.info('Compilation rejected - No need')
-            return
+            return None
 
         # check if file exists
         if not os.path.isfile(self.filename):
             raise FileDoesNotExistError()
 
-        # compile source
-        compiler = Process(cmd=self.config.compilation.cmd.format(filename=self.filename),
-                           time_limit=self.config.compilation.limits.time,
-                           memory_limit=self.config.compilation.limits.vms)
-        compiler.run()
+        # source is compiled next to itself or in workspace, where executable is kept for executions
+        source, cwd = self.filename, None
+        if self.workspaces is not None:
+            self.workspace = self.workspace or self.workspaces.acquire()
+            source, cwd = self.workspace.stage(self.filename), self.workspace.path
+        self._executable = os.path.join(cwd or '', self.config.compilation.executable.format(filename=source))
+        self._source = source
+
+        # take result from cache if the same source has been compiled already
+        self._cache_key = None
+        if self.cache is not None:
+            self._cache_key = self.cache.key(self.filename, self.config.compilation)
+            entry = self.cache.get(self._cache_key, self._executable, source)
+            self.cache_hit = entry is not None
+            if self.cache_hit:
+                self.logger.info('Compilation result is taken from cache')
+                if not entry.ok:
+                    raise CompilationFailedError(entry.returncode, entry.stderr)
+                self._replace_source(self._executable)
+                return None
+
+        return self.process_class(cmd=self.config.compilation.cmd.format(source),
+                                  cwd=cwd,
+                                  time_limit=self.config.compilation.limits.time,
+                                  memory_limit=self.config.compilation.limits.vms,
+                                  memory_sample_interval=self.config.compilation.limits.sample_interval,
+                                  backend=self._make_backend(self.config.compilation.limits),
+                                  stderr_limit=self.config.compilation.limits.stderr)
+
+    def _finish_compilation(self, compiler):
+        """Checks status of finished compiler process.
 
-        status = compiler.status
-        if status.stderr or status.returncode != 0:
-            raise CompilationFailedError(status.returncode, status.stderr)
+        Args:
+            compiler (Process): Finished compiler process
+
+        Raises:
+            CompilationFailedError: If compiler has threw some STDERR of has non-zero return code
+            CompilationTimeLimitExceededError: If compilation exceeded time limit
+            CompilationMemoryLimitExceededError: If compilation exceeded memory limit
+
+        """
+        key = self._cache_key
 
+        status = compiler.status
         if status.time_limit_exceeded:
             raise CompilationTimeLimitExceededError(status.time, compiler.time_limit)
 
         if status.memory_limit_exceeded:
             raise CompilationMemoryLimitExceededError(status.memory, compiler.memory_limit)
 
+        if status.stderr or status.returncode != 0:
+            if key is not None:
+                self.cache.put(key, returncode=status.returncode, stderr=status.stderr, source=self._source)
+            raise CompilationFailedError(status.returncode, status.stderr)
+
+        if key is not None:
+            self.cache.put(key, self._executable)
+
+        self._replace_source(self._executable)
+
+    def _replace_source(self, executable):
+        """Removes source file and makes program point to compiled executable.
+
+        Args:
+            executable (str): File name of executable
+
+        """
         # remove source file
         os.remove(self.filename)
 
         # file now changed to binary
-        self.filename = self.config.compilation.executable.format(filename=self.filename)
+        self.filename = executable
 
         self.compiled = True
 
-    def execute(self, input, autoremove=False):
+    def execute(self, input, autoremove=False, cpus=None, checker=None, output_file=None, time_limit=None):
         """Executes program and removes it if needed.
 
         Args:
-            input (str): Input to be passed in program's STDIN
+            input (str|bytes|os.PathLike|int): Input to be passed in program's STDIN. Path (e.g. pathlib.Path)
+                or file descriptor is connected to STDIN directly, so input never passes through engine.
             autoremove (bool): Is autoremove of program needed
+            cpus (Optional[iterable]): Cores program is pinned to
+            checker (Optional[StreamingChecker]): Checker of STDOUT, program is killed on first difference
+            output_file (Optional[str|int|file]): Path, file descriptor or file object STDOUT is connected to,
+                checker reads it after program exits
+            time_limit (Optional[int]): Time limit in milliseconds, time limit of execution config if None
 
         Returns:
-            Map: Status object of Process class
+            Status: Status object of Process class
 
         Raises:
             ProgramIsNotCompiled: If program is not compiled
             ExecutionFailedError: If program has threw some STDERR or has non-zero return code
             ExecutionTimeLimitExceededError: If execution exceeded time limit
             ExecutionMemoryLimitExceededError: If execution exceeded memory limit
+            OutputLimitExceededError: If execution exceeded STDOUT or STDERR limit
+            FileDoesNotExistError: File named by filename parameter of class is not found
+
+        Execution errors have status attribute with status object of Process class.
+
+        """
+        workspace = self.workspaces.acquire() if self.workspaces is not None else None
+        try:
+            program = self._prepare_execution(input, cpus, checker, output_file, workspace, time_limit)
+            program.run()
+        finally:
+            if workspace is not None:
+                self.workspaces.release(workspace)
+        return self._finish_execution(program, autoremove)
+
+    def _prepare_execution(self, input, cpus=None, checker=None, output_file=None, workspace=None, time_limit=None):
+        """Checks if program can be executed and creates its process.
+
+        Args:
+            input (str|bytes|os.PathLike|int): Input to be passed in program's STDIN or file it is read from
+            cpus (Optional[iterable]): Cores program is pinned to
+            checker (Optional[StreamingChecker]): Checker of STDOUT
+            output_file (Optional[str|int|file]): File STDOUT is connected to
+            workspace (Optional[Workspace]): Workspace program is executed in, program is linked into it
+            time_limit (Optional[int]): Time limit in milliseconds, time limit of execution config if None
+
+        Returns:
+            Process: Process of program
+
+        Raises:
+            ProgramIsNotCompiled: If program is not compiled
             FileDoesNotExistError: File named by filename parameter of class is not found
 
         """
@@ -136,24 +272,117 @@ class Program:
         if not self.compiled:
             raise ProgramIsNotCompiled()
 
-        # execute
-        program = Process(cmd=self.config.execution.cmd.format(filename=self.filename),
-                           input=input,
-                           time_limit=self.config.execution.limits.time,
-                           memory_limit=self.config.execution.limits.vms)
-        program.run()
-        
-        status = program.status
-        if status.stderr or status.returncode != 0:
-            raise ExecutionFailedError(status.returncode, status.stderr)
+        # paths and file descriptors are connected to STDIN directly instead of being read by engine
+        stdin_file = None
+        if isinstance(input, (os.PathLike, int)):
+            input, stdin_file = None, input
+
+        filename, cwd = self.filename, None
+        if workspace is not None:
+            filename, cwd = workspace.stage(self.filename), workspace.path
+
+        time_limit, memory_limit = time_limit or self.config.execution.limits.time, self.config.execution.limits.vms
+        if self.calibration is not None:
+            # memory limit is in bytes, while memory of status is in kB
+            time_limit = time_limit and time_limit + round(self.calibration.time)
+            memory_limit = memory_limit and memory_limit + round(self.calibration.memory * 1024)
+
+        backend = self._make_backend(self.config.execution.limits)
+
+        # program falls back to usual spawn if warm interpreters fail to start
+        # pool is used only by configs whose command is checked to be interpreter of zygote followed by script
+        zygote = None
+        if self.zygote_pool is not None and self.config.execution.zygote is not None:
+            zygote = self.zygote_pool.acquire()
+
+        try:
+            return self.process_class(cmd=self.config.execution.cmd.format(filename),
+                                      cwd=cwd,
+                                      input=input,
+                                      stdin_file=stdin_file,
+                                      stdout_file=output_file,
+                                      zygote=zygote,
+                                      time_limit=time_limit,
+                                      memory_limit=memory_limit,
+                                      memory_sample_interval=self.config.execution.limits.sample_interval,
+                                      backend=backend,
+                                      cpus=cpus,
+                                      checker=checker,
+                                      output_limit=self.config.execution.limits.output,
+                                      stderr_limit=self.config.execution.limits.stderr)
+        except Exception:
+            # interpreter taken from pool is not used by anyone else, so it is stopped
+            if zygote is not None:
+                zygote.close()
+            raise
+
+    def _finish_execution(self, program, autoremove=False):
+        """Checks status of finished program process and removes program if needed.
 
-        if status.time_limit_exceeded:
-            raise ExecutionTimeLimitExceededError(status.time, program.time_limit)
+        Args:
+            program (Process): Finished program process
+            autoremove (bool): Is autoremove of program needed
 
-        if status.memory_limit_exceeded:
-            raise ExecutionMemoryLimitExceededError(status.memory, program.memory_limit)
+        Returns:
+            Status: Status object of Process class
+
+        Raises:
+            ExecutionFailedError: If program has threw some STDERR or has non-zero return code
+            ExecutionTimeLimitExceededError: If execution exceeded time limit
+            ExecutionMemoryLimitExceededError: If execution exceeded memory limit
+            OutputLimitExceededError: If execution exceeded STDOUT or STDERR limit
+
+        """
+        status = program.status
+        time_limit, memory_limit = program.time_limit, program.memory_limit
+        if self.calibration is not None:
+            status.time = max(status.time - round(self.calibration.time), 0)
+            if status.memory is not None:
+                status.memory = max(status.memory - self.calibration.memory, 0)
+            time_limit = time_limit and time_limit - round(self.calibration.time)
+            memory_limit = memory_limit and memory_limit - round(self.calibration.memory * 1024)
+
+        error = None
+        if status.time_limit_exceeded:
+            error = ExecutionTimeLimitExceededError(status.time, time_limit)
+        elif status.memory_limit_exceeded:
+            error = ExecutionMemoryLimitExceededError(status.memory, memory_limit)
+        elif status.output_limit_exceeded:
+            if program.stderr_limit is not None and status.stderr_size > program.stderr_limit:
+                error = OutputLimitExceededError(status.stderr_size, program.stderr_limit)
+            else:
+                error = OutputLimitExceededError(status.stdout_size, program.output_limit)
+        # program killed by checker is judged by its output, not by return code
+        elif (status.stderr or status.returncode != 0) and not status.killed_by_checker:
+            error = ExecutionFailedError(status.returncode, status.stderr)
+
+        if error is not None:
+            # keep status of process for callers interested in time and memory of failed run
+            error.status = status
+            raise error
 
         if autoremove:
             os.remove(self.filename)
 
         return program.status
+
+    def close(self):
+        """Returns workspace of compilation to pool, removing executable kept there.
+
+        """
+        if self.workspace is not None:
+            self.workspaces.release(self.workspace)
+            self.workspace = None
+
+    @staticmethod
+    def _make_backend(limits):
+        """Creates limit backend described by limits section of config.
+
+        Args:
+            limits (Limits): Limits section of compilation or execution config
+
+        Returns:
+            PollingBackend: Limit backend for Process
+
+        """
+        return make_backend(limits.backend, **limits.backend_options)
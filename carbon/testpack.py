@@ -0,0 +1,265 @@
+"""Single-file packs of tests, memory-mapped by engine.
+
+Inputs and expected outputs of all tests are stored in one file with index of their offsets, so pack is
+opened once, mapped into memory and tests are served as memoryviews of the mapping. Uncompressed tests are
+written to STDIN of program and read by checker without copying, and several engine processes share one
+copy of pack in page cache. Tests may be compressed one by one, then they are decompressed on access.
+
+Layout of pack, all numbers are little-endian:
+    header                      # b'CARBONTP', version, number of tests, offset of index
+    data                        # inputs and expected outputs, one after another
+    index                       # for input and output of every test: offset, stored size, size,
+                                #   compression and CRC32 of uncompressed data
+
+Usage:
+    python carbon/testpack.py pack tests.pack DIR [--compress zlib|lzma]     # pack DIR/*.in and DIR/*.out
+    python carbon/testpack.py list tests.pack
+
+"""
+import argparse
+import lzma
+import mmap
+import os
+import os.path
+import struct
+import zlib
+
+from errors import InvalidTestPackError
+
+
+MAGIC = b'CARBONTP'
+
+VERSION = 1
+
+HEADER = struct.Struct('<8sIIQ')
+
+# offset, stored size, size, compression and CRC32 of input or output of test
+ENTRY = struct.Struct('<QQQII')
+
+# compressions by their ids, 0 is no compression
+COMPRESSIONS = {
+    1: ('zlib', zlib.compress, zlib.decompress),
+    2: ('lzma', lzma.compress, lzma.decompress),
+}
+
+COMPRESSION_IDS = dict((name, id) for id, (name, _, _) in COMPRESSIONS.items())
+
+
+class TestPackWriter:
+    """Writes pack of tests.
+
+    Example:
+        >>> with TestPackWriter('tests.pack', compression='zlib') as writer:
+        ...     writer.add('4 5', '9')
+
+    Attributes:
+        path (str): Path of pack
+        compression (Optional[str]): Default compression of tests (see COMPRESSION_IDS)
+
+    """
+
+    def __init__(self, path, compression=None):
+        """Init method of writer.
+
+        Args:
+            path (str): Path of pack, it is written to temporary file and renamed into place on close
+            compression (Optional[str]): Default compression of tests, zlib or lzma
+
+        Raises:
+            ValueError: If compression is unknown
+
+        """
+        if compression is not None and compression not in COMPRESSION_IDS:
+            raise ValueError('Unknown compression {0}'.format(compression))
+        self.path, self.compression = path, compression
+        self._tmp = '{0}.{1}.tmp'.format(path, os.getpid())
+        self._file = open(self._tmp, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+        self._index = []
+
+    def add(self, input, output, compression=...):
+        """Adds test to pack.
+
+        Args:
+            input (str|bytes): Input of test
+            output (str|bytes): Expected output of test
+            compression (Optional[str]): Compression of test, default compression of writer if not given.
+                Compressed data is stored only if it is smaller than original.
+
+        Raises:
+            ValueError: If compression is unknown
+
+        """
+        compression = self.compression if compression is ... else compression
+        if compression is not None and compression not in COMPRESSION_IDS:
+            raise ValueError('Unknown compression {0}'.format(compression))
+        for data in (input, output):
+            self._index.append(self._write(data.encode('UTF-8') if isinstance(data, str) else bytes(data),
+                                           compression))
+
+    def _write(self, data, compression):
+        kind, stored = 0, data
+        if compression is not None:
+            compressed = COMPRESSIONS[COMPRESSION_IDS[compression]][1](data)
+            if len(compressed) < len(data):
+                kind, stored = COMPRESSION_IDS[compression], compressed
+
+        offset = self._file.tell()
+        self._file.write(stored)
+        return ENTRY.pack(offset, len(stored), len(data), kind, zlib.crc32(data))
+
+    def close(self):
+        """Writes index and moves pack into place.
+
+        """
+        index = self._file.tell()
+        self._file.write(b''.join(self._index))
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, VERSION, len(self._index) // 2, index))
+        self._file.close()
+        os.rename(self._tmp, self.path)
+
+    def abort(self):
+        """Removes partially written pack.
+
+        """
+        self._file.close()
+        os.remove(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class TestPack:
+    """Memory-mapped pack of tests, sequence of pairs of input and expected output.
+
+    Pack can be passed to Engine.test_suite as tests. Tests are memoryviews of mapping of pack, compressed ones
+    are bytes. Checksum of test is checked on its first access.
+
+    Attributes:
+        path (str): Path of pack
+
+    """
+
+    def __init__(self, path):
+        """Init method of pack, mapping it into memory and reading its index.
+
+        Args:
+            path (str): Path of pack
+
+        Raises:
+            InvalidTestPackError: If file is not pack or its index is damaged
+
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                raise InvalidTestPackError(path, 'file is too short')
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+
+        magic, version, count, index = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise InvalidTestPackError(path, 'not a test pack')
+        if version != VERSION:
+            raise InvalidTestPackError(path, 'unsupported version {0}'.format(version))
+        if index + 2 * count * ENTRY.size != size:
+            raise InvalidTestPackError(path, 'index does not match size of file')
+
+        self._entries = [ENTRY.unpack_from(self._map, index + i * ENTRY.size) for i in range(2 * count)]
+        for offset, stored, _, kind, _ in self._entries:
+            if offset < HEADER.size or offset + stored > index or (kind and kind not in COMPRESSIONS):
+                raise InvalidTestPackError(path, 'damaged index')
+        self._checked = set()
+
+    def __len__(self):
+        return len(self._entries) // 2
+
+    def __getitem__(self, number):
+        """Gets test.
+
+        Args:
+            number (int): Number of test, starting from 0
+
+        Returns:
+            tuple: Input and expected output of test
+
+        Raises:
+            IndexError: If there is no such test
+            InvalidTestPackError: If checksum of test does not match
+
+        """
+        if not -len(self) <= number < len(self):
+            raise IndexError('Test pack has {0} tests'.format(len(self)))
+        number %= len(self)
+        return self._read(2 * number), self._read(2 * number + 1)
+
+    def _read(self, index):
+        offset, stored, size, kind, checksum = self._entries[index]
+        data = self._view[offset:offset + stored]
+        if kind:
+            try:
+                data = COMPRESSIONS[kind][2](data)
+            except (zlib.error, lzma.LZMAError) as e:
+                raise InvalidTestPackError(self.path, 'test {0} can not be decompressed: {1}'.format(index // 2 + 1, e))
+
+        if index not in self._checked:
+            if len(data) != size or zlib.crc32(data) != checksum:
+                raise InvalidTestPackError(self.path, 'checksum of test {0} does not match'.format(index // 2 + 1))
+            self._checked.add(index)
+        return data
+
+    def close(self):
+        """Unmaps pack, tests taken from it must not be used afterwards.
+
+        """
+        self._view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # tests are still referenced, mapping is closed when they are released
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    pack = commands.add_parser('pack', help='pack tests named as <name>.in and <name>.out')
+    pack.add_argument('pack', help='path of pack')
+    pack.add_argument('directory', help='directory with tests')
+    pack.add_argument('--compress', choices=sorted(COMPRESSION_IDS), help='compression of tests')
+    listing = commands.add_parser('list', help='list tests of pack')
+    listing.add_argument('pack', help='path of pack')
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        inputs = sorted(name for name in os.listdir(args.directory) if name.endswith('.in'))
+        with TestPackWriter(args.pack, args.compress) as writer:
+            for name in inputs:
+                with open(os.path.join(args.directory, name), 'rb') as f:
+                    input = f.read()
+                with open(os.path.join(args.directory, name[:-len('.in')] + '.out'), 'rb') as f:
+                    writer.add(input, f.read())
+        print('Packed {0} tests'.format(len(inputs)))
+    else:
+        with TestPack(args.pack) as tests:
+            for number in range(len(tests)):
+                input, output = tests[number]
+                print('{0}\t{1}\t{2}'.format(number + 1, len(input), len(output)))
+                del input, output
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Statistical timing of runs whose time is close to time limit.
+
+Time of one run depends on load of machine, so verdict of run near time limit may flip between rejudges.
+In statistical mode programs are executed with time limit extended by margin, and runs which finish within
+margin around time limit are executed again. Verdict and time of test are taken from run with median time,
+so time limit is exceeded only if it is exceeded by most of runs. Runs far from the limit are executed once.
+
+"""
+import statistics
+
+from utils import Record
+
+
+class TimingSummary(Record):
+    """Statistics of times of runs (see StatisticalTiming.summarize for structure).
+
+    """
+
+    __slots__ = ('runs', 'min', 'median', 'stddev', 'noisy')
+
+
+class StatisticalTiming:
+    """Policy of reruns of borderline runs.
+
+    Attributes:
+        runs (int): Maximal number of runs of borderline test, including the first one
+        margin (float): Run is borderline if its time differs from time limit by at most this fraction of limit
+        noise (float): Measurement is flagged as noisy if standard deviation exceeds this fraction of median
+        budget (Optional[int]): Maximal time of reruns of one test in milliseconds, runs - 1 limits if None
+
+    """
+
+    def __init__(self, runs=5, margin=0.1, noise=0.05, budget=None):
+        """Init method of policy.
+
+        Args:
+            runs (int[default=5]): Maximal number of runs of borderline test, including the first one
+            margin (float[default=0.1]): Fraction of time limit around it runs are borderline in
+            noise (float[default=0.05]): Fraction of median time standard deviation of noisy measurement exceeds
+            budget (Optional[int]): Maximal time of reruns of one test in milliseconds
+
+        Raises:
+            ValueError: If runs is less than 1 or margin is negative
+
+        """
+        if runs < 1 or margin < 0:
+            raise ValueError('Timing needs at least one run and non-negative margin')
+        self.runs, self.margin, self.noise, self.budget = runs, margin, noise, budget
+
+    def limit(self, time_limit):
+        """Gets time limit runs are executed with, so borderline runs exceeding time limit are not killed.
+
+        Args:
+            time_limit (Optional[int]): Time limit in milliseconds
+
+        Returns:
+            Optional[int]: Extended time limit in milliseconds
+
+        """
+        return round(time_limit * (1 + self.margin)) if time_limit else time_limit
+
+    def borderline(self, time, time_limit):
+        """Checks if run should be executed again.
+
+        Args:
+            time (Optional[int]): Time of run in milliseconds
+            time_limit (Optional[int]): Time limit in milliseconds
+
+        Returns:
+            bool: True if time is within margin around time limit
+
+        """
+        return bool(time_limit) and time is not None and abs(time - time_limit) <= self.margin * time_limit
+
+    def affordable(self, spent, time):
+        """Checks if one more run fits into budget.
+
+        Args:
+            spent (int): Time of reruns done so far in milliseconds
+            time (int): Expected time of run in milliseconds
+
+        Returns:
+            bool: True if rerun can be done
+
+        """
+        return self.budget is None or spent + time <= self.budget
+
+    def summarize(self, times):
+        """Computes statistics of times of runs.
+
+        Args:
+            times (list): Times of runs in milliseconds
+
+        Returns:
+            TimingSummary: Statistics with following structure
+                {
+                    "runs": 5,
+                    "min": 980,
+                    "median": 1004,
+                    "stddev": 12.5,
+                    "noisy": False      # standard deviation exceeds noise fraction of median
+                }
+
+        """
+        median = statistics.median(times)
+        stddev = statistics.stdev(times) if len(times) > 1 else 0.0
+        return TimingSummary(runs=len(times), min=min(times), median=median, stddev=round(stddev, 3),
+                             noisy=bool(median) and stddev > self.noise * median)
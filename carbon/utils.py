@@ -52,4 +52,87 @@ class Map(dict):
 
     def __delitem__(self, key):
         super(Map, self).__delitem__(key)
-        del self.__dict__[key]
\ No newline at end of file
+        del self.__dict__[key]
+
+
+class Record:
+    """Compact object with fixed set of attributes, used instead of Map for statuses and results.
+
+    Attributes are listed in __slots__ of subclass, ones not passed to init method are None.
+
+    Example:
+        >>> class Point(Record):
+        ...     __slots__ = ('x', 'y')
+        >>> Point(x=1).to_dict()
+        {'x': 1, 'y': None}
+
+    """
+
+    __slots__ = ()
+
+    def __init__(self, **values):
+        """Init method of record.
+
+        Args:
+            **values: Values of attributes
+
+        Raises:
+            TypeError: If there is no attribute with given name
+
+        """
+        for name in self.__slots__:
+            object.__setattr__(self, name, values.pop(name, None))
+        if values:
+            raise TypeError('{0} has no attributes {1}'.format(type(self).__name__, ', '.join(sorted(values))))
+
+    def to_dict(self):
+        """Converts record to dict, converting nested records and lists of them as well.
+
+        Returns:
+            dict: Attributes by their names
+
+        """
+        return dict((name, _to_plain(getattr(self, name))) for name in self.__slots__)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(getattr(self, name) == getattr(other, name)
+                                                 for name in self.__slots__)
+
+    def __repr__(self):
+        return '{0}({1})'.format(type(self).__name__, ', '.join('{0}={1!r}'.format(name, getattr(self, name))
+                                                                for name in self.__slots__))
+
+
+class FrozenRecord(Record):
+    """Record which can not be changed after it is created.
+
+    """
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError('{0} is immutable'.format(type(self).__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError('{0} is immutable'.format(type(self).__name__))
+
+    def __hash__(self):
+        return hash(tuple(_hashable(getattr(self, name)) for name in self.__slots__))
+
+
+def _to_plain(value):
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, (list, tuple)):
+        return [_to_plain(item) for item in value]
+    if isinstance(value, dict):
+        return dict((key, _to_plain(item)) for key, item in value.items())
+    return value
+
+
+def _hashable(value):
+    if isinstance(value, dict):
+        return tuple(sorted((key, _hashable(item)) for key, item in value.items()))
+    if isinstance(value, list):
+        return tuple(_hashable(item) for item in value)
+    return value
@@ -0,0 +1,13 @@
+"""Verdicts reported by engine for tests and whole submissions"""
+
+
+ACCEPTED = 'OK'
+WRONG_ANSWER = 'WA'
+TIME_LIMIT_EXCEEDED = 'TLE'
+MEMORY_LIMIT_EXCEEDED = 'MLE'
+OUTPUT_LIMIT_EXCEEDED = 'OLE'
+RUNTIME_ERROR = 'RE'
+COMPILATION_ERROR = 'CE'
+
+# test was not executed, because testing has been stopped by failure of other test
+SKIPPED = 'SK'
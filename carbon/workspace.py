@@ -0,0 +1,150 @@
+"""Pool of workspaces programs are compiled and executed in.
+
+Every compilation and execution gets its own directory as working directory, with source or executable
+hard-linked into it (copied if pool is on another file system). Directories are created once, on tmpfs if it
+is available, and emptied on release instead of being removed and created again, so runs of tests do not
+touch disk and concurrent runs of one program do not clash on files they create.
+
+"""
+import os
+import os.path
+import shutil
+import tempfile
+import threading
+
+
+# directories tried for pool when root is not given, the first writable one is used
+DEFAULT_ROOTS = ('/dev/shm',)
+
+
+class Workspace:
+    """Directory compilation or execution is run in.
+
+    Attributes:
+        path (str): Absolute path of directory
+
+    """
+
+    def __init__(self, path):
+        """Init method of workspace.
+
+        Args:
+            path (str): Absolute path of existing empty directory
+
+        """
+        self.path = path
+
+    def stage(self, filename):
+        """Puts file into workspace, hard-linking it if possible.
+
+        Args:
+            filename (str): Path of file
+
+        Returns:
+            str: Name of file in workspace
+
+        """
+        name = os.path.basename(filename)
+        target = os.path.join(self.path, name)
+        try:
+            os.link(filename, target)
+        except FileExistsError:
+            os.remove(target)
+            os.link(filename, target)
+        except OSError:
+            # pool is on another file system or it does not support hard links
+            shutil.copy2(filename, target)
+        return name
+
+    def reset(self):
+        """Removes everything from workspace, keeping directory itself.
+
+        """
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.remove(entry.path)
+
+
+class WorkspacePool:
+    """Workspaces reused by compilations and executions.
+
+    Attributes:
+        root (str): Directory workspaces are created in, removed on close
+        size (int): Number of free workspaces kept, more of them are created when all are in use
+
+    """
+
+    def __init__(self, root=None, size=1):
+        """Init method of pool, creating workspaces.
+
+        Args:
+            root (Optional[str]): Directory pool is created in, tmpfs (see DEFAULT_ROOTS) or temporary
+                directory of system if None
+            size (int[default=1]): Number of workspaces created in advance, e.g. number of workers of engine
+                plus one for compilation
+
+        """
+        if root is None:
+            root = next((path for path in DEFAULT_ROOTS if os.access(path, os.W_OK | os.X_OK)), None)
+        self.root = tempfile.mkdtemp(prefix='carbon-workspaces-', dir=root)
+        self.size = size
+
+        self._lock = threading.Lock()
+        self._count = 0
+        self._free = [self._create() for _ in range(size)]
+
+    def _create(self):
+        with self._lock:
+            self._count += 1
+            path = os.path.join(self.root, str(self._count))
+        os.mkdir(path)
+        return Workspace(path)
+
+    def acquire(self):
+        """Takes free workspace, creating new one if all are in use.
+
+        Returns:
+            Workspace: Empty workspace
+
+        """
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+        return self._create()
+
+    def release(self, workspace):
+        """Empties workspace and returns it to pool.
+
+        Args:
+            workspace (Workspace): Workspace taken from pool
+
+        """
+        try:
+            workspace.reset()
+        except OSError:
+            # program has left something which can not be removed in place, e.g. directory without permissions
+            shutil.rmtree(workspace.path, ignore_errors=True)
+            return
+
+        with self._lock:
+            if len(self._free) < self.size:
+                self._free.append(workspace)
+                return
+        os.rmdir(workspace.path)
+
+    def close(self):
+        """Removes all workspaces, they must not be in use.
+
+        """
+        with self._lock:
+            self._free = []
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,160 @@
+"""Warm interpreters for interpreted languages.
+
+Zygote is an interpreter started in advance, which waits on control socket until program is given to it.
+Every zygote runs only one program, so each test still gets a fresh process, which is a child of engine
+and is limited like process spawned in the usual way. Engine applies limits and affinity to zygote from
+outside right before program is started, so time of test does not include startup of interpreter.
+Interpreter side of zygote is zygote_server module.
+
+"""
+import os
+import os.path
+import shlex
+import socket
+import threading
+from collections import deque
+from subprocess import Popen, DEVNULL
+
+from zygote_server import READY
+
+
+# script run by interpreters of pool
+SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'zygote_server.py')
+
+
+class Zygote:
+    """One warm interpreter waiting for program.
+
+    Attributes:
+        argv (list): Arguments of command starting interpreter
+        process (Popen): Popen object of interpreter
+        started (bool): Program has been given to interpreter, it is not stopped by close then
+
+    """
+
+    def __init__(self, cmd):
+        """Init method of zygote, starting interpreter.
+
+        Args:
+            cmd (str): Command starting Python interpreter, e.g. "python3"
+
+        """
+        self.argv = shlex.split(cmd)
+        self.started = False
+        self._socket, child = socket.socketpair()
+        try:
+            self.process = Popen(self.argv + [SERVER, str(child.fileno())],
+                                 stdin=DEVNULL, stdout=DEVNULL, stderr=DEVNULL, pass_fds=[child.fileno()])
+        finally:
+            child.close()
+
+    def wait_ready(self):
+        """Waits until interpreter is started.
+
+        Returns:
+            bool: False if interpreter has failed to start
+
+        """
+        try:
+            return self._socket.recv(1) == READY
+        except OSError:
+            return False
+
+    def run(self, argv, fds, cwd=None):
+        """Starts program in interpreter.
+
+        Args:
+            argv (list): Path of script followed by its arguments
+            fds (list): File descriptors connected to STDIN, STDOUT and STDERR of program
+            cwd (Optional[str]): Working directory of program, directory of interpreter if None
+
+        """
+        self.started = True
+        try:
+            # working directory goes first, empty one means that it is not changed
+            message = b'\0'.join(os.fsencode(arg) for arg in [cwd or ''] + list(argv))
+            socket.send_fds(self._socket, [message], fds)
+        finally:
+            self._socket.close()
+
+    def close(self):
+        """Stops unused interpreter, program started in interpreter is stopped by its Process instead.
+
+        """
+        if self.started:
+            return
+        # interpreter exits on closed control socket, but it may be stuck at startup
+        self._socket.close()
+        if self.process.returncode is None:
+            self.process.kill()
+        self.process.wait()
+
+
+class ZygotePool:
+    """Pool of warm interpreters of one language.
+
+    Replacement of interpreter is started as soon as one is taken from pool, so its startup overlaps
+    with running program instead of delaying next one.
+
+    Attributes:
+        cmd (str): Command starting Python interpreter
+        size (int): Number of interpreters kept ready
+
+    """
+
+    def __init__(self, cmd, size=1):
+        """Init method of pool.
+
+        Args:
+            cmd (str): Command starting Python interpreter, e.g. "python3"
+            size (int[default=1]): Number of interpreters kept ready
+
+        """
+        self.cmd, self.size = cmd, size
+        self._lock = threading.Lock()
+        self._closed = False
+        self._zygotes = deque(Zygote(cmd) for _ in range(size))
+
+    def acquire(self):
+        """Takes ready interpreter from pool.
+
+        Lock is held only while pool is changed, so threads wait for startup of their interpreters in parallel.
+
+        Returns:
+            Optional[Zygote]: Ready interpreter or None if interpreters fail to start
+
+        Raises:
+            RuntimeError: If pool is closed
+
+        """
+        for _ in range(self.size + 1):
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError('Zygote pool is closed')
+                zygote = self._zygotes.popleft() if self._zygotes else None
+            zygote = zygote or Zygote(self.cmd)
+            self._refill()
+            if zygote.wait_ready():
+                return zygote
+            zygote.close()
+        return None
+
+    def close(self):
+        """Stops all interpreters of pool, acquiring from closed pool is an error.
+
+        """
+        with self._lock:
+            self._closed = True
+            zygotes, self._zygotes = self._zygotes, deque()
+        for zygote in zygotes:
+            zygote.close()
+
+    def _refill(self):
+        # replacement is started outside of lock, pool closed meanwhile does not keep it
+        zygote = Zygote(self.cmd)
+        with self._lock:
+            if not self._closed:
+                self._zygotes.append(zygote)
+                return
+        zygote.close()
+
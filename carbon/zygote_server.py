@@ -0,0 +1,66 @@
+"""Interpreter side of zygote, run as script by interpreters of ZygotePool.
+
+Interpreter waits on control socket for working directory and arguments of program and file descriptors of
+its STDIN, STDOUT and STDERR, then runs script as __main__ in place. Only built-in modules are imported
+(_socket instead of socket, which pulls enum and others), so program starts in interpreter as clean as
+a freshly started one.
+
+"""
+import _socket
+import os
+import sys
+
+
+# maximum size of message with arguments of program
+MESSAGE_SIZE = 65536
+
+# byte sent by zygote when it is ready to run program
+READY = b'R'
+
+# size of file descriptor in SCM_RIGHTS message
+FD_SIZE = 4
+
+
+def serve(fd):
+    """Waits for program on control socket and runs it in this interpreter.
+
+    Args:
+        fd (int): File descriptor of control socket
+
+    """
+    control = _socket.socket(fileno=fd)
+    control.sendall(READY)
+    message, ancdata, _, _ = control.recvmsg(MESSAGE_SIZE, _socket.CMSG_SPACE(3 * FD_SIZE))
+    control.close()
+    if not message:
+        return  # pool is closed
+
+    fds = []
+    for level, kind, data in ancdata:
+        if level == _socket.SOL_SOCKET and kind == _socket.SCM_RIGHTS:
+            fds += [int.from_bytes(data[i:i + FD_SIZE], sys.byteorder)
+                    for i in range(0, len(data) - len(data) % FD_SIZE, FD_SIZE)]
+
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+
+    cwd, *argv = [os.fsdecode(arg) for arg in message.split(b'\0')]
+    if cwd:
+        os.chdir(cwd)
+
+    # run script as if it was passed to interpreter
+    sys.argv = argv
+    sys.path[0] = os.path.dirname(os.path.abspath(sys.argv[0]))
+    with open(sys.argv[0], 'rb') as f:
+        code = compile(f.read(), sys.argv[0], 'exec')
+
+    main = type(sys)('__main__')
+    main.__file__ = sys.argv[0]
+    main.__builtins__ = __builtins__
+    sys.modules['__main__'] = main
+    exec(code, main.__dict__)
+
+
+if __name__ == '__main__':
+    serve(int(sys.argv[1]))
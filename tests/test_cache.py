@@ -0,0 +1,158 @@
+"""Keys, entries and size accounting of compilation and result caches.
+
+Usage:
+    python -m pytest tests
+
+"""
+import functools
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'carbon'))
+
+from cache import CachedResult, CompilationCache, ResultCache
+from checkers import Mismatch, ProgramChecker, TokenChecker
+from config import Execution
+from errors import CompilationFailedError
+from program import Program
+
+
+EXECUTION = Execution.load({'cmd': './{filename}', 'limits': {'time': 1000, 'vms': 64 * 1024 * 1024}})
+
+# compiler rejecting sources which contain "error", other sources are copied to executable
+COMPILER = '''if grep -q error "$1"; then echo "$1:1: error: broken" >&2; exit 1; fi
+cp "$1" "$1.o" && chmod +x "$1.o"
+'''
+
+
+class CompilationCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='carbon-test-')
+        self.cache = CompilationCache(os.path.join(self.directory, 'compilation'))
+        compiler = os.path.join(self.directory, 'cc.sh')
+        with open(compiler, 'w') as f:
+            f.write(COMPILER)
+        self.config = {
+            'extension': 'sh',
+            'compilation': {'need': True, 'cmd': 'sh {0} {{filename}}'.format(compiler), 'executable': '{filename}.o',
+                            'limits': {'time': 5000}},
+            'execution': {'cmd': 'sh {filename}', 'limits': {'time': 5000}},
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def program(self, name, source):
+        filename = os.path.join(self.directory, name)
+        with open(filename, 'w') as f:
+            f.write(source)
+        return Program(filename, self.config, self.cache)
+
+    def test_compilation_error(self):
+        for name in ('first.sh', 'second.sh'):
+            program = self.program(name, 'echo error\n')
+            with self.assertRaises(CompilationFailedError) as raised:
+                program.compile()
+            # cached STDERR names source of current program
+            self.assertEqual(raised.exception.stderr, '{0}:1: error: broken\n'.format(program.filename))
+        self.assertTrue(program.cache_hit)
+
+    def test_executable(self):
+        first, second = self.program('first.sh', 'echo 1\n'), self.program('second.sh', 'echo 1\n')
+        first.compile()
+        second.compile()
+        self.assertEqual((first.cache_hit, second.cache_hit), (False, True))
+        self.assertEqual(second.execute('').stdout, '1\n')
+
+        # program can not change cached executable through its own copy
+        cached = os.path.join(self.cache.root, 'entries', second._cache_key, 'executable')
+        self.assertNotEqual(os.stat(second.filename).st_ino, os.stat(cached).st_ino)
+        with open(second.filename, 'w') as f:
+            f.write('echo 2\n')
+        third = self.program('third.sh', 'echo 1\n')
+        third.compile()
+        self.assertTrue(third.cache_hit)
+        self.assertEqual(third.execute('').stdout, '1\n')
+
+    def test_eviction(self):
+        self.cache.max_size = 1000
+        for number in range(20):
+            self.program('{0}.sh'.format(number), 'echo {0}\n'.format(number) * 10).compile()
+        self.assertLessEqual(self.cache._size, 1000)
+        self.assertLessEqual(sum(size for _, size, _ in self.cache._entries()), 1000)
+        self.assertLess(len(os.listdir(os.path.join(self.cache.root, 'entries'))), 20)
+
+
+class ResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='carbon-test-')
+        self.cache = ResultCache(os.path.join(self.directory, 'results'))
+        self.executable = self.write('program', b'program')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        # cached digests are kept until mtime or size changes, so rewritten file gets later mtime
+        os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10 ** 9))
+        return path
+
+    def key(self, checker=TokenChecker, **kwargs):
+        return self.cache.key(self.executable, EXECUTION, '1 2', '3', checker, **kwargs)
+
+    def test_key(self):
+        self.assertEqual(self.key(), self.key())
+        self.assertNotEqual(self.key(), self.key(checker=functools.partial(TokenChecker)))
+        self.assertNotEqual(self.key(), self.key(settings={'timing': {'runs': 3}}))
+        self.assertNotEqual(self.key(), self.cache.key(self.executable, EXECUTION, '1 2', '4', TokenChecker))
+
+        key = self.key()
+        self.write('program', b'rebuilt')
+        self.assertNotEqual(key, self.key())
+
+    def test_key_of_checker_program(self):
+        checker_path = self.write('check', b'checker')
+        checker = functools.partial(ProgramChecker, cmd='{0} {{input}} {{output}} {{answer}}'.format(checker_path))
+        key = self.key(checker)
+        self.assertEqual(key, self.key(checker))
+
+        # checker rebuilt in place keeps its command
+        self.write('check', b'rebuilt checker')
+        self.assertNotEqual(key, self.key(checker))
+
+    def test_put_get(self):
+        key = self.key()
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, CachedResult(verdict='WA', time=15, mismatch=Mismatch(offset=4, line=2)))
+        self.assertEqual(self.cache.get(key), CachedResult(verdict='WA', time=15, mismatch=Mismatch(offset=4, line=2)))
+        self.cache.invalidate(key)
+        self.assertIsNone(self.cache.get(key))
+
+    def test_invalidate_executable(self):
+        for output in ('3', '4', '5'):
+            key = self.cache.key(self.executable, EXECUTION, '1 2', output, TokenChecker)
+            self.cache.put(key, CachedResult(verdict='OK'))
+        self.assertGreater(self.cache._size, 0)
+        self.cache.invalidate_executable(self.executable)
+        self.assertIsNone(self.cache.get(self.key()))
+        self.assertEqual(self.cache._size, 0)
+
+    def test_eviction(self):
+        self.cache.max_size = 1000
+        keys = [self.cache.key(self.executable, EXECUTION, str(number), '3', TokenChecker) for number in range(40)]
+        for key in keys:
+            self.cache.put(key, CachedResult(verdict='OK', time=15))
+        self.assertLessEqual(self.cache._size, 1000)
+        self.assertLess(sum(self.cache.get(key) is not None for key in keys), len(keys))
+
+
+if __name__ == '__main__':
+    unittest.main()
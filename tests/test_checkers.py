@@ -0,0 +1,106 @@
+"""Checkers fed with output split into chunks at every possible boundary.
+
+Usage:
+    python -m pytest tests
+
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'carbon'))
+
+import checkers
+from checkers import FloatChecker, Mismatch, ProgramChecker, StreamingChecker, TokenChecker, WhitespaceChecker
+
+
+def splits(output):
+    """Yields output split into chunks in every way with at most two boundaries, and byte by byte.
+
+    """
+    yield [output]
+    yield [output[i:i + 1] for i in range(len(output))]
+    for first in range(len(output) + 1):
+        for second in range(first, len(output) + 1):
+            yield [output[:first], output[first:second], output[second:]]
+
+
+def check(factory, expected, chunks):
+    checker = factory(expected)
+    for chunk in chunks:
+        if not checker.feed(chunk):
+            return False, checker.mismatch
+    return checker.finish(), checker.mismatch
+
+
+class CheckerTest(unittest.TestCase):
+
+    def assertVerdict(self, factory, expected, output, accepted):
+        for chunks in splits(output):
+            ok, mismatch = check(factory, expected, chunks)
+            self.assertEqual(ok, accepted, (factory, expected, chunks, mismatch))
+
+    def test_streaming(self):
+        self.assertVerdict(StreamingChecker, '1 2\n3 4\n', b'1 2\n3 4\n', True)
+        self.assertVerdict(StreamingChecker, '1 2\n3 4\n', b'1 2\n3 4', False)
+        self.assertVerdict(StreamingChecker, '1 2\n3 4\n', b'1 2\n3 4\n\n', False)
+        self.assertVerdict(StreamingChecker, '1 2\n3 4\n', b'1  2\n3 4\n', False)
+
+    def test_streaming_mismatch(self):
+        _, mismatch = check(StreamingChecker, '1 2\n3 4\n', [b'1 2\n', b'3 5\n'])
+        self.assertEqual(mismatch, Mismatch(offset=6, line=2))
+
+    def test_token(self):
+        for output in (b'1 2\n3 4\n', b'1  2\n3 4', b'\n1\t2 3\n\n4  \n\n'):
+            self.assertVerdict(TokenChecker, '1 2\n3 4\n', output, True)
+        for output in (b'1 2\n3\n', b'1 2\n3 4 5\n', b'1 2\n34\n', b'12 3 4\n'):
+            self.assertVerdict(TokenChecker, '1 2\n3 4\n', output, False)
+
+    def test_token_mismatch(self):
+        _, mismatch = check(TokenChecker, '1 2\n3 4\n', [b'1  2\n', b'3 ', b'5\n'])
+        self.assertEqual((mismatch.offset, mismatch.line), (7, 2))
+
+    def test_whitespace(self):
+        for output in (b'1 2\n3 4\n', b'1  2\n3 4', b'  1\t2 \n3 4\n\n\n', b'1 2\n3    4  \n'):
+            self.assertVerdict(WhitespaceChecker, '1 2\n3 4\n', output, True)
+        for output in (b'1 2 3 4\n', b'1\n2\n3 4\n', b'1 2\n\n3 4\n', b'1 2\n3 4\n5\n', b'1 2\n'):
+            self.assertVerdict(WhitespaceChecker, '1 2\n3 4\n', output, False)
+
+    def test_whitespace_mismatch(self):
+        _, mismatch = check(WhitespaceChecker, '1 2\n3 4\n', [b'1  2\n', b'3 ', b'5\n'])
+        self.assertEqual((mismatch.offset, mismatch.line), (5, 2))
+
+    def test_float(self):
+        for output in (b'1 2.0000001\nabc\n', b'1.0000000001  2\nabc'):
+            self.assertVerdict(FloatChecker, '1 2\nabc\n', output, True)
+        for output in (b'1 2.1\nabc\n', b'1 2\nabd\n', b'1 2\n'):
+            self.assertVerdict(FloatChecker, '1 2\nabc\n', output, False)
+
+    def test_float_batches(self):
+        # batches of at least VECTORIZE_THRESHOLD tokens are compared with NumPy if it is installed
+        count = checkers.VECTORIZE_THRESHOLD * 3
+        expected = ' '.join(str(i / 7) for i in range(count)) + '\n'
+        close = ' '.join('{0:.9f}'.format(i / 7) for i in range(count)).encode() + b'\n'
+        far = close.replace(b'14.285714286', b'14.295714286', 1)
+        for numpy in ([checkers.numpy, None] if checkers.numpy is not None else [None]):
+            checkers.numpy, saved = numpy, checkers.numpy
+            try:
+                for chunks in ([close], [close[:1000], close[1000:]], [close[:-1], b'\n']):
+                    self.assertEqual(check(FloatChecker, expected, chunks)[0], True)
+                ok, mismatch = check(FloatChecker, expected, [far])
+                self.assertEqual(ok, False)
+                self.assertEqual(mismatch.offset, far.index(b'14.295714286'))
+                self.assertEqual(check(FloatChecker, expected, [close.replace(b'0.0', b'x', 1)])[0], False)
+            finally:
+                checkers.numpy = saved
+
+    def test_program(self):
+        factory = lambda expected: ProgramChecker(expected, '', cmd='cmp -s {output} {answer}')
+        self.assertEqual(check(factory, '1 2\n', [b'1', b' 2', b'\n']), (True, None))
+        ok, mismatch = check(factory, '1 2\n', [b'1 ', b'3\n'])
+        self.assertEqual(ok, False)
+        self.assertEqual(mismatch, Mismatch(message='Checker has exited with 1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""Coordinator and two workers judging pack of tests over loopback.
+
+Usage:
+    python -m pytest tests
+
+"""
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'carbon'))
+
+from cluster import DONE, Coordinator, Worker
+from engine import Engine
+import testpack
+
+
+SOURCE = 'a, b = map(int, input().split())\nprint(a + b)\n'
+
+
+class ClusterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='carbon-test-')
+        self.pack = os.path.join(self.directory, 'sum.pack')
+        with testpack.TestPackWriter(self.pack, 'zlib') as writer:
+            for number in range(5):
+                writer.add('{0} {0}'.format(number), '{0}\n'.format(2 * number))
+
+        self.coordinator = Coordinator(heartbeat_timeout=5.0)
+        self.engines, self.workers, self.threads = [], [], []
+        for number in range(2):
+            engine = Engine(logging.CRITICAL)
+            worker = Worker(self.coordinator.address, engine, 'worker-{0}'.format(number), heartbeat_interval=0.5)
+            # packs are closed as soon as no job uses them
+            worker.OPEN_PACKS = 0
+            thread = threading.Thread(target=worker.serve_forever, args=(0.1,), daemon=True)
+            thread.start()
+            self.engines.append(engine)
+            self.workers.append(worker)
+            self.threads.append(thread)
+
+        deadline = time.monotonic() + 10
+        while len(self.coordinator.stats().workers) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def tearDown(self):
+        self.coordinator.close()
+        for worker in self.workers:
+            worker.close()
+        for thread in self.threads:
+            thread.join(10)
+        for engine in self.engines:
+            engine.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_judge(self):
+        self.assertEqual(len(self.coordinator.stats().workers), 2)
+        wrong = SOURCE.replace('a + b', 'a * b')
+        ids = [self.coordinator.submit('py', source, self.pack) for source in (SOURCE, SOURCE, wrong, SOURCE)]
+        jobs = [self.coordinator.result(id, 60) for id in ids]
+
+        self.assertEqual([job.state for job in jobs], [DONE] * 4)
+        self.assertEqual([job.result['verdict'] for job in jobs], ['OK', 'OK', 'WA', 'OK'])
+        self.assertEqual(len(jobs[0].result['tests']), 5)
+        # both workers are free when jobs are submitted, so they share them
+        self.assertEqual(set(job.worker for job in jobs), {'worker-0', 'worker-1'})
+        # jobs are sent to clients as JSON
+        self.assertEqual(json.loads(json.dumps(jobs[0].to_dict()))['id'], ids[0])
+
+        stats = self.coordinator.stats()
+        self.assertEqual(stats.pending, 0)
+        self.assertTrue(all(worker['packs'] == 1 and not worker['jobs'] for worker in stats.workers.values()))
+        self.assertTrue(all(not worker._packs for worker in self.workers))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            self.coordinator.submit('py', SOURCE, self.pack, checker='unknown')
+        with self.assertRaises(ValueError):
+            self.coordinator.submit('py', SOURCE, self.pack, mode='unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Loading and validation of lang configs.
+
+Usage:
+    python -m pytest tests
+
+"""
+import copy
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'carbon'))
+
+import langs_config
+from config import Command, LangConfig
+from errors import InvalidConfigError
+
+
+class ConfigTest(unittest.TestCase):
+
+    def assertInvalid(self, key, change):
+        config = copy.deepcopy(langs_config.cpp)
+        change(config)
+        with self.assertRaises(InvalidConfigError) as raised:
+            LangConfig.load(config)
+        self.assertEqual(raised.exception.key, key)
+
+    def test_load(self):
+        config = LangConfig.load(langs_config.cpp)
+        self.assertIs(LangConfig.load(config), config)
+        self.assertEqual(config, LangConfig.load(copy.deepcopy(langs_config.cpp)))
+        self.assertEqual(config.compilation.limits.time, 1000)
+        self.assertEqual(config.execution.limits.output, langs_config.cpp['execution']['limits'].get('output'))
+        for name in ('cpp', 'py', 'py_warm'):
+            self.assertIsInstance(LangConfig.load(getattr(langs_config, name)), LangConfig)
+
+    def test_command(self):
+        command = Command('g++ -o {filename}.o "{filename}"')
+        self.assertEqual(command.format('my source.cpp'), ['g++', '-o', 'my source.cpp.o', 'my source.cpp'])
+        self.assertEqual(str(command), 'g++ -o {filename}.o "{filename}"')
+
+    def test_invalid(self):
+        self.assertInvalid('config', lambda config: config.update(compiler='g++'))
+        self.assertInvalid('config', lambda config: config.pop('execution'))
+        self.assertInvalid('compilation', lambda config: config['compilation'].pop('cmd'))
+        self.assertInvalid('compilation.cmd', lambda config: config['compilation'].update(cmd='g++ {source}'))
+        self.assertInvalid('compilation.cmd', lambda config: config['compilation'].update(cmd='g++ "{filename}'))
+        self.assertInvalid('execution.cmd', lambda config: config['execution'].update(cmd=''))
+        self.assertInvalid('execution.limits.time', lambda config: config['execution']['limits'].update(time=-1))
+        self.assertInvalid('execution.limits.vms', lambda config: config['execution']['limits'].update(vms='1G'))
+        self.assertInvalid('execution.limits.backend',
+                           lambda config: config['execution']['limits'].update(backend='docker'))
+        self.assertInvalid('execution.limits', lambda config: config['execution']['limits'].update(memory=1))
+
+    def test_zygote(self):
+        config = copy.deepcopy(langs_config.py_warm)
+        self.assertEqual(LangConfig.load(config).execution.zygote.cmd, config['execution']['zygote']['cmd'])
+        # warm interpreter runs only script, so command must be its interpreter followed by script
+        config['execution']['cmd'] = 'python3 -O ./{filename}'
+        with self.assertRaises(InvalidConfigError) as raised:
+            LangConfig.load(config)
+        self.assertEqual(raised.exception.key, 'execution.zygote')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+"""Queue of judge daemon and its HTTP API.
+
+Usage:
+    python -m pytest tests
+
+"""
+import http.client
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'carbon'))
+
+from daemon import DONE, QUEUED, Judge, SubmissionQueue, make_server
+from engine import Engine
+from errors import QueueFullError
+import testpack
+
+
+CONFIG = {
+    'extension': 'py',
+    'compilation': {'need': False},
+    'execution': {'cmd': 'python3 {filename}', 'limits': {'time': 5000, 'vms': 1024 * 1024 * 1024}},
+}
+
+SOURCE = 'a, b = map(int, input().split())\nprint(a + b)\n'
+
+TESTS = [['1 2', '3\n'], ['2 2', '4\n']]
+
+
+class SubmissionQueueTest(unittest.TestCase):
+
+    def test_priority(self):
+        queue = SubmissionQueue(4)
+        for item, priority in (('a', 10), ('b', 0), ('c', 10), ('d', 0)):
+            queue.put(item, priority)
+        self.assertEqual(queue.depths(), {0: 2, 10: 2})
+        with self.assertRaises(QueueFullError) as raised:
+            queue.put('e')
+        self.assertEqual((raised.exception.depth, raised.exception.capacity), (4, 4))
+        self.assertEqual([queue.get() for _ in range(4)], ['b', 'd', 'a', 'c'])
+        self.assertEqual(len(queue), 0)
+
+    def test_close(self):
+        queue = SubmissionQueue(1)
+        items = []
+        thread = threading.Thread(target=lambda: items.append(queue.get()))
+        thread.start()
+        queue.close()
+        thread.join(10)
+        self.assertEqual(items, [None])
+
+
+class JudgeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='carbon-test-')
+        with testpack.TestPackWriter(os.path.join(self.directory, 'sum.pack')) as writer:
+            for input, output in TESTS:
+                writer.add(input, output)
+        os.mkdir(os.path.join(self.directory, 'product'))
+        for name, content in (('1.in', '2 3'), ('1.out', '6\n'), ('2.in', '1 1'), ('2.out', '1\n')):
+            with open(os.path.join(self.directory, 'product', name), 'w') as f:
+                f.write(content)
+        self.engine = Engine(logging.CRITICAL)
+        self.judge = Judge(self.engine, {'py': CONFIG}, problems=self.directory)
+
+    def tearDown(self):
+        self.judge.close()
+        self.engine.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_submit(self):
+        inline = self.judge.submit('py', SOURCE, TESTS)
+        pack = self.judge.submit('py', SOURCE, problem='sum', checker='token')
+        directory = self.judge.submit('py', SOURCE, problem='product', mode='stop-on-first')
+        for submission, verdicts in ((inline, ['OK', 'OK']), (pack, ['OK', 'OK']), (directory, ['WA', 'SK'])):
+            submission = self.judge.get(submission.id, 60)
+            self.assertEqual(submission.state, DONE)
+            self.assertEqual([test.verdict for test in submission.result.tests], verdicts)
+        self.assertIsNone(self.judge.get('unknown'))
+        self.assertEqual(self.engine.failure_stats.get('product'), {'1': [1, 1]})
+
+    def test_invalid(self):
+        for kwargs in ({'lang': 'java'}, {'source': 1}, {'checker': 'unknown'}, {'priority': 'high'},
+                       {'mode': 'unknown'}, {'epsilon': 0.1}, {'tests': [['1 2']]}, {'tests': None},
+                       {'tests': None, 'problem': '../sum'}, {'tests': None, 'problem': 'missing'},
+                       {'mode': 'group', 'groups': [1]}):
+            submission = dict({'lang': 'py', 'source': SOURCE, 'tests': TESTS}, **kwargs)
+            with self.assertRaises(ValueError, msg=kwargs):
+                self.judge.submit(**submission)
+        # rejected sources are not left in workspace
+        self.assertEqual(os.listdir(self.judge.workspace), [])
+
+    def test_queue_full(self):
+        judge = Judge(self.engine, {'py': CONFIG}, workers=0, queue_size=1)
+        try:
+            submission = judge.submit('py', SOURCE, TESTS, priority=5)
+            self.assertEqual(submission.state, QUEUED)
+            with self.assertRaises(QueueFullError):
+                judge.submit('py', SOURCE, TESTS)
+            self.assertEqual(judge.stats(), {'depth': 1, 'capacity': 1, 'depths': {'5': 1},
+                                              'running': 0, 'workers': 0})
+            self.assertEqual(len(os.listdir(judge.workspace)), 1)
+        finally:
+            judge.close()
+
+
+class ServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = Engine(logging.CRITICAL)
+        self.judge = Judge(self.engine, {'py': CONFIG}, queue_size=1)
+        self.server = make_server(self.judge, ('127.0.0.1', 0))
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.1,), daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join(10)
+        self.judge.close()
+        self.engine.close()
+
+    def request(self, method, path, body=None):
+        connection = http.client.HTTPConnection(*self.server.server_address, timeout=60)
+        try:
+            connection.request(method, path, body if body is None else json.dumps(body),
+                               {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            data = response.read().decode()
+            if response.getheader('Content-Type') == 'application/json':
+                data = json.loads(data)
+            return response, data
+        finally:
+            connection.close()
+
+    def test_submission(self):
+        response, data = self.request('POST', '/submissions', {'lang': 'py', 'source': SOURCE, 'tests': TESTS})
+        self.assertEqual(response.status, 202)
+        self.assertIsNotNone(response.getheader('X-Queue-Depth'))
+
+        response, data = self.request('GET', '/submissions/{0}?wait=60'.format(data['id']))
+        self.assertEqual(response.status, 200)
+        self.assertEqual(data['state'], DONE)
+        self.assertEqual(data['result']['verdict'], 'OK')
+        self.assertEqual([test['verdict'] for test in data['result']['tests']], ['OK', 'OK'])
+
+        response, data = self.request('GET', '/metrics')
+        self.assertEqual(response.status, 200)
+        self.assertIn('carbon_submissions_total{result="queued"} 1', data)
+
+    def test_errors(self):
+        self.assertEqual(self.request('POST', '/submissions', {'lang': 'java', 'source': SOURCE})[0].status, 400)
+        self.assertEqual(self.request('POST', '/submissions', {'unknown': 1})[0].status, 400)
+        self.assertEqual(self.request('POST', '/submissions', [1, 2])[0].status, 400)
+        self.assertEqual(self.request('GET', '/submissions/unknown')[0].status, 404)
+        self.assertEqual(self.request('GET', '/submissions/unknown?wait=x')[0].status, 400)
+        self.assertEqual(self.request('GET', '/unknown')[0].status, 404)
+
+    def test_queue_full(self):
+        # worker is kept busy by long submission and the next one fills queue
+        slow = {'lang': 'py', 'source': 'import time\ntime.sleep(1)\n', 'tests': [['', '']]}
+        self.assertEqual(self.request('POST', '/submissions', slow)[0].status, 202)
+        while self.judge.stats().running == 0:
+            threading.Event().wait(0.01)
+        self.assertEqual(self.request('POST', '/submissions', slow)[0].status, 202)
+
+        response, data = self.request('POST', '/submissions', slow)
+        self.assertEqual(response.status, 503)
+        self.assertEqual(response.getheader('Retry-After'), '1')
+        self.assertEqual(response.getheader('X-Queue-Depth'), '1')
+        self.assertEqual((data['depth'], data['capacity']), (1, 1))
+
+        response, data = self.request('GET', '/queue')
+        self.assertEqual(response.status, 200)
+        self.assertEqual((data['depth'], data['running'], data['depths']), (1, 1, {'0': 1}))
+
+
+if __name__ == '__main__':
+    unittest.main()
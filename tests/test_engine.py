@@ -0,0 +1,193 @@
+"""Suites of tests: results, fail-fast modes, reruns of borderline runs and startup baselines.
+
+Usage:
+    python -m pytest tests
+
+"""
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'carbon'))
+
+from calibration import Calibration, Calibrator
+from checkers import TokenChecker
+from engine import Engine
+from ordering import STOP_IN_GROUP, STOP_ON_FIRST
+from timing import StatisticalTiming
+from verdicts import ACCEPTED, COMPILATION_ERROR, SKIPPED, WRONG_ANSWER
+
+
+CONFIG = {
+    'extension': 'py',
+    'compilation': {'need': False},
+    'execution': {'cmd': 'python3 {filename}', 'limits': {'time': 5000, 'vms': 1024 * 1024 * 1024}},
+}
+
+SOURCE = 'a, b = map(int, input().split())\nprint(a + b)\n'
+
+TESTS = [('1 2', '3\n'), ('2 2', '5\n'), ('3 4', '7\n'), ('0 0', '1\n'), ('5 5', '10\n')]
+
+
+class SuiteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='carbon-test-')
+        self.engine = Engine(logging.CRITICAL)
+
+    def tearDown(self):
+        self.engine.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def source(self, source=SOURCE):
+        filename = os.path.join(self.directory, 'program.py')
+        with open(filename, 'w') as f:
+            f.write(source)
+        return filename
+
+    def verdicts(self, result):
+        return [test.verdict for test in result.tests]
+
+    def test_suite(self):
+        result = self.engine.test_suite(self.source(), CONFIG, TESTS)
+        self.assertEqual(result.verdict, WRONG_ANSWER)
+        self.assertEqual(self.verdicts(result), [ACCEPTED, WRONG_ANSWER, ACCEPTED, WRONG_ANSWER, ACCEPTED])
+        self.assertIsNone(result.compilation_error)
+        self.assertIsNone(result.calibration)
+        self.assertEqual(result.tests[1].mismatch.line, 1)
+        self.assertTrue(all(test.time is not None and test.timing is None for test in result.tests))
+        self.assertIn('testing', result.phases)
+
+        # results are sent to clients as JSON
+        data = json.loads(json.dumps(result.to_dict()))
+        self.assertEqual([test['verdict'] for test in data['tests']], self.verdicts(result))
+        self.assertEqual(data['tests'][1]['mismatch']['line'], 1)
+
+    def test_checker(self):
+        tests = [('1 2', ' 3 '), ('2 2', '4')]
+        result = self.engine.test_suite(self.source(), CONFIG, tests, checker=TokenChecker)
+        self.assertEqual(result.verdict, ACCEPTED)
+
+    def test_autoremove(self):
+        filename = self.source()
+        self.assertEqual(self.engine.test_suite(filename, CONFIG, TESTS[:1], autoremove=True).verdict, ACCEPTED)
+        self.assertFalse(os.path.exists(filename))
+
+    def test_compilation_error(self):
+        compilation = {'need': True, 'cmd': 'sh -c "echo broken >&2; exit 1"', 'executable': '{filename}.o',
+                       'limits': {'time': 5000}}
+        config = dict(CONFIG, compilation=compilation)
+        result = self.engine.test_suite(self.source(), config, TESTS)
+        self.assertEqual(result.verdict, COMPILATION_ERROR)
+        self.assertTrue(result.compilation_error.endswith('broken\n'))
+        self.assertEqual(result.tests, [])
+
+    def test_stop_on_first(self):
+        result = self.engine.test_suite(self.source(), CONFIG, TESTS, mode=STOP_ON_FIRST)
+        self.assertEqual(result.verdict, WRONG_ANSWER)
+        self.assertEqual(self.verdicts(result), [ACCEPTED, WRONG_ANSWER, SKIPPED, SKIPPED, SKIPPED])
+
+    def test_stop_in_group(self):
+        groups = [1, 1, 1, 2, 2]
+        result = self.engine.test_suite(self.source(), CONFIG, TESTS, mode=STOP_IN_GROUP, groups=groups)
+        self.assertEqual(self.verdicts(result), [ACCEPTED, WRONG_ANSWER, SKIPPED, WRONG_ANSWER, SKIPPED])
+
+        with self.assertRaises(ValueError):
+            self.engine.test_suite(self.source(), CONFIG, TESTS, mode=STOP_IN_GROUP, groups=[1, 2])
+        with self.assertRaises(ValueError):
+            self.engine.test_suite(self.source(), CONFIG, TESTS, mode='unknown')
+
+    def test_failures_first(self):
+        for _ in range(2):
+            result = self.engine.test_suite(self.source(), CONFIG, TESTS, mode=STOP_ON_FIRST, problem='sum')
+        # test 2 has failed in the first suite, so it is executed first and stops the second one
+        self.assertEqual(self.verdicts(result), [SKIPPED, WRONG_ANSWER, SKIPPED, SKIPPED, SKIPPED])
+        self.assertEqual(self.engine.failure_stats.get('sum'), {'1': [1, 0], '2': [2, 2]})
+
+
+class TimingTest(unittest.TestCase):
+
+    def test_policy(self):
+        timing = StatisticalTiming(runs=3, margin=0.1, budget=250)
+        self.assertEqual(timing.limit(1000), 1100)
+        self.assertIsNone(timing.limit(None))
+        self.assertTrue(timing.borderline(950, 1000))
+        self.assertTrue(timing.borderline(1080, 1000))
+        self.assertFalse(timing.borderline(500, 1000))
+        self.assertFalse(timing.borderline(None, 1000))
+        self.assertTrue(timing.affordable(100, 150))
+        self.assertFalse(timing.affordable(200, 150))
+
+        summary = timing.summarize([100, 102, 98])
+        self.assertEqual((summary.runs, summary.min, summary.median, summary.stddev), (3, 98, 100, 2.0))
+        self.assertFalse(summary.noisy)
+        self.assertTrue(timing.summarize([100, 200, 50]).noisy)
+
+        with self.assertRaises(ValueError):
+            StatisticalTiming(runs=0)
+        with self.assertRaises(ValueError):
+            StatisticalTiming(margin=-0.1)
+
+    def test_reruns(self):
+        directory = tempfile.mkdtemp(prefix='carbon-test-')
+        # every run is within margin of limit, so it is borderline and executed runs times
+        engine = Engine(logging.CRITICAL, timing=StatisticalTiming(runs=3, margin=1.0))
+        try:
+            filename = os.path.join(directory, 'program.py')
+            with open(filename, 'w') as f:
+                f.write(SOURCE)
+            result = engine.test_suite(filename, CONFIG, TESTS[:2])
+        finally:
+            engine.close()
+            shutil.rmtree(directory, ignore_errors=True)
+
+        self.assertEqual([test.verdict for test in result.tests], [ACCEPTED, WRONG_ANSWER])
+        self.assertTrue(all(test.timing.runs == 3 for test in result.tests))
+        self.assertTrue(all(test.time == test.timing.median for test in result.tests))
+
+
+class CalibrationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='carbon-test-')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_calibrator(self):
+        calibrator = Calibrator(runs=3)
+        calibration = calibrator.get(CONFIG)
+        self.assertIsInstance(calibration, Calibration)
+        self.assertEqual(calibration.runs, 3)
+        self.assertGreater(calibration.time, 0)
+        # baseline is kept until it gets stale
+        self.assertIs(calibrator.get(CONFIG), calibration)
+        calibrator.refresh = 0
+        self.assertIsNot(calibrator.get(CONFIG), calibration)
+
+        self.assertIsNone(calibrator.get(dict(CONFIG, extension='unknown')))
+        self.assertIsNone(Calibrator(runs=1).get(dict(CONFIG, execution={'cmd': 'false {filename}'})))
+
+    def test_engine(self):
+        engine = Engine(logging.CRITICAL, calibrator=Calibrator(runs=3, subtract=True))
+        try:
+            filename = os.path.join(self.directory, 'program.py')
+            with open(filename, 'w') as f:
+                f.write(SOURCE)
+            calibration = engine.calibrate(CONFIG)
+            result = engine.test_suite(filename, CONFIG, TESTS[:1])
+        finally:
+            engine.close()
+
+        self.assertEqual(result.verdict, ACCEPTED)
+        self.assertIs(result.calibration, calibration)
+        self.assertEqual(result.to_dict()['calibration']['runs'], 3)
+        self.assertGreaterEqual(result.tests[0].time, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""Failure statistics tests of problems are ordered by in fail-fast modes.
+
+Usage:
+    python -m pytest tests
+
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'carbon'))
+
+from ordering import FailureStats
+
+
+class FailureStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='carbon-test-')
+        self.path = os.path.join(self.directory, 'failures.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_order(self):
+        stats = FailureStats()
+        self.assertEqual(stats.order('sum', [1, 2, 3, 4]), [1, 2, 3, 4])
+        stats.record('sum', {1: False, 2: False, 3: True, 4: True})
+        stats.record('sum', {1: False, 2: True, 3: False, 4: True})
+        self.assertEqual(stats.order('sum', [1, 2, 3, 4]), [4, 2, 3, 1])
+        self.assertEqual(stats.get('sum'), {'1': [2, 0], '2': [2, 1], '3': [2, 1], '4': [2, 2]})
+        # statistics of problems are separate
+        self.assertEqual(stats.order('product', [1, 2, 3, 4]), [1, 2, 3, 4])
+        self.assertEqual(stats.get('product'), {})
+
+    def test_rare_failure(self):
+        stats = FailureStats()
+        stats.record('sum', {1: True})
+        for _ in range(9):
+            stats.record('sum', {2: True})
+        stats.record('sum', {2: False})
+        # single failure of test executed once is less certain than frequent failures of test executed often
+        self.assertEqual(stats.order('sum', [1, 2]), [2, 1])
+
+    def test_save(self):
+        stats = FailureStats(self.path, save_interval=3600)
+        stats.record('sum', {1: True, 2: False})
+        self.assertFalse(os.path.exists(self.path))
+        stats.save()
+        self.assertEqual(FailureStats(self.path).get('sum'), {'1': [1, 1], '2': [1, 0]})
+
+        stats = FailureStats(self.path, save_interval=0)
+        stats.record('sum', {1: True})
+        self.assertEqual(FailureStats(self.path).get('sum'), {'1': [2, 2], '2': [1, 0]})
+
+    def test_damaged(self):
+        with open(self.path, 'w') as f:
+            f.write('{"sum": ')
+        stats = FailureStats(self.path)
+        self.assertEqual(stats.get('sum'), {})
+        stats.record('sum', {1: True})
+        stats.save()
+        self.assertEqual(FailureStats(self.path).get('sum'), {'1': [1, 1]})
+
+
+if __name__ == '__main__':
+    unittest.main()
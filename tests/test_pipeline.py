@@ -0,0 +1,88 @@
+"""Pipeline compiling submissions while tests of previous ones are executed.
+
+Usage:
+    python -m pytest tests
+
+"""
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'carbon'))
+
+from engine import Engine
+from errors import FileDoesNotExistError
+from pipeline import Pipeline
+from verdicts import ACCEPTED, COMPILATION_ERROR, WRONG_ANSWER
+
+
+CONFIG = {
+    'extension': 'py',
+    'compilation': {'need': False},
+    'execution': {'cmd': 'python3 {filename}', 'limits': {'time': 5000, 'vms': 1024 * 1024 * 1024}},
+}
+
+SOURCE = 'a, b = map(int, input().split())\nprint(a + b)\n'
+
+TESTS = [('1 2', '3\n'), ('2 2', '4\n')]
+
+
+class PipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='carbon-test-')
+        self.engine = Engine(logging.CRITICAL)
+        self.pipeline = Pipeline(self.engine, compilers=2, executors=1)
+
+    def tearDown(self):
+        self.pipeline.close()
+        self.engine.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def source(self, name, source=SOURCE):
+        filename = os.path.join(self.directory, name)
+        with open(filename, 'w') as f:
+            f.write(source)
+        return filename
+
+    def test_results(self):
+        sources = [SOURCE, SOURCE.replace('a + b', 'a * b'), SOURCE]
+        futures = [self.pipeline.submit(self.source('{0}.py'.format(number), source), CONFIG, TESTS)
+                   for number, source in enumerate(sources)]
+        results = [future.result(60) for future in futures]
+        self.assertEqual([result.verdict for result in results], [ACCEPTED, WRONG_ANSWER, ACCEPTED])
+        self.assertEqual([test.verdict for test in results[1].tests], [WRONG_ANSWER, ACCEPTED])
+
+        stats = self.pipeline.stats()
+        self.assertEqual((stats.compilation.processed, stats.execution.processed), (3, 3))
+        self.assertEqual((stats.compilation.workers, stats.execution.workers), (2, 1))
+        self.assertEqual((stats.compilation.queued, stats.execution.queued), (0, 0))
+        self.assertGreater(stats.elapsed, 0)
+
+    def test_errors(self):
+        compilation = {'need': True, 'cmd': 'sh -c "echo broken >&2; exit 1"', 'executable': '{filename}.o',
+                       'limits': {'time': 5000}}
+        result = self.pipeline.test_suite(self.source('broken.py'), dict(CONFIG, compilation=compilation), TESTS)
+        self.assertEqual(result.verdict, COMPILATION_ERROR)
+        self.assertEqual(result.tests, [])
+
+        # errors of testing are raised by future
+        with self.assertRaises(FileDoesNotExistError):
+            self.pipeline.test_suite(os.path.join(self.directory, 'missing.py'), CONFIG, TESTS)
+        self.assertEqual(self.pipeline.test_suite(self.source('program.py'), CONFIG, TESTS).verdict, ACCEPTED)
+
+    def test_closed(self):
+        future = self.pipeline.submit(self.source('program.py'), CONFIG, TESTS)
+        self.pipeline.close()
+        # queued submissions are tested before pipeline stops
+        self.assertTrue(future.done())
+        self.assertEqual(future.result().verdict, ACCEPTED)
+        with self.assertRaises(RuntimeError):
+            self.pipeline.submit(self.source('program.py'), CONFIG, TESTS)
+
+
+if __name__ == '__main__':
+    unittest.main()
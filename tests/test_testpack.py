@@ -0,0 +1,82 @@
+"""Writing and reading packs of tests.
+
+Usage:
+    python -m pytest tests
+
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'carbon'))
+
+import testpack
+from errors import InvalidTestPackError
+
+
+TESTS = [('1 2', '3\n'), (b'', b''), ('4 ' * 1000, '8\n' * 1000), (bytes(range(256)), b'\0')]
+
+
+class TestPackTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='carbon-test-')
+        self.path = os.path.join(self.directory, 'tests.pack')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write(self, compression=None):
+        with testpack.TestPackWriter(self.path, compression) as writer:
+            for input, output in TESTS:
+                writer.add(input, output)
+
+    def test_read(self):
+        for compression in (None, 'zlib', 'lzma'):
+            self.write(compression)
+            with testpack.TestPack(self.path) as tests:
+                self.assertEqual(len(tests), len(TESTS))
+                for (input, output), (expected_input, expected_output) in zip(tests, TESTS):
+                    self.assertEqual(bytes(input), expected_input.encode() if isinstance(expected_input, str)
+                                     else expected_input)
+                    self.assertEqual(bytes(output), expected_output.encode() if isinstance(expected_output, str)
+                                     else expected_output)
+                self.assertEqual(bytes(tests[-1][1]), b'\0')
+                with self.assertRaises(IndexError):
+                    tests[len(TESTS)]
+
+    def test_compression(self):
+        self.write()
+        size = os.path.getsize(self.path)
+        self.write('zlib')
+        self.assertLess(os.path.getsize(self.path), size)
+        with self.assertRaises(ValueError):
+            testpack.TestPackWriter(self.path, 'zip')
+
+    def test_aborted(self):
+        with self.assertRaises(RuntimeError):
+            with testpack.TestPackWriter(self.path) as writer:
+                writer.add('1', '1')
+                raise RuntimeError
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_damaged(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a pack' * 10)
+        with self.assertRaises(InvalidTestPackError):
+            testpack.TestPack(self.path)
+
+        self.write()
+        with open(self.path, 'r+b') as f:
+            f.seek(testpack.HEADER.size)
+            f.write(b'9')
+        with testpack.TestPack(self.path) as tests:
+            with self.assertRaises(InvalidTestPackError):
+                tests[0]
+            self.assertEqual(bytes(tests[2][1]), TESTS[2][1].encode())
+
+
+if __name__ == '__main__':
+    unittest.main()
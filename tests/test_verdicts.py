@@ -0,0 +1,76 @@
+"""Verdicts of crashed programs and programs killed by checker, in cold and warm interpreters.
+
+Usage:
+    python -m pytest tests
+
+"""
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'carbon'))
+
+from engine import Engine
+from verdicts import ACCEPTED, RUNTIME_ERROR, WRONG_ANSWER
+
+
+LIMITS = {
+    'time': 5000,
+    'vms': 1024 * 1024 * 1024,
+}
+
+COLD = {
+    'extension': 'py',
+    'compilation': {'need': False},
+    'execution': {'cmd': 'python3 {filename}', 'limits': LIMITS},
+}
+
+WARM = {
+    'extension': 'py',
+    'compilation': {'need': False},
+    'execution': {'cmd': 'python3 {filename}', 'zygote': {'cmd': 'python3', 'size': 1}, 'limits': LIMITS},
+}
+
+
+class VerdictTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='carbon-test-')
+        self.engine = Engine(logging.CRITICAL)
+
+    def tearDown(self):
+        self.engine.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def verdict(self, source, config, output='4\n'):
+        filename = os.path.join(self.directory, 'program.py')
+        with open(filename, 'w') as f:
+            f.write(source)
+        return self.engine.test_suite(filename, config, [('2', output)]).tests[0].verdict
+
+    def test_crash_without_output(self):
+        for config in (COLD, WARM):
+            self.assertEqual(self.verdict('raise ValueError\n', config), RUNTIME_ERROR)
+            self.assertEqual(self.verdict('import sys\nsys.exit(3)\n', config), RUNTIME_ERROR)
+
+    def test_crash_with_partial_output(self):
+        for config in (COLD, WARM):
+            source = 'import sys\nprint(4, flush=True)\nsys.exit(3)\n'
+            self.assertEqual(self.verdict(source, config, '4\n5\n'), RUNTIME_ERROR)
+
+    def test_killed_by_checker(self):
+        for config in (COLD, WARM):
+            source = 'import time\nprint(5, flush=True)\ntime.sleep(10)\n'
+            self.assertEqual(self.verdict(source, config), WRONG_ANSWER)
+
+    def test_wrong_output(self):
+        for config in (COLD, WARM):
+            self.assertEqual(self.verdict('print(5)\n', config), WRONG_ANSWER)
+            self.assertEqual(self.verdict('print(int(input()) * 2)\n', config), ACCEPTED)
+
+
+if __name__ == '__main__':
+    unittest.main()
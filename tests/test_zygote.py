@@ -0,0 +1,83 @@
+"""Pool of warm interpreters and interpreters of programs failing before start.
+
+Usage:
+    python -m pytest tests
+
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'carbon'))
+
+from program import Program
+from zygote import ZygotePool
+
+
+CONFIG = {
+    'extension': 'py',
+    'compilation': {'need': False},
+    'execution': {'cmd': 'python3 {filename}', 'zygote': {'cmd': 'python3', 'size': 1},
+                  'limits': {'time': 5000, 'vms': 1024 * 1024 * 1024}},
+}
+
+
+class ZygotePoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='carbon-test-')
+        self.pool = ZygotePool('python3', 1)
+
+    def tearDown(self):
+        self.pool.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_acquire(self):
+        zygotes = [self.pool.acquire() for _ in range(3)]
+        self.assertEqual(len(set(zygote.process.pid for zygote in zygotes)), 3)
+        for zygote in zygotes:
+            zygote.close()
+            self.assertIsNotNone(zygote.process.returncode)
+
+    def test_parallel_acquire(self):
+        zygotes = []
+        threads = [threading.Thread(target=lambda: zygotes.append(self.pool.acquire())) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(zygotes), 4)
+        self.assertTrue(all(zygotes))
+        for zygote in zygotes:
+            zygote.close()
+
+    def test_closed(self):
+        zygote = self.pool._zygotes[0]
+        self.pool.close()
+        self.assertIsNotNone(zygote.process.returncode)
+        with self.assertRaises(RuntimeError):
+            self.pool.acquire()
+
+    def test_failed_start(self):
+        filename = os.path.join(self.directory, 'program.py')
+        with open(filename, 'w') as f:
+            f.write('print(1)\n')
+        program = Program(filename, CONFIG, zygote_pool=self.pool)
+        program.compile()
+
+        # acquired interpreter is referenced here, so it is not stopped by garbage collection of its socket
+        acquired, acquire = [], self.pool.acquire
+        self.pool.acquire = lambda: acquired.append(acquire()) or acquired[-1]
+
+        # STDOUT can not be opened, so interpreter taken from pool is not given program
+        with self.assertRaises(OSError):
+            program.execute('', output_file=os.path.join(self.directory, 'missing', 'output.txt'))
+        self.assertEqual(len(acquired), 1)
+        self.assertIsNotNone(acquired[0].process.returncode)
+
+
+if __name__ == '__main__':
+    unittest.main()